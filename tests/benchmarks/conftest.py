@@ -0,0 +1,10 @@
+import pytest
+from loguru import logger
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    """Keep log formatting out of the measurements."""
+    logger.disable("tracecat")
+    yield
+    logger.enable("tracecat")
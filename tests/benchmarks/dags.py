@@ -0,0 +1,50 @@
+"""DAG generators shared by the benchmarks."""
+
+from tracecat.dsl.common import ActionStatement, DSLInput
+
+
+def _dsl(title: str, actions: list[ActionStatement]) -> DSLInput:
+    return DSLInput(
+        title=title,
+        description=f"Benchmark DAG: {title}",
+        entrypoint=actions[0].ref,
+        actions=actions,
+    )
+
+
+def _action(ref: str, depends_on: list[str] | None = None) -> ActionStatement:
+    return ActionStatement(
+        ref=ref, action="core.transform.forward", depends_on=depends_on or []
+    )
+
+
+def chain_dsl(n: int) -> DSLInput:
+    """a_0 -> a_1 -> ... -> a_{n-1}"""
+    actions = [_action("a_0")]
+    actions += [_action(f"a_{i}", [f"a_{i-1}"]) for i in range(1, n)]
+    return _dsl(f"chain_{n}", actions)
+
+
+def fan_out_dsl(n: int) -> DSLInput:
+    """root -> (a_0, ..., a_{n-1})"""
+    actions = [_action("root")]
+    actions += [_action(f"a_{i}", ["root"]) for i in range(n)]
+    return _dsl(f"fan_out_{n}", actions)
+
+
+def diamond_dsl(n: int) -> DSLInput:
+    """root -> (a_0, ..., a_{n-1}) -> join"""
+    fan_out = fan_out_dsl(n).actions
+    join = _action("join", [a.ref for a in fan_out[1:]])
+    return _dsl(f"diamond_{n}", [*fan_out, join])
+
+
+def layered_dsl(width: int, depth: int) -> DSLInput:
+    """root -> `depth` layers of `width` actions, each fully connected to the last."""
+    actions = [_action("root")]
+    prev = ["root"]
+    for d in range(depth):
+        layer = [f"l{d}_{i}" for i in range(width)]
+        actions += [_action(ref, prev) for ref in layer]
+        prev = layer
+    return _dsl(f"layered_{width}x{depth}", actions)
@@ -0,0 +1,62 @@
+"""Secret decryption benchmarks.
+
+Builds the `list_secrets` response for 1,000 secrets, decrypting each row with
+a freshly constructed cipher (as before ciphers were cached) or all rows in
+one pass with `Secret.decrypt_keys`.
+"""
+
+import os
+
+import orjson
+import pytest
+from cryptography.fernet import Fernet
+
+from tracecat.db.schemas import Secret
+from tracecat.types.api import SecretResponse
+from tracecat.types.secrets import SecretKeyValue
+
+N_SECRETS = 1000
+
+
+def _legacy_decrypt_object(encrypted_obj: bytes) -> dict:
+    cipher_suite = Fernet(os.environ["TRACECAT__DB_ENCRYPTION_KEY"])
+    return orjson.loads(cipher_suite.decrypt(encrypted_obj))
+
+
+@pytest.fixture(scope="module")
+def secrets() -> list[Secret]:
+    secrets = []
+    for i in range(N_SECRETS):
+        secret = Secret(name=f"secret_{i}", owner_id="bench")
+        secret.keys = [
+            SecretKeyValue(key="API_KEY", value=f"key-{i}"),
+            SecretKeyValue(key="API_SECRET", value="x" * 32),
+        ]
+        secrets.append(secret)
+    return secrets
+
+
+@pytest.mark.parametrize("mode", ["per_row", "bulk"])
+def test_list_secrets(benchmark, secrets: list[Secret], mode: str):
+    def list_secrets() -> list[SecretResponse]:
+        if mode == "bulk":
+            all_keys = Secret.decrypt_keys(secrets)
+        else:
+            all_keys = [
+                secret._to_keys(_legacy_decrypt_object(secret.encrypted_keys))
+                for secret in secrets
+            ]
+        return [
+            SecretResponse(
+                id=secret.id,
+                type=secret.type,
+                name=secret.name,
+                description=secret.description,
+                keys=keys or [],
+            )
+            for secret, keys in zip(secrets, all_keys, strict=True)
+        ]
+
+    benchmark.group = f"list_secrets[{N_SECRETS}]"
+    result = benchmark(list_secrets)
+    assert len(result) == N_SECRETS
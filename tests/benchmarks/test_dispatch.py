@@ -0,0 +1,54 @@
+"""Webhook dispatch load test.
+
+Fires N concurrent workflow starts, as `dispatch_workflow` does for webhook
+hits, and compares connecting per dispatch with the shared client. No worker
+is needed: we only measure how long it takes to get the start accepted.
+
+Requires a running Temporal cluster (see the `temporal_cluster` fixture).
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+
+from tracecat.dsl.client import TemporalClientManager, connect_temporal_client
+
+N_DISPATCHES = 200
+
+
+async def _fire(get_client, n: int) -> list[float]:
+    task_queue = os.environ["TEMPORAL__CLUSTER_QUEUE"] + "-bench-dispatch"
+
+    async def dispatch() -> float:
+        start = time.perf_counter()
+        client = await get_client()
+        await client.start_workflow(
+            "DSLWorkflow",
+            id=f"bench-dispatch-{uuid4()}",
+            task_queue=task_queue,
+            # Nothing picks these up, so let them expire
+            execution_timeout=timedelta(seconds=30),
+        )
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(dispatch() for _ in range(n)))
+
+
+@pytest.mark.parametrize("mode", ["connect_per_dispatch", "shared_client"])
+def test_dispatch_latency(benchmark, temporal_cluster, mode: str):
+    def run():
+        if mode == "shared_client":
+            get_client = TemporalClientManager().get
+        else:
+            get_client = connect_temporal_client
+        return asyncio.run(_fire(get_client, N_DISPATCHES))
+
+    latencies = benchmark.pedantic(run, rounds=3)
+    quantiles = statistics.quantiles(latencies, n=100)
+    benchmark.extra_info["p50_ms"] = quantiles[49] * 1000
+    benchmark.extra_info["p99_ms"] = quantiles[98] * 1000
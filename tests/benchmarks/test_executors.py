@@ -0,0 +1,81 @@
+"""Executor placement benchmarks.
+
+Runs a mixed workload on one worker: 8 `extract_emails` calls over 20k strings
+each (CPU-bound, pure Python) next to 400 sync UDFs that block on IO for 2ms.
+Either every sync UDF runs in the loop's default executor, as before
+placements, or each runs in the executor of its placement. The latency of the
+IO-bound calls is recorded in `extra_info`.
+"""
+
+import asyncio
+import importlib
+import statistics
+import time
+
+import pytest
+
+from tracecat.executors import UDFExecutors
+from tracecat.registry import RegisteredUDF, registry
+
+N_CPU_CALLS = 8
+N_IO_CALLS = 400
+N_TEXTS = 20_000
+
+
+@registry.register(description="Block on IO", namespace="bench_executors")
+def blocking_io(ms: int) -> int:
+    time.sleep(ms / 1000)
+    return ms
+
+
+@pytest.fixture(scope="module")
+def texts() -> list[str]:
+    return [
+        f"ticket {i}: reported by user{i}@example.com, cc soc+{i}@corp.example.org"
+        for i in range(N_TEXTS)
+    ]
+
+
+@pytest.fixture(scope="module")
+def executors():
+    importlib.import_module("tracecat.actions.integrations.extraction.email")
+    executors = UDFExecutors()
+    yield executors
+    executors.shutdown()
+
+
+async def _default_executor(udf: RegisteredUDF, args: dict) -> object:
+    return await asyncio.to_thread(udf.fn, **args)
+
+
+@pytest.mark.parametrize("mode", ["default_executor", "placed"])
+def test_mixed_workload(benchmark, monkeypatch, executors, texts, mode: str):
+    monkeypatch.setattr("tracecat.registry.executors", executors)
+    cpu_udf = registry["integrations.extraction.extract_emails"]
+    io_udf = registry["bench_executors.blocking_io"]
+    latencies: list[float] = []
+
+    async def call(udf: RegisteredUDF, args: dict) -> object:
+        if mode == "placed":
+            return await udf.run_async(args)
+        return await _default_executor(udf, args)
+
+    async def timed_io() -> None:
+        start = time.perf_counter()
+        await call(io_udf, {"ms": 2})
+        latencies.append(time.perf_counter() - start)
+
+    async def run() -> None:
+        latencies.clear()
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(N_CPU_CALLS):
+                tg.create_task(call(cpu_udf, {"texts": texts}))
+            for _ in range(N_IO_CALLS):
+                tg.create_task(timed_io())
+
+    benchmark.group = "mixed_workload"
+    # The warmup round starts the process pool
+    benchmark.pedantic(lambda: asyncio.run(run()), rounds=3, warmup_rounds=1)
+    quantiles = statistics.quantiles(latencies, n=100)
+    benchmark.extra_info["io_p50_ms"] = round(quantiles[49] * 1000, 2)
+    benchmark.extra_info["io_p99_ms"] = round(quantiles[98] * 1000, 2)
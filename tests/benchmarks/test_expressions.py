@@ -0,0 +1,44 @@
+"""Expression evaluation benchmarks.
+
+Evaluates the `tests/unit/test_expressions.py` expression corpus, either
+compiling each expression from scratch, as every evaluation did before
+expressions were compiled once, or with cached compiled expressions, as after
+the first iteration of a `for_each` loop.
+
+Context lookups are dominated by jsonpath evaluation, so we also measure the
+expressions without lookups, which isolates the cost of parsing.
+"""
+
+import pytest
+
+from tests.unit.test_expressions import EXPRESSION_CASES, EXPRESSION_CONTEXT
+from tracecat.expressions.engine import compile_expression
+
+CORPORA = {
+    "all": EXPRESSION_CASES,
+    "no_lookups": [
+        (expr, expected)
+        for expr, expected in EXPRESSION_CASES
+        if not any(ctx in expr for ctx in ("ACTIONS.", "SECRETS.", "INPUTS.", "ENV."))
+    ],
+}
+
+
+def _eval_uncached(exprs: list[str]) -> list:
+    compile_uncached = compile_expression.__wrapped__
+    return [compile_uncached(expr).evaluate(EXPRESSION_CONTEXT) for expr in exprs]
+
+
+def _eval_compiled(exprs: list[str]) -> list:
+    return [compile_expression(expr).evaluate(EXPRESSION_CONTEXT) for expr in exprs]
+
+
+@pytest.mark.parametrize("corpus", CORPORA)
+@pytest.mark.parametrize(
+    "evaluate", [_eval_uncached, _eval_compiled], ids=["uncached", "compiled"]
+)
+def test_expression_corpus(benchmark, evaluate, corpus: str):
+    exprs = [expr for expr, _ in CORPORA[corpus]]
+    _eval_compiled(exprs)
+    results = benchmark(evaluate, exprs)
+    assert results == [expected for _, expected in CORPORA[corpus]]
@@ -0,0 +1,165 @@
+"""`for_each` fan-out benchmarks.
+
+Runs a mocked IO-bound UDF (1ms per call) over 10k items at several
+concurrency levels.
+
+Also measures the per-iteration cost of building each iteration's operand over
+a 50k item loop, comparing a copied and patched context with a layered one.
+
+Finally, passes a CloudTrail-style NDJSON file to `run_for_each`, either read
+into a list first or streamed line by line, and records the peak traced memory
+in `extra_info`. DSL loops always take the materialized path, as `for_each`
+expressions evaluate to lists, so the streamed case only applies to callers
+that pass a lazy iterable directly.
+"""
+
+import asyncio
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import orjson
+import pytest
+
+from tracecat.dsl.common import ForEachPolicy
+from tracecat.dsl.workflow import run_for_each
+from tracecat.expressions import (
+    ExprContext,
+    IterableExpr,
+    LayeredContext,
+    TemplateSkeleton,
+)
+
+N_ITEMS = 10_000
+
+
+class MockUDF:
+    async def run_async(self, args: dict[str, Any]) -> Any:
+        await asyncio.sleep(0.001)
+        return args["indicator"]
+
+
+@pytest.mark.parametrize("max_concurrency", [16, 64, 256, 1024])
+@pytest.mark.parametrize("chunk_size", [1, 32])
+def test_for_each_concurrency(benchmark, max_concurrency: int, chunk_size: int):
+    policy = ForEachPolicy(max_concurrency=max_concurrency, chunk_size=chunk_size)
+    indicators = [f"10.0.{i // 256}.{i % 256}" for i in range(N_ITEMS)]
+
+    def run():
+        return asyncio.run(
+            run_for_each(
+                MockUDF(),
+                args={"indicator": "${{ var.ip }}"},
+                iterable_exprs=[IterableExpr("var.ip", indicators)],
+                exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+                policy=policy,
+            )
+        )
+
+    benchmark.group = f"chunk_size={chunk_size}"
+    result = benchmark.pedantic(run, rounds=1)
+    assert result == indicators
+
+
+N_LOOP_ITEMS = 50_000
+
+
+def _copy_and_patch(context: dict[str, Any], items) -> dict[str, Any]:
+    """How iteration operands were built before `LayeredContext`."""
+    patched = context.copy()
+    for path, value in items:
+        *stem, leaf = path.split(".")
+        obj = patched
+        for key in stem:
+            obj = obj.setdefault(key, {})
+        obj[leaf] = value
+    return patched
+
+
+@pytest.mark.parametrize(
+    "make_context",
+    [_copy_and_patch, LayeredContext.with_vars],
+    ids=["copy_and_patch", "layered"],
+)
+def test_for_each_iteration_context(benchmark, make_context):
+    exec_context = {
+        ExprContext.INPUTS: {f"input_{i}": i for i in range(20)},
+        ExprContext.ACTIONS: {
+            f"action_{i}": {"result": list(range(100)), "result_typename": "list"}
+            for i in range(50)
+        },
+        ExprContext.TRIGGER: {},
+    }
+    iterable_exprs = [
+        IterableExpr("var.alert.id", range(N_LOOP_ITEMS)),
+        IterableExpr("var.alert.source", ["siem"] * N_LOOP_ITEMS),
+    ]
+    skeleton = TemplateSkeleton.compile(
+        {"id": "${{ var.alert.id }}", "url": "https://${{ var.alert.source }}/alerts"}
+    )
+
+    def run():
+        return [
+            skeleton.evaluate(make_context(exec_context, items))
+            for items in zip(*iterable_exprs, strict=False)
+        ]
+
+    result = benchmark.pedantic(run, rounds=3)
+    assert result[-1] == {"id": N_LOOP_ITEMS - 1, "url": "https://siem/alerts"}
+
+
+N_NDJSON_LINES = 100_000
+
+
+class ParseEventUDF:
+    async def run_async(self, args: dict[str, Any]) -> Any:
+        return orjson.loads(args["line"])["eventName"]
+
+
+@pytest.fixture(scope="module")
+def cloudtrail_ndjson(tmp_path_factory) -> Path:
+    path = tmp_path_factory.mktemp("cloudtrail") / "events.ndjson"
+    with path.open("wb") as f:
+        for i in range(N_NDJSON_LINES):
+            event = {
+                "eventID": f"{i:08x}-0000-0000-0000-000000000000",
+                "eventName": "AssumeRole" if i % 3 else "ConsoleLogin",
+                "eventSource": "sts.amazonaws.com",
+                "sourceIPAddress": f"10.0.{i // 256 % 256}.{i % 256}",
+                "userIdentity": {"type": "AssumedRole", "principalId": f"AROA{i}"},
+                "requestParameters": {"roleSessionName": f"session-{i}"},
+            }
+            f.write(orjson.dumps(event) + b"\n")
+    return path
+
+
+@pytest.mark.parametrize("mode", ["materialized", "streamed"])
+def test_for_each_ndjson(benchmark, cloudtrail_ndjson: Path, mode: str):
+    policy = ForEachPolicy(max_concurrency=64, chunk_size=32)
+
+    def run():
+        with cloudtrail_ndjson.open() as f:
+            lines = f.readlines() if mode == "materialized" else f
+            return asyncio.run(
+                run_for_each(
+                    ParseEventUDF(),
+                    args={"line": "${{ var.line }}"},
+                    iterable_exprs=[IterableExpr("var.line", lines)],
+                    exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+                    policy=policy,
+                )
+            )
+
+    def traced_run():
+        tracemalloc.start()
+        try:
+            result = run()
+            benchmark.extra_info["peak_mb"] = round(
+                tracemalloc.get_traced_memory()[1] / 2**20, 1
+            )
+        finally:
+            tracemalloc.stop()
+        return result
+
+    result = benchmark.pedantic(traced_run, rounds=1)
+    assert len(result) == N_NDJSON_LINES
@@ -0,0 +1,40 @@
+"""Mapped expression function benchmarks.
+
+Compares the scalar path, which calls the function per element, with the
+columnar (Polars) path at several collection sizes.
+"""
+
+import random
+
+import pytest
+
+from tracecat import config
+from tracecat.expressions.functions import FUNCTION_MAPPING
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def _args(name: str, size: int) -> tuple:
+    rng = random.Random(0)
+    match name:
+        case "regex_match":
+            hosts = ["web", "db", "cache", "10.0.0.1", "vpn-gw"]
+            return ("[a-z]+-?[0-9]*", [rng.choice(hosts) for _ in range(size)])
+        case "greater_than":
+            return ([rng.randint(0, 10) for _ in range(size)], 7)
+        case "add":
+            return ([rng.random() for _ in range(size)], 1.5)
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("path", ["scalar", "columnar"])
+@pytest.mark.parametrize("name", ["regex_match", "greater_than", "add"])
+def test_mapped_function(benchmark, monkeypatch, name: str, path: str, size: int):
+    args = _args(name, size)
+    min_size = 1 if path == "columnar" else size + 1
+    monkeypatch.setattr(config, "TRACECAT__FN_COLUMNAR_MIN_SIZE", min_size)
+    fn = FUNCTION_MAPPING[name]
+
+    benchmark.group = f"{name}[{size}]"
+    result = benchmark.pedantic(fn.map, args=args, rounds=3, warmup_rounds=1)
+    assert len(result) == size
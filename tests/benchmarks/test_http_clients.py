@@ -0,0 +1,156 @@
+"""Pooled HTTP client benchmarks.
+
+Runs 1,000 `virustotal.analyze_ip_address` calls, 50 at a time, against a local
+HTTPS stand-in for the VirusTotal API. Each call either creates its own client,
+as integrations did before the client pool, or uses a pooled client. The
+requests per second are recorded in `extra_info`.
+"""
+
+import asyncio
+import datetime
+import importlib
+import ipaddress
+import socket
+import threading
+import time
+
+import httpx
+import orjson
+import pytest
+import uvicorn
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from tracecat.contexts import ctx_secrets
+from tracecat.http import HTTPClientPool
+from tracecat.registry import registry
+
+N_CALLS = 1000
+CONCURRENCY = 50
+
+
+async def vendor_app(scope, receive, send):
+    """A stand-in for the VirusTotal API."""
+    if scope["type"] != "http":
+        return
+    ip_address = scope["path"].rsplit("/", 1)[-1]
+    body = orjson.dumps({"data": {"id": ip_address, "type": "ip_address"}})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def _self_signed_cert(tmp_path) -> tuple[str, str]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [
+                    x509.DNSName("localhost"),
+                    x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+                ]
+            ),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = tmp_path / "cert.pem", tmp_path / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return str(cert_path), str(key_path)
+
+
+@pytest.fixture(scope="module")
+def vendor_server(tmp_path_factory):
+    cert_path, key_path = _self_signed_cert(tmp_path_factory.mktemp("tls"))
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(
+            vendor_app,
+            host="127.0.0.1",
+            port=port,
+            ssl_certfile=cert_path,
+            ssl_keyfile=key_path,
+            log_level="warning",
+            lifespan="off",
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"https://localhost:{port}/api/", cert_path
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture(scope="module")
+def virustotal():
+    return importlib.import_module(
+        "tracecat.actions.integrations.enrichment.virustotal"
+    )
+
+
+@pytest.mark.parametrize("mode", ["per_call_client", "pooled"])
+def test_enrichment_throughput(
+    benchmark, monkeypatch, vendor_server, virustotal, mode: str
+):
+    base_url, cert_path = vendor_server
+    monkeypatch.setenv("SSL_CERT_FILE", cert_path)
+    monkeypatch.setattr(virustotal, "VT_BASE_URL", base_url)
+    if mode == "per_call_client":
+        monkeypatch.setattr(
+            virustotal,
+            "create_virustotal_client",
+            lambda: httpx.AsyncClient(base_url=base_url, headers={"x-apikey": "bench"}),
+        )
+    # Call the UDF directly, without its rate limit
+    analyze_ip_address = registry["virustotal.analyze_ip_address"].fn
+
+    async def run() -> list:
+        pool = HTTPClientPool()
+        pool.open()
+        monkeypatch.setattr("tracecat.http.http_pool", pool)
+        ctx_secrets.set({"VT_API_KEY": "bench"})
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def call(i: int):
+            async with semaphore:
+                return await analyze_ip_address(ip_address=f"10.0.{i // 256}.{i % 256}")
+
+        try:
+            return await asyncio.gather(*(call(i) for i in range(N_CALLS)))
+        finally:
+            await pool.aclose()
+
+    benchmark.group = f"enrichment_calls[{N_CALLS}]"
+    results = benchmark.pedantic(lambda: asyncio.run(run()), rounds=3)
+    assert len(results) == N_CALLS
+    benchmark.extra_info["requests_per_second"] = round(
+        N_CALLS / benchmark.stats.stats.mean
+    )
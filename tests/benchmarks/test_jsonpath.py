@@ -0,0 +1,65 @@
+"""JSONPath evaluation benchmarks.
+
+Compares parsing every path with jsonpath_ng, as `eval_jsonpath` used to, with
+the cached evaluator. The mix is mostly simple dotted paths, which take the
+fast path, with some wildcards, slices and recursive descent, which go
+through the cached jsonpath_ng objects.
+"""
+
+import jsonpath_ng
+import pytest
+
+from tracecat.expressions.engine import eval_jsonpath
+
+OPERAND = {
+    "webhook": {
+        "result": {"alert_id": "abc", "severity": 7},
+        "result_typename": "dict",
+    },
+    "fetch": {
+        "result": {
+            "status": 200,
+            "items": [
+                {"id": i, "name": f"item-{i}", "tags": ["a", "b"]} for i in range(50)
+            ],
+        },
+        "result_typename": "dict",
+    },
+}
+
+SIMPLE_PATHS = [
+    "webhook.result",
+    "webhook.result.alert_id",
+    "$.webhook.result.severity",
+    "fetch.result.status",
+    "fetch.result.items",
+    "fetch.result.items[0].id",
+    "fetch.result.items[42].name",
+    "fetch.result_typename",
+]
+COMPLEX_PATHS = [
+    "fetch.result.items[*].id",
+    "fetch.result.items[10:20].name",
+]
+PATHS = SIMPLE_PATHS * 4 + COMPLEX_PATHS
+
+
+def _eval_uncached(paths: list[str]) -> list:
+    results = []
+    for path in paths:
+        matches = [found.value for found in jsonpath_ng.parse(path).find(OPERAND)]
+        results.append(matches[0] if len(matches) == 1 else matches)
+    return results
+
+
+def _eval_cached(paths: list[str]) -> list:
+    return [eval_jsonpath(path, OPERAND) for path in paths]
+
+
+@pytest.mark.parametrize(
+    "evaluate", [_eval_uncached, _eval_cached], ids=["uncached", "cached"]
+)
+def test_jsonpath_mix(benchmark, evaluate):
+    expected = _eval_uncached(PATHS)
+    assert _eval_cached(PATHS) == expected
+    assert benchmark(evaluate, PATHS) == expected
@@ -0,0 +1,69 @@
+"""Result offloading benchmarks.
+
+Simulates a fan-out workflow where one action returns a large finding list and
+every downstream action reads it. History size is approximated by the encoded
+size of every activity input and result payload.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from tracecat.contexts import RunContext
+from tracecat.dsl._converter import pydantic_data_converter
+from tracecat.dsl.common import ActionStatement
+from tracecat.dsl.workflow import DSLContext, DSLNodeResult, UDFActionInput
+from tracecat.expressions import ExprContext, eval_templated_object
+from tracecat.storage import LocalBlobStore, load_offloaded_results, offload_result
+
+N_DOWNSTREAM = 10
+FINDINGS = [
+    {"id": f"finding-{i}", "severity": i % 10, "detail": "x" * 200} for i in range(5000)
+]
+ROLE = {"type": "service", "user_id": "bench", "service_id": "tracecat-runner"}
+RUN_CTX = RunContext(
+    wf_id="wf-" + "0" * 32,
+    wf_exec_id="wf-" + "0" * 32 + ":exec-" + "0" * 32,
+    wf_run_id=uuid4(),
+)
+
+
+def _simulate(threshold: int, store: LocalBlobStore) -> int:
+    converter = pydantic_data_converter.payload_converter
+    context = DSLContext(INPUTS={}, ACTIONS={}, TRIGGER={})
+    history_bytes = 0
+
+    result = offload_result(FINDINGS, threshold=threshold, store=store)
+    history_bytes += converter.to_payloads([result])[0].ByteSize()
+    context[ExprContext.ACTIONS]["list_findings"] = DSLNodeResult(
+        result=result, result_typename="list"
+    )
+
+    task = ActionStatement(
+        ref="notify",
+        action="core.transform.forward",
+        args={"count": "${{ FN.length(ACTIONS.list_findings.result) }}"},
+    )
+    for _ in range(N_DOWNSTREAM):
+        input = UDFActionInput(
+            task=task, role=ROLE, run_context=RUN_CTX, exec_context=context
+        )
+        history_bytes += converter.to_payloads([input])[0].ByteSize()
+        # Each activity loads the offloaded results before evaluating its args
+        actions = asyncio.run(load_offloaded_results(context[ExprContext.ACTIONS]))
+        args = eval_templated_object(
+            task.args, operand={**context, ExprContext.ACTIONS: actions}
+        )
+        assert args["count"] == len(FINDINGS)
+    return history_bytes
+
+
+@pytest.mark.parametrize("threshold", [0, 256 * 1024], ids=["inline", "offload"])
+def test_offload_history_size_and_latency(
+    benchmark, tmp_path, monkeypatch, threshold: int
+):
+    store = LocalBlobStore(tmp_path)
+    monkeypatch.setattr("tracecat.storage.get_blob_store", lambda: store)
+    history_bytes = benchmark(_simulate, threshold, store)
+    benchmark.extra_info["history_bytes"] = history_bytes
@@ -0,0 +1,84 @@
+"""Payload compression benchmarks.
+
+Records the activity input and result payloads of a layered workflow, where
+each action returns a list of alerts and receives the results it depends on,
+then measures the encoded size and encode/decode time for each codec.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter
+
+from tracecat.contexts import RunContext
+from tracecat.dsl._converter import CompressionPayloadCodec, PydanticPayloadConverter
+from tracecat.dsl.workflow import DSLContext, DSLNodeResult, UDFActionInput
+
+from .dags import layered_dsl
+
+ROLE = {"type": "service", "user_id": "bench", "service_id": "tracecat-runner"}
+RUN_CTX = RunContext(
+    wf_id="wf-" + "0" * 32,
+    wf_exec_id="wf-" + "0" * 32 + ":exec-" + "0" * 32,
+    wf_run_id=uuid4(),
+)
+
+
+def _alerts(ref: str) -> list[dict]:
+    return [
+        {
+            "id": f"{ref}-{i}",
+            "source": "guardduty",
+            "severity": ["low", "medium", "high"][i % 3],
+            "title": "Unusual API call from a known malicious IP address",
+            "resource": {"type": "AccessKey", "user": f"user-{i % 7}"},
+        }
+        for i in range(50)
+    ]
+
+
+def _record_payloads() -> list[Payload]:
+    converter = DataConverter(payload_converter_class=PydanticPayloadConverter)
+    dsl = layered_dsl(width=5, depth=4)
+    context = DSLContext(INPUTS={}, ACTIONS={}, TRIGGER={})
+    values = []
+    for task in dsl.actions:
+        exec_context = DSLContext(
+            INPUTS={},
+            ACTIONS={ref: context["ACTIONS"][ref] for ref in task.depends_on},
+            TRIGGER={},
+        )
+        values.append(
+            UDFActionInput(
+                task=task, role=ROLE, run_context=RUN_CTX, exec_context=exec_context
+            )
+        )
+        result = _alerts(task.ref)
+        values.append(result)
+        context["ACTIONS"][task.ref] = DSLNodeResult(
+            result=result, result_typename="list"
+        )
+    return converter.payload_converter.to_payloads(values)
+
+
+PAYLOADS = _record_payloads()
+
+
+@pytest.mark.parametrize("codec", ["zstd", "lz4"])
+def test_payload_codec_roundtrip(benchmark, codec: str):
+    payload_codec = CompressionPayloadCodec(codec)
+
+    async def roundtrip() -> list[Payload]:
+        encoded = await payload_codec.encode(PAYLOADS)
+        await payload_codec.decode(encoded)
+        return encoded
+
+    loop = asyncio.new_event_loop()
+    try:
+        encoded = benchmark(lambda: loop.run_until_complete(roundtrip()))
+    finally:
+        loop.close()
+    benchmark.extra_info["raw_bytes"] = sum(p.ByteSize() for p in PAYLOADS)
+    benchmark.extra_info["wire_bytes"] = sum(p.ByteSize() for p in encoded)
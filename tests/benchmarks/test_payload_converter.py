@@ -0,0 +1,50 @@
+"""Payload decoding benchmarks.
+
+Compares Temporal's default JSON decoding, which revalidates the model, with
+the ORJSON decoder over `DSLRunArgs` payloads of different sizes.
+"""
+
+import pytest
+from temporalio.converter import JSONPlainPayloadConverter
+
+from tracecat.dsl._converter import PydanticORJSONPayloadConverter
+from tracecat.dsl.common import ActionStatement, DSLInput
+from tracecat.dsl.workflow import DSLRunArgs
+
+
+def _dsl_run_args(n_actions: int) -> DSLRunArgs:
+    actions = [
+        ActionStatement(
+            ref=f"a_{i}",
+            action="core.transform.forward",
+            args={
+                "value": f"${{{{ ACTIONS.a_{i - 1}.result }}}}",
+                "url": "https://example.com/api",
+                "headers": {"Authorization": "Bearer ${{ SECRETS.api.KEY }}"},
+            },
+            depends_on=[f"a_{i - 1}"] if i else [],
+            run_if="${{ FN.is_equal(1, 1) }}",
+        )
+        for i in range(n_actions)
+    ]
+    dsl = DSLInput(title="t", description="d", entrypoint="a_0", actions=actions)
+    return DSLRunArgs(
+        dsl=dsl,
+        role={"type": "service", "service_id": "tracecat-runner"},
+        wf_id="wf-" + "0" * 32,
+    )
+
+
+CONVERTERS = {
+    "temporal_json": JSONPlainPayloadConverter(),
+    "orjson_pydantic": PydanticORJSONPayloadConverter(),
+}
+
+
+@pytest.mark.parametrize("n_actions", [100, 1000])
+@pytest.mark.parametrize("converter", CONVERTERS)
+def test_decode_dsl_run_args(benchmark, converter: str, n_actions: int):
+    args = _dsl_run_args(n_actions)
+    payload = PydanticORJSONPayloadConverter().to_payload(args)
+    decoded = benchmark(CONVERTERS[converter].from_payload, payload, DSLRunArgs)
+    assert decoded == args
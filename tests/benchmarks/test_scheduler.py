@@ -0,0 +1,57 @@
+"""Scheduler latency benchmarks.
+
+The executor is a no-op, so the measured time is pure scheduling overhead,
+including the delay between the last task finishing and the scheduler
+returning.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from tests.benchmarks.dags import chain_dsl, diamond_dsl, fan_out_dsl, layered_dsl
+from tracecat.dsl.common import ActionStatement, DSLConfig, DSLInput
+from tracecat.dsl.workflow import DSLScheduler
+
+DAGS = {
+    "diamond_50": diamond_dsl(50),
+    "fan_out_200": fan_out_dsl(200),
+    "chain_200": chain_dsl(200),
+}
+
+WIDE_AND_DEEP = {
+    "wide_100x3": layered_dsl(width=100, depth=3),
+    "deep_3x100": layered_dsl(width=3, depth=100),
+    "square_20x20": layered_dsl(width=20, depth=20),
+}
+
+
+async def _run(dsl: DSLInput) -> float:
+    """Run the scheduler and return the tail latency in seconds."""
+    last_done = 0.0
+
+    async def executor(task: ActionStatement) -> None:
+        nonlocal last_done
+        await asyncio.sleep(0)
+        last_done = time.perf_counter()
+
+    await DSLScheduler(activity_coro=executor, dsl=dsl).start()
+    return time.perf_counter() - last_done
+
+
+@pytest.mark.parametrize("name", list(DAGS))
+def test_dynamic_scheduler_latency(benchmark, name: str):
+    dsl = DAGS[name]
+    tail = benchmark(lambda: asyncio.run(_run(dsl)))
+    benchmark.extra_info["tail_latency_ms"] = tail * 1000
+    # Previously this was bounded below by the 1s queue poll timeout
+    assert tail < 0.5
+
+
+@pytest.mark.parametrize("mode", ["dynamic", "static"])
+@pytest.mark.parametrize("name", list(WIDE_AND_DEEP))
+def test_scheduler_mode_overhead(benchmark, name: str, mode: str):
+    dsl = WIDE_AND_DEEP[name].model_copy(update={"config": DSLConfig(scheduler=mode)})
+    benchmark.group = name
+    benchmark(lambda: asyncio.run(_run(dsl)))
@@ -0,0 +1,78 @@
+"""Secret resolution benchmarks.
+
+Resolves the secrets an action references through the API, either with one
+`GET /secrets/{name}` per secret (as the sandbox used to) or with a single
+`POST /secrets/batch`. The API runs in-process against an in-memory SQLite
+database, so this measures request, session and query overhead rather than
+network latency, which only widens the gap.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from tracecat.api.app import app
+from tracecat.auth.credentials import Role, authenticate_user_or_service
+from tracecat.db.helpers import SecretList
+from tracecat.db.schemas import Secret
+from tracecat.types.secrets import SecretKeyValue
+
+ROLE = Role(type="service", user_id="bench", service_id="tracecat-runner")
+N_SECRETS = 20
+
+
+@pytest.fixture(scope="module")
+def api():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(N_SECRETS):
+            secret = Secret(name=f"secret_{i}", owner_id=ROLE.user_id)
+            secret.keys = [SecretKeyValue(key=f"KEY_{i}", value="x" * 32)]
+            session.add(secret)
+        session.commit()
+
+    mp = pytest.MonkeyPatch()
+    mp.setattr("tracecat.api.app.engine", engine, raising=False)
+    app.dependency_overrides[authenticate_user_or_service] = lambda: ROLE
+    yield app
+    app.dependency_overrides.clear()
+    mp.undo()
+
+
+async def _per_secret(client: httpx.AsyncClient, names: list[str]) -> list[Secret]:
+    responses = await asyncio.gather(*(client.get(f"/secrets/{n}") for n in names))
+    return [Secret.model_validate_json(r.content) for r in responses]
+
+
+async def _batch(client: httpx.AsyncClient, names: list[str]) -> list[Secret]:
+    response = await client.post("/secrets/batch", json={"names": names})
+    response.raise_for_status()
+    return SecretList.validate_json(response.content)
+
+
+@pytest.mark.parametrize("n_secrets", [1, 5, 20])
+@pytest.mark.parametrize("mode", ["per_secret", "batch"])
+def test_resolve_action_secrets(benchmark, api, mode: str, n_secrets: int):
+    names = [f"secret_{i}" for i in range(n_secrets)]
+    fetch = _batch if mode == "batch" else _per_secret
+
+    async def resolve():
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            secrets = await fetch(client, names)
+        # Decrypt, as the sandbox does when it sets the secrets
+        return {s.name: {kv.key: kv.value for kv in s.keys} for s in secrets}
+
+    benchmark.group = f"secrets[{n_secrets}]"
+    result = benchmark(lambda: asyncio.run(resolve()))
+    assert len(result) == n_secrets
@@ -0,0 +1,74 @@
+"""Cold start benchmarks.
+
+Starts the API, worker and CLI entrypoints in a fresh interpreter with
+`python -X importtime`, with and without a registry manifest. The wall time of
+each start is benchmarked, and the total import time reported by `importtime`
+is recorded in `extra_info`.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tracecat.registry import write_manifest
+
+ENTRYPOINTS = {
+    # What the API does on startup, see `initialize_db`
+    "api": (
+        "import tracecat.api.app\n"
+        "from tracecat.registry import registry\n"
+        "registry.init()\n"
+        "registry.get_schemas()\n"
+    ),
+    # What the worker does before it starts polling
+    "worker": (
+        "from tracecat.dsl.worker import DSLActivities, registry\n"
+        "registry.init()\n"
+        "DSLActivities.init()\n"
+        "DSLActivities.load()\n"
+    ),
+    "cli": "import tracecat.cli.main\n",
+}
+
+
+@pytest.fixture(scope="module")
+def manifest_path(tmp_path_factory):
+    return write_manifest(tmp_path_factory.mktemp("registry") / "manifest.json")
+
+
+def _import_time_us(stderr: str) -> int:
+    """Sum the self time of every import, in microseconds."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us = line.removeprefix("import time:").split("|")[0].strip()
+        if self_us.isdigit():
+            total += int(self_us)
+    return total
+
+
+@pytest.mark.parametrize("registry_mode", ["eager", "manifest"])
+@pytest.mark.parametrize("entrypoint", list(ENTRYPOINTS))
+def test_cold_start(benchmark, manifest_path, entrypoint: str, registry_mode: str):
+    env = os.environ | {
+        "TRACECAT__REGISTRY_MANIFEST_PATH": (
+            str(manifest_path) if registry_mode == "manifest" else ""
+        )
+    }
+
+    def start() -> str:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", ENTRYPOINTS[entrypoint]],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return proc.stderr
+
+    benchmark.group = f"cold_start[{entrypoint}]"
+    stderr = benchmark.pedantic(start, rounds=3, warmup_rounds=1)
+    benchmark.extra_info["import_time_us"] = _import_time_us(stderr)
@@ -0,0 +1,87 @@
+"""UDF invocation overhead benchmarks.
+
+Calls each of the bundled UDFs that don't do IO 1,000 times, either through
+the previous wrapper (validate into the args model, dump it back to a dict,
+look the UDF up again and open a sandbox) or the current one (validate once,
+only dump UDFs with args that aren't immutable scalars, no sandbox without
+secrets). The UDFs are cheap, so the difference is the
+per-call overhead of the wrapper.
+"""
+
+import asyncio
+import importlib
+from typing import Any
+
+import pytest
+
+from tracecat.auth.sandbox import AuthSandbox
+from tracecat.registry import RegisteredUDF, registry
+
+N_CALLS = 1000
+
+CORE_UDF_ARGS: dict[str, dict[str, Any]] = {
+    "core.transform.forward": {"value": {"ip": "10.0.0.1", "tags": ["a", "b"]}},
+    "core.condition.compare": {
+        "condition_rules": {
+            "type": "compare",
+            "variant": "greater_than",
+            "lhs": 2,
+            "rhs": 1,
+        }
+    },
+    "core.condition.regex": {
+        "condition_rules": {
+            "type": "regex",
+            "variant": "regex_match",
+            "pattern": r"^10\.",
+            "text": "10.0.0.1",
+        }
+    },
+    "core.condition.membership": {
+        "condition_rules": {
+            "type": "membership",
+            "variant": "contains",
+            "item": "a",
+            "container": ["a", "b"],
+        }
+    },
+    "example.passthrough": {"value": "10.0.0.1"},
+    "example.add": {"lhs": 1, "rhs": 2},
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def core_udfs():
+    for module in ("core.condition", "core.example", "core.transform"):
+        importlib.import_module(f"tracecat.actions.{module}")
+
+
+async def _legacy_call(udf: RegisteredUDF, args: dict[str, Any]) -> Any:
+    fn = udf.fn.__wrapped__
+    validated = registry[udf.key].args_cls.model_validate(args).model_dump()
+    async with AuthSandbox(secrets=udf.secrets, target="context"):
+        if udf.is_async:
+            return await fn(**validated)
+        return fn(**validated)
+
+
+async def _call(udf: RegisteredUDF, args: dict[str, Any]) -> Any:
+    if udf.is_async:
+        return await udf.fn(**args)
+    return udf.fn(**args)
+
+
+@pytest.mark.parametrize("mode", ["legacy", "fast"])
+@pytest.mark.parametrize("key", list(CORE_UDF_ARGS))
+def test_udf_call_overhead(benchmark, key: str, mode: str):
+    udf = registry[key]
+    args = CORE_UDF_ARGS[key]
+    call = _legacy_call if mode == "legacy" else _call
+
+    async def run() -> list[Any]:
+        return [await call(udf, args) for _ in range(N_CALLS)]
+
+    benchmark.group = f"udf_call[{key}]"
+    benchmark.extra_info["n_calls"] = N_CALLS
+    results = benchmark(lambda: asyncio.run(run()))
+    assert len(results) == N_CALLS
@@ -0,0 +1,106 @@
+from tracecat.dsl.analysis import ActionAnalysis, AnalysisCache, definition_key
+from tracecat.dsl.common import ActionStatement, ForEachPolicy
+from tracecat.expressions import ExprContext
+
+
+def _task(**kwargs) -> ActionStatement:
+    return ActionStatement(
+        ref="lookup",
+        action="core.http_request",
+        args={
+            "url": "${{ INPUTS.base_url }}/ip/${{ var.ip }}",
+            "headers": {
+                "Authorization": "Bearer ${{ SECRETS.virustotal.API_KEY }}",
+                "Accept": "application/json",
+            },
+            "payload": ["static", "${{ ACTIONS.enrich.result.id }}"],
+        },
+        **kwargs,
+    )
+
+
+def test_action_analysis():
+    task = _task(
+        run_if="${{ FN.is_equal(TRIGGER.kind, 'alert') }}",
+        for_each="${{ for var.ip in ACTIONS.parse.result.ips }}",
+    )
+    analysis = ActionAnalysis.analyze(task)
+    assert analysis.secrets == ("virustotal.API_KEY",)
+    assert analysis.template_paths == [
+        ("url",),
+        ("headers", "Authorization"),
+        ("payload", 1),
+    ]
+    assert analysis.dependencies == {
+        ExprContext.ACTIONS: {"enrich", "parse"},
+        ExprContext.INPUTS: {"base_url"},
+        ExprContext.TRIGGER: {"kind"},
+    }
+    assert analysis.args_dependencies == {
+        ExprContext.ACTIONS: {"enrich"},
+        ExprContext.INPUTS: {"base_url"},
+        ExprContext.TRIGGER: set(),
+    }
+    # The loop isn't sharded, so only `run_if` is evaluated by the workflow
+    assert analysis.workflow_dependencies == {
+        ExprContext.ACTIONS: set(),
+        ExprContext.INPUTS: set(),
+        ExprContext.TRIGGER: {"kind"},
+    }
+    assert analysis.loop_vars == ("var.ip",)
+
+
+def test_sharded_loops_are_read_by_the_workflow():
+    task = _task(
+        for_each="${{ for var.ip in ACTIONS.parse.result.ips }}",
+        for_each_policy=ForEachPolicy(shard_size=100),
+    )
+    analysis = ActionAnalysis.analyze(task)
+    assert analysis.workflow_dependencies[ExprContext.ACTIONS] == {"parse"}
+
+
+def test_analysis_cache_hits_per_definition_version():
+    cache = AnalysisCache()
+    task = _task()
+    v1, v2 = definition_key("wf-123", 1), definition_key("wf-123", 2)
+
+    first = cache.get(v1, task)
+    assert not first.hit
+    # A fresh copy of the same statement, as deserialized by the next activity
+    second = cache.get(v1, task.model_copy(deep=True))
+    assert second.hit
+    assert second.analysis is first.analysis
+    assert second.time_saved > 0
+    assert not cache.get(v2, task).hit
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert stats["hit_rate"] == round(1 / 3, 4)
+    assert stats["time_saved_seconds"] > 0
+
+
+def test_analysis_cache_skips_runs_without_definition():
+    cache = AnalysisCache()
+    task = _task()
+    assert not cache.get(None, task).hit
+    assert not cache.get(None, task).hit
+    assert cache.stats()["size"] == 0
+
+
+def test_bound_skeleton_evaluates_fresh_args():
+    cache = AnalysisCache()
+    key = definition_key("wf-123", 1)
+    cache.get(key, _task())
+    task = _task()
+    skeleton = cache.get(key, task).analysis.skeleton.bind(task.args)
+    args = skeleton.evaluate(
+        {
+            ExprContext.INPUTS: {"base_url": "https://vt"},
+            ExprContext.ACTIONS: {"enrich": {"result": {"id": 7}}},
+            ExprContext.SECRETS: {"virustotal": {"API_KEY": "xyz"}},
+        },
+        exclude={ExprContext.LOCAL_VARS},
+    )
+    assert args["url"] == "https://vt/ip/${{ var.ip }}"
+    assert args["headers"]["Authorization"] == "Bearer xyz"
+    assert args["payload"] == ["static", 7]
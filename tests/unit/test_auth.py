@@ -1,6 +1,7 @@
 import os
 
 import pytest
+from cryptography.fernet import Fernet, InvalidToken
 from httpx import AsyncClient
 
 from tracecat.auth.clients import AuthenticatedAPIClient, AuthenticatedServiceClient
@@ -8,8 +9,10 @@ from tracecat.auth.credentials import (
     Role,
     decrypt,
     decrypt_object,
+    decrypt_objects,
     encrypt,
     encrypt_object,
+    rotate_encryption,
 )
 from tracecat.config import TRACECAT__API_URL
 from tracecat.contexts import ctx_role
@@ -33,6 +36,29 @@ def test_encrypt_decrypt_object():
     assert decrypted_obj == obj
 
 
+def test_decrypt_objects():
+    objs = [{"key": f"value-{i}"} for i in range(10)]
+    assert decrypt_objects([encrypt_object(obj) for obj in objs]) == objs
+    assert decrypt_objects([]) == []
+
+
+def test_encryption_key_rotation(monkeypatch):
+    old_key, new_key = Fernet.generate_key().decode(), Fernet.generate_key().decode()
+    monkeypatch.setenv("TRACECAT__DB_ENCRYPTION_KEY", old_key)
+    encrypted = encrypt("my_secret")
+
+    # Values encrypted with an older key can still be decrypted
+    monkeypatch.setenv("TRACECAT__DB_ENCRYPTION_KEY", f"{new_key},{old_key}")
+    assert decrypt(encrypted) == "my_secret"
+    rotated = rotate_encryption(encrypted)
+
+    # Once rotated, the old key can be dropped
+    monkeypatch.setenv("TRACECAT__DB_ENCRYPTION_KEY", new_key)
+    assert decrypt(rotated) == "my_secret"
+    with pytest.raises(InvalidToken):
+        decrypt(encrypted)
+
+
 @pytest.mark.asyncio
 async def test_authenticated_service_client():
     service_role = Role(
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+import pytest
+from pydantic import ValidationError
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter
+
+from tracecat.dsl._converter import (
+    COMPRESSED_ENCODING,
+    COMPRESSORS,
+    CompressionPayloadCodec,
+    PydanticORJSONPayloadConverter,
+    PydanticPayloadConverter,
+)
+from tracecat.dsl.common import ActionStatement, DSLError, DSLInput
+from tracecat.dsl.workflow import DSLContext, DSLRunArgs
+
+CONTEXT = {
+    "ACTIONS": {
+        f"action_{i}": {"result": {"status": "ok", "items": list(range(20))}}
+        for i in range(50)
+    },
+    "INPUTS": {"url": "https://example.com"},
+}
+
+
+def _converter(codec: CompressionPayloadCodec | None) -> DataConverter:
+    return DataConverter(
+        payload_converter_class=PydanticPayloadConverter, payload_codec=codec
+    )
+
+
+@pytest.mark.parametrize("codec", ["zstd", "lz4"])
+@pytest.mark.asyncio
+async def test_compression_roundtrip(codec: str):
+    converter = _converter(CompressionPayloadCodec(codec, threshold=1024))
+    uncompressed = _converter(None).payload_converter.to_payloads([CONTEXT])[0]
+
+    (payload,) = await converter.encode([CONTEXT])
+    assert payload.metadata["encoding"] == COMPRESSED_ENCODING
+    assert payload.metadata["compression"] == codec.encode()
+    assert payload.ByteSize() < uncompressed.ByteSize() / 4
+    assert await converter.decode([payload]) == [CONTEXT]
+
+
+@pytest.mark.asyncio
+async def test_small_payloads_are_not_compressed():
+    converter = _converter(CompressionPayloadCodec(threshold=1024))
+    (payload,) = await converter.encode([{"small": True}])
+    assert payload.metadata["encoding"] == b"json/plain"
+
+
+@pytest.mark.asyncio
+async def test_decodes_uncompressed_and_other_codecs():
+    # Histories written before compression, or with another codec, still decode
+    uncompressed = await _converter(None).encode([CONTEXT])
+    lz4_compressed = await _converter(CompressionPayloadCodec("lz4")).encode([CONTEXT])
+
+    converter = _converter(CompressionPayloadCodec("zstd"))
+    assert await converter.decode(uncompressed) == [CONTEXT]
+    assert await converter.decode(lz4_compressed) == [CONTEXT]
+
+
+@pytest.mark.parametrize("codec", ["zstd", "lz4"])
+def test_compression_across_threads(codec: str):
+    compress, decompress = COMPRESSORS[codec]
+    data = [orjson.dumps({"thread": i, "data": "x" * 100_000}) for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda d: decompress(compress(d)), data * 8))
+    assert results == data * 8
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        CompressionPayloadCodec("gzip")
+
+
+def _dsl_run_args(n_actions: int) -> DSLRunArgs:
+    actions = [
+        ActionStatement(
+            ref=f"a_{i}",
+            action="core.transform.forward",
+            args={"value": f"${{{{ ACTIONS.a_{i - 1}.result }}}}"},
+            depends_on=[f"a_{i - 1}"] if i else [],
+            run_if="${{ True }}",
+        )
+        for i in range(n_actions)
+    ]
+    dsl = DSLInput(title="t", description="d", entrypoint="a_0", actions=actions)
+    return DSLRunArgs(
+        dsl=dsl,
+        role={"type": "service", "service_id": "tracecat-runner"},
+        wf_id="wf-" + "0" * 32,
+    )
+
+
+def test_from_payload_roundtrip():
+    converter = PydanticORJSONPayloadConverter()
+    args = _dsl_run_args(10)
+    payload = converter.to_payload(args)
+    assert converter.from_payload(payload, DSLRunArgs) == args
+
+    context = DSLContext(INPUTS={"a": 1}, ACTIONS={}, TRIGGER={})
+    payload = converter.to_payload(context)
+    assert converter.from_payload(payload, DSLContext) == context
+    assert converter.from_payload(payload) == context
+
+
+def test_from_payload_only_trusts_internal_types():
+    converter = PydanticORJSONPayloadConverter()
+    data = _dsl_run_args(2).model_dump(mode="json")
+    data["dsl"]["entrypoint"] = "missing"
+    payload = Payload(data=orjson.dumps(data))
+    # DSLRunArgs is only serialized by us, so DSL checks are skipped
+    assert converter.from_payload(payload, DSLRunArgs).dsl.entrypoint == "missing"
+    # Everything else is fully validated
+    payload = Payload(data=orjson.dumps(data["dsl"]))
+    with pytest.raises((DSLError, ValidationError)):
+        converter.from_payload(payload, DSLInput)
@@ -0,0 +1,21 @@
+from sqlalchemy import create_engine, inspect, text
+
+from tracecat.db.migrations import upgrade_db_schema
+
+
+def test_upgrade_adds_missing_columns():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # A user table from before `secrets_version` was added
+        conn.execute(text('CREATE TABLE "user" (id TEXT PRIMARY KEY, tier TEXT)'))
+        conn.execute(text("INSERT INTO \"user\" VALUES ('user-1', 'free')"))
+
+    upgrade_db_schema(engine)
+    # Upgrades are idempotent
+    upgrade_db_schema(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("user")}
+    assert "secrets_version" in columns
+    with engine.connect() as conn:
+        version = conn.execute(text('SELECT secrets_version FROM "user"')).scalar()
+    assert version == 0
@@ -0,0 +1,120 @@
+import os
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from tracecat.contexts import ctx_secrets
+from tracecat.executors import UDFExecutors
+from tracecat.registry import registry
+
+
+@pytest.fixture
+def executors(monkeypatch):
+    executors = UDFExecutors(io_threads=2, cpu_threads=1, processes=1)
+    monkeypatch.setattr("tracecat.registry.executors", executors)
+    yield executors
+    executors.shutdown()
+
+
+@pytest.fixture
+def process_udf_module(tmp_path, monkeypatch):
+    """A module with a process UDF, importable by child processes."""
+    (tmp_path / "process_udfs.py").write_text(
+        textwrap.dedent(
+            """
+            import os
+
+            from tracecat import secrets
+            from tracecat.registry import registry
+
+            @registry.register(
+                description="Where am I", namespace="test_process", placement="process"
+            )
+            def whereami(key: str) -> tuple[int, str | None]:
+                return os.getpid(), secrets.get(key)
+            """
+        )
+    )
+    monkeypatch.syspath_prepend(tmp_path)
+    yield "process_udfs"
+    registry.store.pop("test_process.whereami", None)
+    sys.modules.pop("process_udfs", None)
+
+
+@pytest.mark.asyncio
+async def test_sync_udfs_run_in_their_placements_threads(executors):
+    @registry.register(description="Thread name", namespace="test_placement")
+    def io_udf() -> str:
+        return threading.current_thread().name
+
+    @registry.register(
+        description="Thread name", namespace="test_placement", placement="cpu"
+    )
+    def cpu_udf(key: str) -> tuple[str, str | None]:
+        return threading.current_thread().name, ctx_secrets.get()[key]
+
+    try:
+        io_thread = await registry["test_placement.io_udf"].run_async({})
+        assert io_thread.startswith("tracecat-io")
+
+        # Context variables, e.g. secrets, are visible in the executor's threads
+        token = ctx_secrets.set({"KEY": "value"})
+        try:
+            cpu_thread, value = await registry["test_placement.cpu_udf"].run_async(
+                {"key": "KEY"}
+            )
+        finally:
+            ctx_secrets.reset(token)
+        assert cpu_thread.startswith("tracecat-cpu")
+        assert value == "value"
+    finally:
+        registry.store.pop("test_placement.io_udf", None)
+        registry.store.pop("test_placement.cpu_udf", None)
+
+
+@pytest.mark.asyncio
+async def test_process_udfs_run_in_a_child_process(executors, process_udf_module):
+    __import__(process_udf_module)
+    udf = registry["test_process.whereami"]
+
+    pid, value = await udf.run_async({"key": "KEY"})
+    assert pid != os.getpid()
+    assert value is None
+
+    # Secret keys are sent with the args, and don't leak into the next call
+    pid, value = await executors.run_in_process(
+        process_udf_module, udf.key, {"key": "KEY"}, secrets={"KEY": "value"}
+    )
+    assert value == "value"
+    _, value = await executors.run_in_process(
+        process_udf_module, udf.key, {"key": "KEY"}
+    )
+    assert value is None
+
+
+@pytest.mark.asyncio
+async def test_process_udfs_run_on_cpu_threads_without_processes(
+    monkeypatch, process_udf_module
+):
+    executors = UDFExecutors(io_threads=1, cpu_threads=1, processes=0)
+    monkeypatch.setattr("tracecat.registry.executors", executors)
+    __import__(process_udf_module)
+    try:
+        pid, _ = await registry["test_process.whereami"].run_async({"key": "KEY"})
+        assert pid == os.getpid()
+    finally:
+        executors.shutdown()
+
+
+def test_async_udfs_cant_have_a_placement():
+    with pytest.raises(ValueError):
+
+        @registry.register(
+            description="Async", namespace="test_placement", placement="cpu"
+        )
+        async def async_udf() -> None:
+            pass
+
+    assert "test_placement.async_udf" not in registry
@@ -1,5 +1,6 @@
 import os
 
+import jsonpath_ng
 import pytest
 import respx
 from fastapi.testclient import TestClient
@@ -11,14 +12,23 @@ from tracecat.db.helpers import batch_get_secrets, format_secrets_as_json
 from tracecat.db.schemas import Secret
 from tracecat.expressions.engine import (
     ExprContext,
-    ExpressionParser,
+    IterableExpr,
     TemplateExpression,
+    TracecatStopParser,
+    compile_expression,
     eval_jsonpath,
 )
 from tracecat.expressions.eval import (
+    TemplateSkeleton,
     eval_templated_object,
+    extract_templated_dependencies,
     extract_templated_secrets,
 )
+from tracecat.expressions.functions import (
+    _COLUMNAR_FUNCTIONS,
+    FUNCTION_MAPPING,
+    columnar_map,
+)
 from tracecat.expressions.patterns import FULL_TEMPLATE
 from tracecat.types.exceptions import TracecatExpressionError
 from tracecat.types.secrets import SecretKeyValue
@@ -60,6 +70,48 @@ def test_eval_jsonpath():
         assert "Operand has no path" in str(e.value)
 
 
+@pytest.mark.parametrize(
+    "path",
+    [
+        "a.b",
+        "a.b[0].c",
+        "a.b[1].c",
+        "a.b[5].c",
+        "a.b.c",
+        "a.s[0]",
+        "a.s.c",
+        "a.n",
+        "a.n.x",
+        "$.a.s",
+        "x-y.@z",
+        "a.missing",
+        "a.b[*].c",
+        "a.b[0:1]",
+        "$..c",
+    ],
+)
+def test_eval_jsonpath_matches_jsonpath_ng(path):
+    """Simple paths skip jsonpath_ng, but must behave exactly like it."""
+    operand = {
+        "a": {"b": [{"c": 1}, {"c": None}], "s": "str", "n": None},
+        "x-y": {"@z": 3},
+    }
+    matches = [found.value for found in jsonpath_ng.parse(path).find(operand)]
+    if not matches:
+        with pytest.raises(TracecatExpressionError, match="Operand has no path"):
+            eval_jsonpath(path, operand)
+    else:
+        expected = matches[0] if len(matches) == 1 else matches
+        assert eval_jsonpath(path, operand) == expected
+
+
+def test_eval_jsonpath_invalid():
+    with pytest.raises(TracecatExpressionError, match="Invalid jsonpath"):
+        eval_jsonpath("a.where", {"a": {"where": 1}})
+    with pytest.raises(TracecatExpressionError, match="Invalid jsonpath"):
+        eval_jsonpath("a.[", {"a": 1})
+
+
 @pytest.mark.parametrize(
     "expression, expected_result",
     [
@@ -170,6 +222,23 @@ def test_find_secrets():
     assert sorted(extract_templated_secrets(mock_templated_kwargs)) == sorted(expected)
 
 
+def test_find_dependencies():
+    templated_obj = {
+        "url": "https://example.com/${{ INPUTS.path }}?q=${{ ACTIONS.a.result }}",
+        "items": [
+            "${{ FN.add(ACTIONS.b.result.value, TRIGGER.count) -> int }}",
+            "plain text mentioning ACTIONS.not_a_template",
+            "${{ var.item }}",
+        ],
+        "for_each": "${{ for var.item in ACTIONS.c.result }}",
+    }
+    assert extract_templated_dependencies(templated_obj) == {
+        ExprContext.ACTIONS: {"a", "b", "c"},
+        ExprContext.INPUTS: {"path"},
+        ExprContext.TRIGGER: {"count"},
+    }
+
+
 @pytest.mark.asyncio
 async def test_evaluate_templated_secret(mock_api, auth_sandbox):
     # Health check
@@ -233,6 +302,7 @@ async def test_evaluate_templated_secret(mock_api, auth_sandbox):
     base_secrets_url = f"{config.TRACECAT__API_URL}/secrets"
     with respx.mock:
         # Mock workflow getter from API side
+        secrets = []
         for secret_name, secret_keys in TEST_SECRETS.items():
             secret = Secret(
                 type="custom",
@@ -240,14 +310,12 @@ async def test_evaluate_templated_secret(mock_api, auth_sandbox):
                 owner_id="test_user_id",
             )
             secret.keys = secret_keys  # Encrypt the secret
+            secrets.append(secret.model_dump(mode="json"))
 
-            # Mock hitting get secrets endpoint
-            respx.get(f"{base_secrets_url}/{secret_name}").mock(
-                return_value=Response(
-                    200,
-                    json=secret.model_dump(mode="json"),
-                )
-            )
+        # Mock hitting batch get secrets endpoint
+        route = respx.post(f"{base_secrets_url}/batch").mock(
+            return_value=Response(200, json=secrets)
+        )
 
         # Start test
         secret_paths = extract_templated_secrets(mock_templated_kwargs)
@@ -256,6 +324,7 @@ async def test_evaluate_templated_secret(mock_api, auth_sandbox):
         secret_ctx = {ExprContext.SECRETS: format_secrets_as_json(secrets)}
         actual = eval_templated_object(obj=mock_templated_kwargs, operand=secret_ctx)
     assert actual == exptected
+    assert route.call_count == 1
 
 
 def test_eval_templated_object():
@@ -405,90 +474,230 @@ def test_eval_templated_object_inline_fails_if_not_str():
     assert actual2 == "   42 3   "
 
 
+def test_template_skeleton_shares_untemplated_subtrees():
+    args = {
+        "url": "https://example.com/${{ var.item.id }}",
+        "headers": {"Accept": "application/json", "X-Token": "abc"},
+        "body": {
+            "static": [{"a": 1}, {"b": 2}],
+            "items": ["fixed", "${{ var.item.name }}"],
+        },
+        "count": 3,
+    }
+    skeleton = TemplateSkeleton.compile(args)
+    for i in range(3):
+        item = {"id": i, "name": f"item-{i}"}
+        result = skeleton.evaluate({ExprContext.LOCAL_VARS: {"item": item}})
+        assert result == {
+            **args,
+            "url": f"https://example.com/{i}",
+            "body": {
+                "static": args["body"]["static"],
+                "items": ["fixed", item["name"]],
+            },
+        }
+        # Only the containers along templated paths are copied
+        assert result is not args
+        assert result["body"] is not args["body"]
+        assert result["headers"] is args["headers"]
+        assert result["body"]["static"] is args["body"]["static"]
+    # The original object is left untouched
+    assert args["body"]["items"] == ["fixed", "${{ var.item.name }}"]
+
+
+def test_template_skeleton_without_templates():
+    args = {"a": [1, {"b": "plain"}], "c": None}
+    assert TemplateSkeleton.compile(args).evaluate({}) is args
+
+
+def test_template_skeleton_defers_errors():
+    skeleton = TemplateSkeleton.compile({"bad": "${{ ACTIONS.missing.result }}"})
+    with pytest.raises(TracecatExpressionError):
+        skeleton.evaluate({ExprContext.ACTIONS: {}})
+
+
 @pytest.mark.parametrize(
-    "expr, expected",
+    "name, args",
     [
-        # Action expressions
-        ("ACTIONS.action_test.bar -> str", "1"),
-        ("str(ACTIONS.action_test.bar)", "1"),
-        ("ACTIONS.action_test.bar", 1),
-        ("       ACTIONS.action_test.baz    ", 2),
-        ("ACTIONS.action_test", {"bar": 1, "baz": 2}),
-        ("   ACTIONS.action_test", {"bar": 1, "baz": 2}),
-        # Secret expressions
-        ("SECRETS.secret_test.KEY", "SECRET"),
-        ("   SECRETS.secret_test.KEY    ", "SECRET"),
-        # Function expressions
-        ("FN.concat(ENV.item, '5')", "ITEM5"),
-        ("FN.add(5, 2)", 7),
-        ("  FN.is_null(None)   ", True),
-        ("FN.contains('a', INPUTS.my.module.items)", True),
-        ("FN.length([1, 2, 3])", 3),
-        ("FN.join(['A', 'B', 'C'], ',')", "A,B,C"),
-        ("FN.join(['A', 'B', 'C'], '@')", "A@B@C"),
-        ("FN.contains('A', ['A', 'B', 'C'])", True),
-        ("FN.format('Formatted: {} !', 'yay')", "Formatted: yay !"),
-        (
-            "FN.format.map('Hey {}!', ['Alice', 'Bob', 'Charlie'])",
-            ["Hey Alice!", "Hey Bob!", "Hey Charlie!"],
-        ),
-        (
-            "FN.format.map('Hello, {}! You are {}.', ['Alice', 'Bob', 'Charlie'], INPUTS.adjectives)",
-            [
-                "Hello, Alice! You are cool.",
-                "Hello, Bob! You are awesome.",
-                "Hello, Charlie! You are happy.",
-            ],
-        ),
-        # Ternary expressions
-        (
-            "'It contains 1' if FN.contains(1, INPUTS.list) else 'it does not contain 1'",
-            "It contains 1",
-        ),
-        # Typecast expressions
-        ("int(5)", 5),
-        ("float(5.0)", 5.0),
-        ("str('hello')", "hello"),
-        # Literals
-        ("'hello'", "hello"),
-        ("True", True),
-        ("False", False),
-        ("None", None),
-        ("5", 5),
-        ("5.0", 5.0),
-        ("5000", 5000),
-        ("'500'", "500"),
-        ("bool(True)", True),
-        ("bool(1)", True),
-        ("[1, 2, 3]", [1, 2, 3]),
+        ("regex_match", ("a.*", ["alpha", "beta", "", "ALPHA 22"])),
+        ("regex_match", ("[0-9]+", ["1a", "a1", "", "22"])),
+        ("regex_not_match", ("[a-z]+-[0-9]", ["gamma-1", "x.y", "beta-"])),
+        ("regex_match", ("(ab|a)c?|[^x]{2,3}?", ["abc", "ac", "yz", "x", "\n\n"])),
+        # Syntax that Rust reads differently from Python
+        ("regex_match", ("[a[b]]", ["[]", "a]", "b", "[b]"])),
+        ("regex_match", ("x{ 2}", ["x{ 2}", "xx", "x"])),
+        ("regex_match", (r"a\.b#c \\", ["a.b#c \\", "axb#c \\", "a.b"])),
+        ("greater_than", ([1, -2, 3], 0)),
+        ("less_than", (0.5, [0.1, 0.5, 2.5])),
+        ("is_equal", ([1, 2, 3], [1.0, 2.5, 3.0])),
+        ("not_equal", (["a", "", "b"], "")),
+        ("add", ([1, 2, 3], 1.5)),
+        ("sub", (3, [1, 2, 3])),
+        ("mul", ([1.5, 2.5], [2, 4])),
+        ("div", ([1, 2, 3], [2, 4, 8])),
+        # Polars divides by a scalar with its reciprocal, which rounds differently
+        ("div", ([5, 7, 10, -4], 3)),
+        ("div", ([5.5, 0.1, 7.0], 3)),
+        ("div", ([5, 7, 10], 0.3)),
+        ("div", (3, [5, 7, 9])),
     ],
 )
-def test_expression_parser(expr, expected):
-    context = {
-        ExprContext.ACTIONS: {
-            "action_test": {
-                "bar": 1,
-                "baz": 2,
-            },
+def test_columnar_map_matches_scalar_map(name, args, monkeypatch):
+    fn = FUNCTION_MAPPING[name]
+    kernel, kinds = _COLUMNAR_FUNCTIONS[name]
+    monkeypatch.setattr(config, "TRACECAT__FN_COLUMNAR_MIN_SIZE", 1_000_000)
+    expected = fn.map(*args)
+    monkeypatch.setattr(config, "TRACECAT__FN_COLUMNAR_MIN_SIZE", 1)
+    result = columnar_map(kernel, kinds, args)
+    assert result == expected
+    assert [type(value) for value in result] == [type(value) for value in expected]
+
+
+@pytest.mark.parametrize(
+    "name, args",
+    [
+        # Mixed types
+        ("greater_than", ([1, 2.5, 3], 0)),
+        ("is_equal", (["a", "b"], 1)),
+        ("add", ([1, True], 1)),
+        # Python ints are unbounded
+        ("add", ([2**40, 1], 1)),
+        # Division by zero raises
+        ("div", ([1, 2], [1, 0])),
+        # NaN compares differently in Polars
+        ("less_than", ([float("nan"), 1.0], 0.5)),
+        # Regex syntax that differs between Python and Rust
+        ("regex_match", (r"a$", ["a\n", "b"])),
+        ("regex_match", (r"\w+", ["a", "b"])),
+        ("regex_match", (r"\d+", ["1", "b"])),
+        ("regex_match", ("(?i)a", ["A", "b"])),
+        ("regex_match", ("a(?=b)", ["ab", "a"])),
+        ("regex_match", ("a{1001}", ["a", "b"])),
+        # Different lengths are truncated to the shortest
+        ("add", ([1, 2, 3], [1, 2])),
+    ],
+)
+def test_columnar_map_falls_back(name, args, monkeypatch):
+    monkeypatch.setattr(config, "TRACECAT__FN_COLUMNAR_MIN_SIZE", 1)
+    assert columnar_map(*_COLUMNAR_FUNCTIONS[name], args) is None
+
+
+EXPRESSION_CASES = [
+    # Action expressions
+    ("ACTIONS.action_test.bar -> str", "1"),
+    ("str(ACTIONS.action_test.bar)", "1"),
+    ("ACTIONS.action_test.bar", 1),
+    ("       ACTIONS.action_test.baz    ", 2),
+    ("ACTIONS.action_test", {"bar": 1, "baz": 2}),
+    ("   ACTIONS.action_test", {"bar": 1, "baz": 2}),
+    # Secret expressions
+    ("SECRETS.secret_test.KEY", "SECRET"),
+    ("   SECRETS.secret_test.KEY    ", "SECRET"),
+    # Function expressions
+    ("FN.concat(ENV.item, '5')", "ITEM5"),
+    ("FN.add(5, 2)", 7),
+    ("  FN.is_null(None)   ", True),
+    ("FN.contains('a', INPUTS.my.module.items)", True),
+    ("FN.length([1, 2, 3])", 3),
+    ("FN.join(['A', 'B', 'C'], ',')", "A,B,C"),
+    ("FN.join(['A', 'B', 'C'], '@')", "A@B@C"),
+    ("FN.contains('A', ['A', 'B', 'C'])", True),
+    ("FN.format('Formatted: {} !', 'yay')", "Formatted: yay !"),
+    (
+        "FN.format.map('Hey {}!', ['Alice', 'Bob', 'Charlie'])",
+        ["Hey Alice!", "Hey Bob!", "Hey Charlie!"],
+    ),
+    (
+        "FN.format.map('Hello, {}! You are {}.', ['Alice', 'Bob', 'Charlie'], INPUTS.adjectives)",
+        [
+            "Hello, Alice! You are cool.",
+            "Hello, Bob! You are awesome.",
+            "Hello, Charlie! You are happy.",
+        ],
+    ),
+    # Ternary expressions
+    (
+        "'It contains 1' if FN.contains(1, INPUTS.list) else 'it does not contain 1'",
+        "It contains 1",
+    ),
+    # Typecast expressions
+    ("int(5)", 5),
+    ("float(5.0)", 5.0),
+    ("str('hello')", "hello"),
+    # Literals
+    ("'hello'", "hello"),
+    ("True", True),
+    ("False", False),
+    ("None", None),
+    ("5", 5),
+    ("5.0", 5.0),
+    ("5000", 5000),
+    ("'500'", "500"),
+    ("bool(True)", True),
+    ("bool(1)", True),
+    ("[1, 2, 3]", [1, 2, 3]),
+]
+
+
+EXPRESSION_CONTEXT = {
+    ExprContext.ACTIONS: {
+        "action_test": {
+            "bar": 1,
+            "baz": 2,
         },
-        ExprContext.SECRETS: {
-            "secret_test": {
-                "KEY": "SECRET",
-            },
+    },
+    ExprContext.SECRETS: {
+        "secret_test": {
+            "KEY": "SECRET",
         },
-        ExprContext.INPUTS: {
-            "list": [1, 2, 3],
-            "my": {
-                "module": {
-                    "items": ["a", "b", "c"],
-                },
+    },
+    ExprContext.INPUTS: {
+        "list": [1, 2, 3],
+        "my": {
+            "module": {
+                "items": ["a", "b", "c"],
             },
-            "adjectives": ["cool", "awesome", "happy"],
-        },
-        ExprContext.ENV: {
-            "item": "ITEM",
-            "var": "VAR",
         },
+        "adjectives": ["cool", "awesome", "happy"],
+    },
+    ExprContext.ENV: {
+        "item": "ITEM",
+        "var": "VAR",
+    },
+}
+
+
+@pytest.mark.parametrize("expr, expected", EXPRESSION_CASES)
+def test_compiled_expression(expr, expected):
+    assert compile_expression(expr).evaluate(EXPRESSION_CONTEXT) == expected
+
+
+def test_compiled_expression_exclusion():
+    context = {
+        ExprContext.INPUTS: {"list": [1, 2, 3]},
+        ExprContext.SECRETS: {"key": "@@@"},
     }
-    parser = ExpressionParser(context=context)
-    assert parser.parse_expr(expr) == expected
+    excluded = {ExprContext.SECRETS}
+    for expr, expected in [
+        ("SECRETS.key", "${{ SECRETS.key }}"),
+        ("FN.concat(SECRETS.key, 'x')", "${{ FN.concat(SECRETS.key, 'x') }}"),
+        # Typecasts and ternaries stop at their own subexpressions
+        ("'yes' if SECRETS.key else 'no'", "yes"),
+    ]:
+        assert compile_expression(expr).evaluate(context, excluded=excluded) == expected
+
+    with pytest.raises(TracecatStopParser):
+        compile_expression("SECRETS.key").evaluate(
+            context, excluded=excluded, raise_on_stop=True
+        )
+
+
+def test_compiled_expression_is_cached():
+    context = {ExprContext.INPUTS: {"list": [1, 2, 3]}}
+    template = "${{ for var.x in INPUTS.list }}"
+    compile_expression.cache_clear()
+    for _ in range(10):
+        result = TemplateExpression(template, operand=context).result()
+        assert result == IterableExpr("var.x", [1, 2, 3])
+    info = compile_expression.cache_info()
+    assert (info.misses, info.hits) == (1, 9)
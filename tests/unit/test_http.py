@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from tracecat.http import HTTPClientPool
+
+
+@pytest.fixture
+def pool():
+    return HTTPClientPool(http2=False)
+
+
+@pytest.mark.asyncio
+async def test_clients_are_pooled_by_base_url_and_auth_scope(pool):
+    pool.open()
+    client = pool.get("https://vendor.test", headers={"x-apikey": "alice"})
+    assert pool.get("https://vendor.test", headers={"x-apikey": "alice"}) is client
+    # Different credentials or base URLs never share a client
+    assert pool.get("https://vendor.test", headers={"x-apikey": "bob"}) is not client
+    assert pool.get("https://vendor.test", params={"key": "alice"}) is not client
+    assert pool.get("https://other.test", headers={"x-apikey": "alice"}) is not client
+    assert pool.stats() == {"hits": 1, "misses": 4, "unpooled": 0, "size": 4}
+    await pool.aclose()
+    assert pool.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pooled_clients_outlive_their_users(pool):
+    pool.open()
+    with respx.mock:
+        respx.get("https://vendor.test/ip").mock(
+            return_value=httpx.Response(
+                200, json={"ok": True}, headers={"Set-Cookie": "session=alice"}
+            )
+        )
+        async with pool.get("https://vendor.test") as client:
+            response = await client.get("/ip")
+        assert response.json() == {"ok": True}
+
+        # Closing a pooled client is a no-op, and it never stores cookies
+        async with pool.get("https://vendor.test") as same_client:
+            assert same_client is client
+            await same_client.get("/ip")
+        assert not client.is_closed
+        assert not client.cookies
+
+    await pool.aclose()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_evicted_clients_are_closed_after_grace():
+    pool = HTTPClientPool(http2=False, maxsize=1, grace=0)
+    pool.open()
+    evicted = pool.get("https://vendor.test")
+    client = pool.get("https://other.test")
+    assert pool.stats()["size"] == 1
+    assert not evicted.is_closed
+    await asyncio.sleep(0.01)
+    assert evicted.is_closed
+    assert not client.is_closed
+    await pool.aclose()
+
+
+def test_clients_arent_pooled_on_other_loops(pool):
+    """Short-lived loops, e.g. from `asyncio.run` in a sync UDF, get clients
+    that are closed with the caller's `async with` block."""
+
+    async def get() -> httpx.AsyncClient:
+        async with pool.get("https://vendor.test") as client:
+            assert pool.get("https://vendor.test") is not client
+        return client
+
+    client = asyncio.run(get())
+    assert client.is_closed
+    assert pool.stats() == {"hits": 0, "misses": 0, "unpooled": 2, "size": 0}
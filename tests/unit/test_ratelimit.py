@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+
+from tracecat.auth.credentials import Role
+from tracecat.ratelimit import (
+    LocalRateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RateLimitTimeoutError,
+    load_overrides,
+    refund_token,
+    take_token,
+)
+from tracecat.registry import registry
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock) -> RateLimiter:
+    return RateLimiter(LocalRateLimitBackend(clock), sleep=clock.sleep)
+
+
+def _role(user_id: str) -> Role:
+    return Role(type="service", user_id=user_id, service_id="tracecat-runner")
+
+
+def test_take_token_reserves_tokens_ahead():
+    tokens, wait = take_token(1, 0, 0, rate=2, capacity=2)
+    assert (tokens, wait) == (0, 0)
+    tokens, wait = take_token(tokens, 0, 0, rate=2, capacity=2)
+    assert (tokens, wait) == (-1, 0.5)
+    # The bucket refills at `rate`, up to `capacity`
+    tokens, wait = take_token(tokens, 0, 10, rate=2, capacity=2)
+    assert (tokens, wait) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_calls_wait_for_their_token(clock, limiter):
+    limit = RateLimit(key="vendor", requests_per_second=2, burst=2)
+    role = _role("alice")
+    for _ in range(5):
+        async with limiter.limit(limit, role):
+            pass
+    # The burst runs right away, then calls are spaced 0.5s apart
+    assert clock.sleeps == [0.5, 1.0, 1.5]
+    assert limiter.stats()["waits"] == 3
+
+    # Other users have their own buckets
+    async with limiter.limit(limit, _role("bob")):
+        pass
+    assert len(clock.sleeps) == 3
+
+    # Once the bucket has refilled, calls run right away again
+    clock.now += 10
+    async with limiter.limit(limit, role):
+        pass
+    assert len(clock.sleeps) == 3
+
+
+def test_refund_token():
+    assert refund_token(-1, capacity=2) == 0
+    assert refund_token(2, capacity=2) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waits_refund_their_token(clock):
+    hang = True
+
+    async def sleep(seconds: float) -> None:
+        clock.sleeps.append(seconds)
+        if hang:
+            await asyncio.Future()
+
+    limiter = RateLimiter(LocalRateLimitBackend(clock), sleep=sleep)
+    limit = RateLimit(key="vendor", requests_per_second=10, burst=1)
+    role = _role("alice")
+
+    async def call() -> None:
+        async with limiter.limit(limit, role):
+            pass
+
+    await call()
+    # The second call waits for its token, and is cancelled while it waits
+    task = asyncio.create_task(call())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert limiter.stats()["refunds"] == 1
+
+    # The next call only waits for its own token, not the cancelled one's
+    hang = False
+    await call()
+    assert clock.sleeps == [0.1, 0.1]
+
+
+@pytest.mark.asyncio
+async def test_waits_never_outlast_the_activity(clock):
+    time_left = 10.0
+    limiter = RateLimiter(
+        LocalRateLimitBackend(clock), sleep=clock.sleep, time_left=lambda: time_left
+    )
+    limit = RateLimit(key="vendor", requests_per_second=0.5, burst=1)
+    role = _role("alice")
+    for _ in range(5):
+        async with limiter.limit(limit, role):
+            pass
+    assert clock.sleeps == [2.0, 4.0, 6.0, 8.0]
+
+    # The next token is due in 10s, when the activity times out
+    with pytest.raises(RateLimitTimeoutError):
+        async with limiter.limit(limit, role):
+            pass
+    # The token was put back, so there's room once the activity has more time
+    time_left = 60.0
+    async with limiter.limit(limit, role):
+        pass
+    assert clock.sleeps[-1] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_max_in_flight(limiter):
+    limit = RateLimit(key="vendor", max_in_flight=2)
+    in_flight = peak = 0
+
+    async def call() -> None:
+        nonlocal in_flight, peak
+        async with limiter.limit(limit, _role("alice")):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(call() for _ in range(10)))
+    assert peak == 2
+
+
+def test_overrides(clock):
+    overrides = load_overrides('{"vendor": {"requests_per_second": 10}}')
+    limiter = RateLimiter(LocalRateLimitBackend(clock), overrides=overrides)
+    limit = RateLimit(key="vendor", requests_per_second=1, max_in_flight=3)
+    assert limiter.resolve(limit) == RateLimit(
+        key="vendor", requests_per_second=10, max_in_flight=3
+    )
+    assert limiter.resolve(limit.model_copy(update={"key": "other"})).key == "other"
+    assert load_overrides(None) == {}
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_udf(monkeypatch, clock, limiter):
+    monkeypatch.setattr("tracecat.registry.rate_limiter", limiter)
+
+    @registry.register(
+        description="Call a vendor",
+        namespace="test_ratelimit",
+        rate_limit=RateLimit(key="vendor", requests_per_second=1, burst=1),
+    )
+    async def call_vendor(num: int) -> int:
+        return num
+
+    try:
+        udf = registry["test_ratelimit.call_vendor"]
+        results = [await udf.run_async({"num": i}) for i in range(3)]
+        assert results == [0, 1, 2]
+        assert clock.sleeps == [1.0, 2.0]
+    finally:
+        registry.store.pop("test_ratelimit.call_vendor", None)
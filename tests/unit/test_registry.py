@@ -1,6 +1,18 @@
+import sys
+import textwrap
+from typing import Any
+
+import orjson
 import pytest
+from pydantic import BaseModel
 
-from tracecat.registry import RegistryValidationError, _Registry, registry
+from tracecat.registry import (
+    RegistryValidationError,
+    _actions_fingerprint,
+    _Registry,
+    load_manifest,
+    registry,
+)
 
 
 def test_registry_is_singleton():
@@ -28,3 +40,108 @@ def test_udf_validate_args():
     udf.validate_args(num=1)
     with pytest.raises(RegistryValidationError):
         udf.validate_args(num="not a number")
+
+
+class _Point(BaseModel):
+    x: int
+    y: int
+
+
+@pytest.mark.asyncio
+async def test_udf_without_secrets_gets_validated_values(monkeypatch):
+    """UDFs without secrets are called without a sandbox. Model-typed args are
+    passed as dicts, in fresh containers."""
+
+    def no_sandbox(*args, **kwargs):
+        raise AssertionError("UDFs without secrets shouldn't open a sandbox")
+
+    monkeypatch.setattr("tracecat.registry.AuthSandbox", no_sandbox)
+
+    @registry.register(description="Move a point", namespace="test_fast_path")
+    async def move(point: _Point, tags: list[str], dx: int = 1) -> dict[str, Any]:
+        point["x"] += dx
+        tags.append("moved")
+        return {**point, "tags": tags}
+
+    try:
+        udf = registry.get("test_fast_path.move")
+        # Scalars are passed as is
+        assert udf.dumped_args == {"point", "tags"}
+        args = udf.validate_args(point={"x": "1", "y": 2}, tags=[])
+        assert args == {"point": {"x": 1, "y": 2}, "tags": [], "dx": 1}
+
+        point, tags = {"x": 1, "y": 2}, ["a"]
+        result = await udf.run_async({"point": point, "tags": tags})
+        assert result == {"x": 2, "y": 2, "tags": ["a", "moved"]}
+        # The UDF's mutations don't leak into the caller's args
+        assert point == {"x": 1, "y": 2}
+        assert tags == ["a"]
+    finally:
+        registry.store.pop("test_fast_path.move", None)
+
+
+@pytest.fixture
+def lazy_udf_manifest(tmp_path, monkeypatch):
+    """A manifest listing a UDF whose module hasn't been imported."""
+    (tmp_path / "lazy_udfs.py").write_text(
+        textwrap.dedent(
+            """
+            from tracecat.registry import registry
+
+            @registry.register(description="Add one", namespace="test_lazy")
+            def add_one(num: int) -> int:
+                return num + 1
+            """
+        )
+    )
+    monkeypatch.syspath_prepend(tmp_path)
+    schema = {
+        "args": {"properties": {"num": {"type": "integer"}}},
+        "rtype": {"type": "integer"},
+        "secrets": None,
+        "version": None,
+        "description": "Add one",
+        "namespace": "test_lazy",
+        "key": "test_lazy.add_one",
+        "metadata": {},
+    }
+    path = tmp_path / "registry_manifest.json"
+    path.write_bytes(
+        orjson.dumps(
+            {
+                "fingerprint": _actions_fingerprint(),
+                "udfs": {
+                    "test_lazy.add_one": {"module": "lazy_udfs", "schema": schema}
+                },
+            }
+        )
+    )
+    yield path
+    registry._manifest.pop("test_lazy.add_one", None)
+    registry.store.pop("test_lazy.add_one", None)
+    sys.modules.pop("lazy_udfs", None)
+
+
+def test_registry_imports_manifest_udfs_on_first_use(lazy_udf_manifest):
+    manifest = load_manifest(lazy_udf_manifest)
+    assert manifest is not None
+    registry._manifest.update(manifest)
+
+    # Listing UDFs and their schemas doesn't import them
+    assert "test_lazy.add_one" in registry
+    assert "test_lazy.add_one" in registry.keys
+    assert registry.get_schemas()["test_lazy.add_one"]["description"] == "Add one"
+    assert "lazy_udfs" not in sys.modules
+
+    udf = registry["test_lazy.add_one"]
+    assert "lazy_udfs" in sys.modules
+    assert udf.validate_args(num=1) == {"num": 1}
+    assert registry.get("test_lazy.add_one") is udf
+
+
+def test_stale_manifest_is_ignored(lazy_udf_manifest, tmp_path):
+    manifest = orjson.loads(lazy_udf_manifest.read_bytes())
+    manifest["fingerprint"] = "stale"
+    lazy_udf_manifest.write_bytes(orjson.dumps(manifest))
+    assert load_manifest(lazy_udf_manifest) is None
+    assert load_manifest(tmp_path / "missing.json") is None
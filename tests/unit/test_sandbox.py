@@ -1,14 +1,30 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import httpx
 import pytest
 import pytest_mock
 
+from tracecat import secrets
+from tracecat.auth.cache import SecretCache, secret_cache
 from tracecat.auth.credentials import Role
 from tracecat.auth.sandbox import AuthSandbox
 from tracecat.contexts import ctx_role
 from tracecat.db.schemas import Secret
+from tracecat.registry import registry
 from tracecat.types.secrets import SecretKeyValue
 
 
+@pytest.fixture(autouse=True)
+def clear_secret_cache():
+    secret_cache.clear()
+    yield
+    secret_cache.clear()
+
+
 @pytest.mark.asyncio
 async def test_auth_sandbox_with_secrets(mocker: pytest_mock.MockFixture, auth_sandbox):
     role = ctx_role.get()
@@ -19,22 +35,40 @@ async def test_auth_sandbox_with_secrets(mocker: pytest_mock.MockFixture, auth_s
     mock_secret.keys = mock_secret_keys
 
     mock_client = mocker.AsyncMock()
-    mock_client.get.return_value = httpx.Response(
-        200, content=mock_secret.model_dump_json().encode()
+    mock_client.post.return_value = httpx.Response(
+        200,
+        json=[mock_secret.model_dump(mode="json")],
+        headers={"X-Secrets-Version": "0"},
+        request=httpx.Request("POST", "/secrets/batch"),
     )
     mock_client.__aenter__.return_value = mock_client
     mock_client.__aexit__.return_value = None
 
     # Patch the AuthenticatedAPIClient to return the mock client
-    mocker.patch(
-        "tracecat.auth.sandbox.AuthenticatedAPIClient", return_value=mock_client
-    )
+    mocker.patch("tracecat.auth.cache.AuthenticatedAPIClient", return_value=mock_client)
 
-    async with AuthSandbox(secrets=["my_secret"], target="context") as sandbox:
+    async with AuthSandbox(
+        secrets=["my_secret.SECRET_KEY", "my_secret.OTHER_KEY"], target="context"
+    ) as sandbox:
         assert sandbox.secrets == {"my_secret": {"SECRET_KEY": "my_secret_key"}}
 
-    # Assert that the secrets API was called with the correct parameters
-    mock_client.get.assert_called_once_with("/secrets/my_secret")
+    # Assert that the secrets are fetched in one request, without duplicates
+    mock_client.post.assert_called_once_with(
+        "/secrets/batch", json={"names": ["my_secret"]}
+    )
+
+    # The secret is cached for the UDF's own sandbox
+    async with AuthSandbox(secrets=["my_secret.SECRET_KEY"]):
+        assert secrets.get("SECRET_KEY") == "my_secret_key"
+        assert "SECRET_KEY" not in os.environ
+    assert secrets.get("SECRET_KEY") is None
+    mock_client.post.assert_called_once()
+
+    # Setting secrets in the environment is opt-in
+    async with AuthSandbox(secrets=["my_secret.SECRET_KEY"], target="env"):
+        assert os.environ["SECRET_KEY"] == "my_secret_key"
+        assert secrets.get("SECRET_KEY") == "my_secret_key"
+    assert "SECRET_KEY" not in os.environ
 
 
 @pytest.mark.asyncio
@@ -44,3 +78,154 @@ async def test_auth_sandbox_without_secrets(auth_sandbox):
         assert sandbox._role == Role(
             type="service", user_id="test-tracecat-user", service_id="tracecat-testing"
         )
+
+
+class FakeSecretsAPI:
+    """Secrets API double that bumps the version on every rotation."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.version = 0
+        self.secrets: dict[str, Secret] = {}
+        self.fetched: list[list[str]] = []
+
+    def rotate(self, name: str, value: str):
+        secret = Secret(name=name, owner_id=self.user_id)
+        secret.keys = [SecretKeyValue(key="API_KEY", value=value)]
+        if name in self.secrets:
+            self.version += 1
+        self.secrets[name] = secret
+
+    async def fetch(self, role: Role, names: list[str]):
+        self.fetched.append(names)
+        return [self.secrets[name] for name in names], self.version
+
+
+def _value(secret: Secret) -> str:
+    return secret.keys[0].value.get_secret_value()
+
+
+@pytest.mark.asyncio
+async def test_secret_cache_hits_are_encrypted(auth_sandbox):
+    role = Role(type="service", user_id="alice", service_id="tracecat-testing")
+    api = FakeSecretsAPI(role.user_id)
+    api.rotate("github", "token-1")
+    cache = SecretCache(api.fetch, ttl=30)
+
+    for _ in range(3):
+        [secret] = await cache.get_many(role, ["github"])
+    assert api.fetched == [["github"]]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+    # Keys are only decrypted when they're read
+    assert secret.encrypted_keys
+    assert _value(secret) == "token-1"
+
+    # Entries are per user
+    other = Role(type="service", user_id="bob", service_id="tracecat-testing")
+    await cache.get_many(other, ["github"])
+    assert len(api.fetched) == 2
+
+
+@pytest.mark.asyncio
+async def test_secret_rotation_propagates_within_ttl(auth_sandbox):
+    role = Role(type="service", user_id="alice", service_id="tracecat-testing")
+    api = FakeSecretsAPI(role.user_id)
+    api.rotate("github", "token-1")
+    api.rotate("slack", "slack-1")
+    now = 0.0
+    cache = SecretCache(api.fetch, ttl=30, version_ttl=10, clock=lambda: now)
+
+    [github] = await cache.get_many(role, ["github"])
+    assert _value(github) == "token-1"
+
+    # Rotating bumps the version, which the next fetch for this user sees
+    api.rotate("github", "token-2")
+    now = 5.0
+    await cache.get_many(role, ["slack"])
+    assert cache.invalidations == 1
+    [github] = await cache.get_many(role, ["github"])
+    assert _value(github) == "token-2"
+    assert api.fetched == [["github"], ["slack"], ["github"]]
+
+    # When every lookup hits, the version is rechecked after `version_ttl`
+    api.rotate("github", "token-3")
+    now = 12.0
+    [github] = await cache.get_many(role, ["github"])
+    assert _value(github) == "token-2"
+    now = 16.0
+    [github] = await cache.get_many(role, ["github"])
+    assert _value(github) == "token-3"
+    assert api.fetched[3:] == [[], ["github"]]
+    assert cache.stats()["version_checks"] == 1
+
+
+def test_secret_cache_is_shared_by_threads(auth_sandbox):
+    """Sync UDFs resolve secrets in their own loops, in executor threads."""
+    api = FakeSecretsAPI("alice")
+    for i in range(20):
+        api.rotate(f"secret_{i}", f"value-{i}")
+    cache = SecretCache(api.fetch, ttl=30, version_ttl=0, maxsize=8)
+
+    def resolve(seed: int) -> None:
+        role = Role(type="service", user_id="alice", service_id="tracecat-testing")
+        rng = random.Random(seed)
+        for _ in range(50):
+            names = [f"secret_{rng.randrange(20)}" for _ in range(3)]
+            found = asyncio.run(cache.get_many(role, names))
+            assert [secret.name for secret in found] == list(dict.fromkeys(names))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(resolve, range(16)))
+    assert cache.stats()["size"] <= 8
+
+
+@pytest.fixture
+def scoped_udfs():
+    """UDFs that read the same secret key, before and after yielding."""
+
+    @registry.register(
+        description="Read a secret key", namespace="test_scope", secrets=["vt"]
+    )
+    async def read_key_async(delay: float) -> list[str | None]:
+        seen = [secrets.get("VT_API_KEY")]
+        await asyncio.sleep(delay)
+        return seen + [secrets.get("VT_API_KEY")]
+
+    @registry.register(
+        description="Read a secret key", namespace="test_scope", secrets=["vt"]
+    )
+    def read_key_sync(delay: float) -> list[str | None]:
+        seen = [secrets.get("VT_API_KEY")]
+        time.sleep(delay)
+        return seen + [secrets.get("VT_API_KEY")]
+
+    yield registry["test_scope.read_key_async"], registry["test_scope.read_key_sync"]
+    registry.store.pop("test_scope.read_key_async")
+    registry.store.pop("test_scope.read_key_sync")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_udfs_only_see_their_own_secrets(monkeypatch, scoped_udfs):
+    """Hundreds of UDFs for different tenants, with the same secret key."""
+
+    async def fetch(role: Role, names: list[str]):
+        secret = Secret(name="vt", owner_id=role.user_id)
+        secret.keys = [SecretKeyValue(key="VT_API_KEY", value=f"key-{role.user_id}")]
+        await asyncio.sleep(random.random() / 100)
+        return [secret], 0
+
+    monkeypatch.setattr(secret_cache, "_fetch", fetch)
+    rng = random.Random(0)
+
+    async def run(i: int) -> tuple[str, list[str | None]]:
+        tenant = f"tenant-{i % 25}"
+        ctx_role.set(Role(type="service", user_id=tenant, service_id="tracecat-runner"))
+        udf = scoped_udfs[i % 2]
+        return tenant, await udf.run_async({"delay": rng.random() / 100})
+
+    results = await asyncio.gather(*(run(i) for i in range(400)))
+    for tenant, seen in results:
+        assert seen == [f"key-{tenant}", f"key-{tenant}"]
+    assert "VT_API_KEY" not in os.environ
+    assert secrets.get("VT_API_KEY") is None
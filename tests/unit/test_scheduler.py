@@ -0,0 +1,136 @@
+"""Unit tests for the DSL scheduler.
+
+These run the scheduler directly with a fake executor, so no Temporal cluster
+is required.
+"""
+
+import asyncio
+
+import pytest
+
+from tracecat.dsl.common import ActionStatement, DSLConfig, DSLError, DSLInput
+from tracecat.dsl.workflow import DSLScheduler, StaticExecutionPlan, TaskMarker
+
+SCHEDULERS = ["dynamic", "static"]
+
+
+def _dsl(edges: dict[str, list[str]], scheduler: str = "dynamic") -> DSLInput:
+    actions = [
+        ActionStatement(ref=ref, action="core.transform.forward", depends_on=deps)
+        for ref, deps in edges.items()
+    ]
+    entrypoint = next(a.ref for a in actions if not a.depends_on)
+    return DSLInput(
+        title="test",
+        description="test",
+        entrypoint=entrypoint,
+        actions=actions,
+        config=DSLConfig(scheduler=scheduler),
+    )
+
+
+DIAMOND = {
+    "a": [],
+    "b": ["a"],
+    "c": ["a"],
+    "d": ["b", "c"],
+}
+
+
+@pytest.mark.parametrize("mode", SCHEDULERS)
+@pytest.mark.asyncio
+async def test_scheduler_respects_dependencies(mode: str):
+    dsl = _dsl(DIAMOND, mode)
+    order: list[str] = []
+
+    async def executor(task: ActionStatement) -> None:
+        await asyncio.sleep(0)
+        order.append(task.ref)
+
+    scheduler = DSLScheduler(activity_coro=executor, dsl=dsl)
+    await scheduler.start()
+
+    assert scheduler.completed_tasks == set(DIAMOND)
+    assert scheduler.running_tasks == {}
+    for ref, deps in DIAMOND.items():
+        assert all(order.index(dep) < order.index(ref) for dep in deps)
+
+
+@pytest.mark.parametrize("mode", SCHEDULERS)
+@pytest.mark.asyncio
+async def test_scheduler_returns_when_last_task_completes(mode: str):
+    dsl = _dsl({"a": [], "b": ["a"]}, mode)
+
+    async def executor(task: ActionStatement) -> None:
+        await asyncio.sleep(0.01)
+
+    # The previous implementation polled with a 1s timeout
+    await asyncio.wait_for(
+        DSLScheduler(activity_coro=executor, dsl=dsl).start(), timeout=0.5
+    )
+
+
+@pytest.mark.parametrize("mode", SCHEDULERS)
+@pytest.mark.asyncio
+async def test_scheduler_surfaces_task_exceptions(mode: str):
+    dsl = _dsl(DIAMOND, mode)
+    executed: list[str] = []
+
+    async def executor(task: ActionStatement) -> None:
+        if task.ref == "b":
+            raise ValueError("boom")
+        await asyncio.sleep(0)
+        executed.append(task.ref)
+
+    scheduler = DSLScheduler(activity_coro=executor, dsl=dsl)
+    with pytest.raises(ValueError, match="boom"):
+        await scheduler.start()
+    assert "b" in scheduler._task_exceptions
+    assert "d" not in executed
+
+
+@pytest.mark.parametrize("mode", SCHEDULERS)
+@pytest.mark.asyncio
+async def test_scheduler_propagates_skips(mode: str):
+    dsl = _dsl(DIAMOND, mode)
+
+    async def executor(task: ActionStatement) -> None:
+        if task.ref in ("b", "c"):
+            scheduler.mark_task(task.ref, TaskMarker.SKIP)
+
+    scheduler = DSLScheduler(activity_coro=executor, dsl=dsl)
+    await scheduler.start()
+    assert scheduler.marked_tasks.get("d") == TaskMarker.SKIP
+
+
+@pytest.mark.parametrize("mode", SCHEDULERS)
+@pytest.mark.asyncio
+async def test_scheduler_runs_joins_with_a_live_parent(mode: str):
+    dsl = _dsl({**DIAMOND, "e": ["b"]}, mode)
+    executed: list[str] = []
+
+    async def executor(task: ActionStatement) -> None:
+        if task.ref == "b":
+            scheduler.mark_task(task.ref, TaskMarker.SKIP)
+        elif scheduler.marked_tasks.get(task.ref) != TaskMarker.SKIP:
+            executed.append(task.ref)
+
+    scheduler = DSLScheduler(activity_coro=executor, dsl=dsl)
+    await scheduler.start()
+    # `d` still has `c`, but all of `e`'s parents were skipped
+    assert sorted(executed) == ["a", "c", "d"]
+    assert scheduler.marked_tasks.get("e") == TaskMarker.SKIP
+
+
+def test_static_plan_levels():
+    dsl = _dsl({**DIAMOND, "e": ["a"], "f": ["d", "e"]}, "static")
+    plan = StaticExecutionPlan.compile(dsl)
+    levels = [[plan.refs[i] for i in level] for level in plan.levels]
+    assert levels == [["a"], ["b", "c", "e"], ["d"], ["f"]]
+    assert plan.indegrees == (0, 1, 1, 2, 1, 2)
+
+
+def test_static_plan_rejects_cycles():
+    dsl = _dsl({"a": [], "b": ["a", "c"], "c": ["b"]}, "static")
+    with pytest.raises(DSLError):
+        StaticExecutionPlan.compile(dsl)
@@ -0,0 +1,100 @@
+import pytest
+
+from tracecat.expressions import ExprContext, TemplateExpression, eval_templated_object
+from tracecat.storage import (
+    LocalBlobStore,
+    is_blob_ref,
+    load_offloaded_results,
+    offload_result,
+)
+
+
+@pytest.fixture
+def blob_store(tmp_path, monkeypatch):
+    store = LocalBlobStore(tmp_path / "blobs")
+    monkeypatch.setattr("tracecat.storage.get_blob_store", lambda: store)
+    return store
+
+
+def test_offload_below_threshold_is_inline(blob_store):
+    value = {"small": True}
+    assert offload_result(value, threshold=1024, store=blob_store) is value
+    assert offload_result(value, threshold=0, store=blob_store) is value
+    assert not any(blob_store.root.glob("**/*"))
+
+
+def test_offload_is_content_addressed(blob_store):
+    value = [{"id": i, "name": f"finding-{i}"} for i in range(100)]
+    ref = offload_result(value, threshold=16, store=blob_store)
+    assert is_blob_ref(ref)
+    assert ref["typename"] == "list"
+    assert blob_store.load(ref) == value
+
+    # Identical results are only stored once
+    assert offload_result(list(value), threshold=16, store=blob_store) == ref
+    assert len([p for p in blob_store.root.glob("**/*") if p.is_file()]) == 1
+
+
+@pytest.mark.asyncio
+async def test_load_offloaded_results_copies_only_offloaded_actions(blob_store):
+    ref = blob_store.store({"items": [1, 2, 3]})
+    actions = {
+        "fetch": {"result": ref, "result_typename": "dict"},
+        "other": {"result": {"inline": True}, "result_typename": "dict"},
+    }
+    loaded = await load_offloaded_results(actions)
+    assert loaded["fetch"] == {
+        "result": {"items": [1, 2, 3]},
+        "result_typename": "dict",
+    }
+    # Inline results are left alone, and the actions aren't mutated
+    assert loaded["other"] is actions["other"]
+    assert actions["fetch"]["result"] == ref
+    assert await load_offloaded_results(loaded) is loaded
+
+
+@pytest.mark.asyncio
+async def test_expressions_dereference_loaded_results(blob_store):
+    findings = [{"id": i, "severity": i % 10} for i in range(1000)]
+    ref = offload_result(findings, threshold=1024, store=blob_store)
+    actions = {"list_findings": {"result": ref, "result_typename": "list"}}
+    context = {
+        ExprContext.ACTIONS: await load_offloaded_results(actions),
+        ExprContext.INPUTS: {},
+    }
+
+    expr = TemplateExpression("${{ ACTIONS.list_findings.result }}", operand=context)
+    assert expr.result() == findings
+
+    args = eval_templated_object(
+        {
+            "count": "${{ FN.length(ACTIONS.list_findings.result) }}",
+            "action": "${{ ACTIONS.list_findings }}",
+        },
+        operand=context,
+    )
+    assert args == {
+        "count": 1000,
+        "action": {"result": findings, "result_typename": "list"},
+    }
+
+
+def test_missing_local_blobs_explain_shared_volumes(blob_store):
+    ref = blob_store.store({"items": [1, 2, 3]})
+    for path in blob_store.root.glob("**/*"):
+        if path.is_file():
+            path.unlink()
+    with pytest.raises(FileNotFoundError, match="shared volume"):
+        LocalBlobStore(blob_store.root).load(ref)
+
+
+def test_expressions_never_load_blobs(blob_store, monkeypatch):
+    ref = blob_store.store({"items": [1, 2, 3]})
+
+    def get(digest: str) -> bytes:
+        raise AssertionError("Evaluation must not do I/O")
+
+    monkeypatch.setattr(blob_store, "get", get)
+    context = {ExprContext.ACTIONS: {"fetch": {"result": ref}}}
+    expr = TemplateExpression("${{ ACTIONS.fetch.result }}", operand=context)
+    assert expr.result() == ref
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from tracecat.dsl.client import TemporalClientManager
+
+
+class _FakeServiceClient:
+    def __init__(self):
+        self.healthy = True
+        self.checks = 0
+
+    async def check_health(self, **kwargs) -> bool:
+        self.checks += 1
+        if not self.healthy:
+            raise RuntimeError("Connection refused")
+        return True
+
+
+class _FakeClient:
+    def __init__(self):
+        self.service_client = _FakeServiceClient()
+
+
+@pytest.fixture
+def connect():
+    async def connect():
+        connect.n_calls += 1
+        await asyncio.sleep(0.01)
+        client = _FakeClient()
+        connect.clients.append(client)
+        return client
+
+    connect.n_calls = 0
+    connect.clients = []
+    return connect
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared(connect):
+    manager = TemporalClientManager(connect, health_check_interval=60)
+    clients = await asyncio.gather(*(manager.get() for _ in range(50)))
+    assert connect.n_calls == 1
+    assert all(client is clients[0] for client in clients)
+
+
+@pytest.mark.asyncio
+async def test_client_reconnects_when_unhealthy(connect):
+    manager = TemporalClientManager(connect, health_check_interval=0)
+    first = await manager.get()
+    assert await manager.get() is first
+    assert first.service_client.checks == 1
+
+    first.service_client.healthy = False
+    second = await manager.get()
+    assert second is not first
+    assert connect.n_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_client_invalidate(connect):
+    manager = TemporalClientManager(connect, health_check_interval=60)
+    first = await manager.get()
+    manager.invalidate()
+    assert await manager.get() is not first
@@ -18,14 +18,25 @@ import yaml
 from loguru import logger
 from slugify import slugify
 from temporalio.common import RetryPolicy
+from temporalio.testing import WorkflowEnvironment
 from temporalio.worker import Worker
 
 from tracecat.contexts import ctx_role
-from tracecat.dsl.common import DSLInput, get_temporal_client
+from tracecat.dsl._converter import pydantic_data_converter
+from tracecat.dsl.common import DSLInput, ForEachPolicy, get_temporal_client
 from tracecat.dsl.worker import new_sandbox_runner
-from tracecat.dsl.workflow import DSLActivities, DSLContext, DSLRunArgs, DSLWorkflow
-from tracecat.expressions import ExprContext
+from tracecat.dsl.workflow import (
+    DSLActivities,
+    DSLContext,
+    DSLRunArgs,
+    DSLWorkflow,
+    prune_context,
+    run_for_each,
+    shard_iterables,
+)
+from tracecat.expressions import ExprContext, IterableExpr, LayeredContext
 from tracecat.identifiers.resource import ResourcePrefix
+from tracecat.registry import registry
 from tracecat.types.exceptions import TracecatExpressionError
 
 DATA_PATH = Path(__file__).parent.parent.joinpath("data/workflows")
@@ -231,6 +242,7 @@ correctness_test_cases = [
     "unit_conditional_adder_diamond_skip_with_join_weak_dep",
     "unit_transform_forwarder_loop",
     "unit_transform_forwarder_loop_chained",
+    "unit_transform_forwarder_loop_sharded",
     "unit_transform_forwarder_arrange",
     "unit_transform_forwarder_arrange_loop",
     "unit_transform_forwarder_zip",
@@ -349,3 +361,300 @@ async def test_conditional_execution_fails(
                 ),
             )
         assert "Operand has no path" in str(e)
+
+
+def test_prune_context_only_keeps_dependencies():
+    context = DSLContext(
+        INPUTS={"url": "https://example.com", "unused": "x" * 1000},
+        ACTIONS={
+            "findings": {"result": list(range(1000)), "result_typename": "list"},
+            "summary": {"result": "3 findings", "result_typename": "str"},
+        },
+        TRIGGER={"alert": {"id": 1}},
+    )
+    deps = {
+        ExprContext.INPUTS: {"url"},
+        ExprContext.ACTIONS: {"summary", "not_run_yet"},
+        ExprContext.TRIGGER: set(),
+    }
+    assert prune_context(context, deps) == DSLContext(
+        INPUTS={"url": "https://example.com"},
+        ACTIONS={"summary": {"result": "3 findings", "result_typename": "str"}},
+        TRIGGER={},
+    )
+
+
+class _ConcurrencyProbeUDF:
+    """Stands in for a RegisteredUDF and records the peak concurrency."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def run_async(self, args: dict[str, Any]) -> Any:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        # Vary the duration to shuffle the completion order
+        await asyncio.sleep(0.001 * (args["value"] % 3))
+        self.in_flight -= 1
+        return args["value"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7])
+@pytest.mark.asyncio
+async def test_for_each_respects_max_concurrency(chunk_size: int):
+    udf = _ConcurrencyProbeUDF()
+    result = await run_for_each(
+        udf,
+        args={"value": "${{ var.x }}"},
+        iterable_exprs=[IterableExpr("var.x", list(range(100)))],
+        exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+        policy=ForEachPolicy(max_concurrency=4, chunk_size=chunk_size),
+    )
+    assert result == list(range(100))
+    assert udf.peak == 4
+
+
+@pytest.mark.asyncio
+async def test_for_each_unordered_results():
+    udf = _ConcurrencyProbeUDF()
+    result = await run_for_each(
+        udf,
+        args={"value": "${{ var.x }}"},
+        iterable_exprs=[IterableExpr("var.x", list(range(30)))],
+        exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+        policy=ForEachPolicy(max_concurrency=10, result_order="unordered"),
+    )
+    assert sorted(result) == list(range(30))
+    assert result != list(range(30))
+
+
+class _EchoUDF:
+    async def run_async(self, args: dict[str, Any]) -> Any:
+        await asyncio.sleep(0.001 * (args["id"] % 3))
+        return args
+
+
+@pytest.mark.asyncio
+async def test_for_each_iterations_are_isolated():
+    shared_vars = {"prefix": "ip", "item": {"id": -1}}
+    exec_context = {
+        ExprContext.INPUTS: {},
+        ExprContext.ACTIONS: {},
+        ExprContext.LOCAL_VARS: shared_vars,
+    }
+    result = await run_for_each(
+        _EchoUDF(),
+        args={
+            "id": "${{ var.item.id }}",
+            "name": "${{ var.prefix }}-${{ var.item.name }}",
+        },
+        iterable_exprs=[
+            IterableExpr("var.item.id", list(range(20))),
+            IterableExpr("var.item.name", [f"10.0.0.{i}" for i in range(20)]),
+        ],
+        exec_context=exec_context,
+        policy=ForEachPolicy(max_concurrency=5),
+    )
+    assert result == [{"id": i, "name": f"ip-10.0.0.{i}"} for i in range(20)]
+    # The shared context isn't written to by the iterations
+    assert exec_context[ExprContext.LOCAL_VARS] is shared_vars
+    assert shared_vars == {"prefix": "ip", "item": {"id": -1}}
+
+
+@pytest.mark.asyncio
+async def test_for_each_udfs_can_mutate_their_args():
+    """Untemplated args are shared between iterations, so UDFs get copies."""
+
+    @registry.register(description="Tag an item", namespace="test_for_each")
+    def tag(item: dict[str, Any]) -> dict[str, Any]:
+        item["tags"].append(item["name"])
+        return item
+
+    args = {"item": {"name": "${{ var.name }}", "tags": ["seen"]}}
+    try:
+        result = await run_for_each(
+            registry["test_for_each.tag"],
+            args=args,
+            iterable_exprs=[IterableExpr("var.name", ["a", "b", "c"])],
+            exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+            policy=ForEachPolicy(max_concurrency=1),
+        )
+    finally:
+        registry.store.pop("test_for_each.tag", None)
+    assert result == [{"name": n, "tags": ["seen", n]} for n in "abc"]
+    assert args == {"item": {"name": "${{ var.name }}", "tags": ["seen"]}}
+
+
+class _StreamProbeUDF:
+    """Records how far ahead of the UDF calls the collection has been read."""
+
+    def __init__(self):
+        self.n_read = 0
+        self.n_called = 0
+        self.max_read_ahead = 0
+
+    def lines(self, n: int):
+        for i in range(n):
+            self.n_read += 1
+            self.max_read_ahead = max(self.max_read_ahead, self.n_read - self.n_called)
+            yield f'{{"eventID": {i}}}'
+
+    async def run_async(self, args: dict[str, Any]) -> Any:
+        self.n_called += 1
+        await asyncio.sleep(0)
+        return args["line"]
+
+
+@pytest.mark.asyncio
+async def test_for_each_consumes_lazy_iterables_incrementally():
+    udf = _StreamProbeUDF()
+    policy = ForEachPolicy(max_concurrency=8, chunk_size=4)
+    result = await run_for_each(
+        udf,
+        args={"line": "${{ var.line }}"},
+        iterable_exprs=[IterableExpr("var.line", udf.lines(10_000))],
+        exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+        policy=policy,
+    )
+    assert result == [f'{{"eventID": {i}}}' for i in range(10_000)]
+    # Only claimed iterations are ever read
+    assert udf.max_read_ahead <= policy.max_concurrency * policy.chunk_size
+
+
+@pytest.mark.asyncio
+async def test_for_each_async_iterables():
+    async def pages():
+        for page in range(3):
+            await asyncio.sleep(0)
+            for i in range(10):
+                yield page * 10 + i
+
+    result = await run_for_each(
+        _ConcurrencyProbeUDF(),
+        args={"value": "${{ var.x }}"},
+        iterable_exprs=[
+            IterableExpr("var.x", pages()),
+            IterableExpr("var.y", range(30)),
+        ],
+        exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+        policy=ForEachPolicy(max_concurrency=4),
+    )
+    assert result == list(range(30))
+
+
+@pytest.mark.asyncio
+async def test_for_each_iterables_must_be_same_length():
+    with pytest.raises(ExceptionGroup) as e:
+        await run_for_each(
+            _ConcurrencyProbeUDF(),
+            args={"value": "${{ var.x }}"},
+            iterable_exprs=[
+                IterableExpr("var.x", iter(range(5))),
+                IterableExpr("var.y", iter(range(4))),
+            ],
+            exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+            policy=ForEachPolicy(max_concurrency=2),
+        )
+    assert e.group_contains(ValueError, match="same length")
+
+
+@pytest.mark.asyncio
+async def test_for_each_closes_its_iterables_when_it_fails():
+    closed = []
+
+    def lines():
+        try:
+            yield from range(100)
+        finally:
+            closed.append("lines")
+
+    async def pages():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.append("pages")
+
+    with pytest.raises(ExceptionGroup):
+        await run_for_each(
+            _ConcurrencyProbeUDF(),
+            args={"value": "${{ var.x }}"},
+            iterable_exprs=[
+                IterableExpr("var.x", lines()),
+                IterableExpr("var.y", pages()),
+                IterableExpr("var.z", iter(range(5))),
+            ],
+            exec_context={ExprContext.INPUTS: {}, ExprContext.ACTIONS: {}},
+            policy=ForEachPolicy(max_concurrency=2),
+        )
+    assert sorted(closed) == ["lines", "pages"]
+
+
+def test_layered_context_copies_only_var_paths():
+    actions = {"fetch": {"result": [1, 2, 3], "result_typename": "list"}}
+    local_vars = {"a": {"b": 1}, "c": {"d": 2}}
+    base = {ExprContext.ACTIONS: actions, ExprContext.LOCAL_VARS: local_vars}
+    context = LayeredContext.with_vars(base, [("var.a.x", 10), ("var.y", 20)])
+    assert context[ExprContext.ACTIONS] is actions
+    assert context[ExprContext.LOCAL_VARS] == {
+        "a": {"b": 1, "x": 10},
+        "c": {"d": 2},
+        "y": 20,
+    }
+    assert context[ExprContext.LOCAL_VARS]["c"] is local_vars["c"]
+    assert local_vars == {"a": {"b": 1}, "c": {"d": 2}}
+    assert dict(context).keys() == base.keys()
+    with pytest.raises(ValueError):
+        LayeredContext.with_vars(base, [("ACTIONS.fetch", 1)])
+
+
+def test_shard_iterables_preserves_order():
+    shards = shard_iterables(
+        [IterableExpr("var.x", range(5)), IterableExpr("var.y", "abcde")],
+        shard_size=2,
+    )
+    assert [shard.collections for shard in shards] == [
+        [[0, 1], ["a", "b"]],
+        [[2, 3], ["c", "d"]],
+        [[4], ["e"]],
+    ]
+    assert all(shard.iterators == ["var.x", "var.y"] for shard in shards)
+
+
+@pytest.mark.asyncio
+async def test_for_each_shards_run_as_separate_activities(mock_registry, auth_sandbox):
+    dsl = DSLInput.from_yaml(DATA_PATH / "unit_transform_forwarder_loop_sharded.yml")
+    task_queue = "test-for-each-shards"
+    async with (
+        await WorkflowEnvironment.start_local(
+            data_converter=pydantic_data_converter
+        ) as env,
+        Worker(
+            env.client,
+            task_queue=task_queue,
+            activities=DSLActivities.load(),
+            workflows=[DSLWorkflow],
+            workflow_runner=new_sandbox_runner(),
+        ),
+    ):
+        handle = await env.client.start_workflow(
+            DSLWorkflow.run,
+            DSLRunArgs(dsl=dsl, role=ctx_role.get(), wf_id=TEST_WF_ID),
+            id=generate_test_exec_id("test_for_each_shards"),
+            task_queue=task_queue,
+        )
+        result = await handle.result()
+        history = await handle.fetch_history()
+
+    assert result[ExprContext.ACTIONS]["a"]["result"] == [
+        f"I received {i} from you" for i in range(1, 6)
+    ]
+    scheduled = [
+        event.activity_task_scheduled_event_attributes
+        for event in history.events
+        if event.HasField("activity_task_scheduled_event_attributes")
+    ]
+    # 5 iterations in shards of 2
+    assert len(scheduled) == 3
+    assert all(attrs.heartbeat_timeout.seconds == 30 for attrs in scheduled)
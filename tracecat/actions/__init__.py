@@ -2,21 +2,25 @@
 
 WARNING!!!
 ----------
-Do not add `from __future__ import annotations` to any action module. This will cause class types to be resolved as strings."""
+Do not add `from __future__ import annotations` to any action module. This will cause class types to be resolved as strings.
 
-# Bring all actions into the namespace to be registered
+Action modules are imported by the registry, either all at once or on first use
+(see `tracecat.registry`), so new action modules must be listed in `ACTION_MODULES`."""
 
-from tracecat.actions import integrations
-from tracecat.actions.core import cases, condition, email, example, http, llm, transform
-
-__all__ = [
+# Modules whose actions are registered
+ACTION_MODULES = [
+    # Integrations
+    "tracecat.actions.integrations.cdr",
+    "tracecat.actions.integrations.chat",
+    "tracecat.actions.integrations.enrichment",
+    "tracecat.actions.integrations.extraction",
+    "tracecat.actions.integrations.siem",
     # Core
-    "example",
-    "http",
-    "email",
-    "llm",
-    "condition",
-    "cases",
-    "transform",
-    "integrations",
+    "tracecat.actions.core.cases",
+    "tracecat.actions.core.condition",
+    "tracecat.actions.core.email",
+    "tracecat.actions.core.example",
+    "tracecat.actions.core.http",
+    "tracecat.actions.core.llm",
+    "tracecat.actions.core.transform",
 ]
@@ -2,7 +2,6 @@
 # XXX(WARNING): Do not import __future__ annotations from typing
 # This will cause class types to be resolved as strings
 
-import os
 import re
 from abc import abstractmethod
 from typing import Any, Literal
@@ -11,7 +10,8 @@ import httpx
 from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from tracecat.registry import registry
+from tracecat import secrets
+from tracecat.registry import http_client, registry
 
 SAFE_EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
 
@@ -75,7 +75,7 @@ class AsyncMailProvider:
 class ResendMailProvider(AsyncMailProvider):
     @property
     def api_headers(self):
-        api_key = os.environ["RESEND_API_KEY"]
+        api_key = secrets.require("RESEND_API_KEY")
         api_headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}",
@@ -115,7 +115,7 @@ class ResendMailProvider(AsyncMailProvider):
             "reply_to": reply_to,
             "headers": headers,
         }
-        async with httpx.AsyncClient() as client:
+        async with http_client() as client:
             rsps = await client.post(
                 "https://api.resend.com/emails", json=params, headers=api_headers
             )
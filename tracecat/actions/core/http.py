@@ -8,7 +8,7 @@ import httpx
 from loguru import logger
 from pydantic import Field, UrlConstraints
 
-from tracecat.registry import registry
+from tracecat.registry import http_client, registry
 
 RequestMethods = Literal["GET", "POST", "PUT", "DELETE"]
 JSONObjectOrArray = dict[str, Any] | list[Any]
@@ -50,7 +50,7 @@ async def http_request(
     ] = "GET",
 ) -> HTTPResponse:
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_client() as client:
             response = await client.request(
                 method=method,
                 url=url,
@@ -1,3 +1 @@
-from . import cdr, chat, enrichment, extraction, siem
-
-__all__ = ["cdr", "chat", "enrichment", "extraction", "siem"]
+"""Integrations are imported per subpackage, see `tracecat.actions.ACTION_MODULES`."""
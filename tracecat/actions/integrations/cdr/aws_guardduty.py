@@ -68,7 +68,6 @@ list_alerts = {
 ```
 """
 
-import os
 from datetime import datetime
 from typing import Annotated, Any
 
@@ -76,6 +75,7 @@ import aioboto3
 from tqdm.asyncio import tqdm, trange
 from types_aiobotocore_guardduty.client import GuardDutyClient
 
+from tracecat import secrets
 from tracecat.actions.io import retry
 from tracecat.logging import logger
 from tracecat.registry import Field, registry
@@ -174,7 +174,7 @@ async def list_guardduty_alerts(
             aws_access_key_id=credentials["AccessKeyId"],
             aws_secret_access_key=credentials["SecretAccessKey"],
             aws_session_token=credentials["SessionToken"],
-            region_name=os.environ["AWS_REGION"],
+            region_name=secrets.require("AWS_REGION"),
         )
 
     else:
@@ -183,9 +183,9 @@ async def list_guardduty_alerts(
         )
         guardduty_session = aioboto3.Session(
             profile_name=profile_name,
-            aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
-            aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"],
-            region_name=os.environ["AWS_REGION"],
+            aws_access_key_id=secrets.require("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=secrets.require("AWS_SECRET_ACCESS_KEY"),
+            region_name=secrets.require("AWS_REGION"),
         )
 
     # Get findings from GuardDuty
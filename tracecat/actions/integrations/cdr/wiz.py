@@ -22,9 +22,8 @@ list_alerts = {
 from datetime import datetime
 from typing import Any
 
-import httpx
-
 from tracecat.actions.io import retry
+from tracecat.http import http_client
 
 QUERY_STRING = """
 query IssuesTable($filterBy: IssueFilters, $first: Int, $after: String, $orderBy: IssueOrder) {
@@ -119,7 +118,7 @@ async def _get_access_token(client_id: str, client_secret: str, auth_url: str) -
         "grant_type": "client_credentials",
     }
     headers = {"Content-Type": "application/json"}
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(auth_url, json=payload, headers=headers)
         response.raise_for_status()
         return response.json()["access_token"]
@@ -134,7 +133,7 @@ async def _query_wiz_alerts(
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(
             api_url,
             json={"query": QUERY_STRING, "variables": variables},
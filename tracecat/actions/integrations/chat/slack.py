@@ -31,11 +31,11 @@ list_users = {
 Note: Slack accepts more complex message payloads using [Blocks](https://app.slack.com/block-kit-builder).
 """
 
-import os
 from typing import Annotated, Any
 
 from slack_sdk.web.async_client import AsyncWebClient
 
+from tracecat import secrets
 from tracecat.registry import Field, registry
 from tracecat.types.exceptions import TracecatCredentialsError
 
@@ -57,7 +57,7 @@ async def post_slack_message(
         list[dict[str, Any]] | None, Field(description="Slack blocks definition")
     ] = None,
 ) -> dict[str, Any]:
-    if (bot_token := os.environ.get("SLACK_BOT_TOKEN")) is None:
+    if (bot_token := secrets.get("SLACK_BOT_TOKEN")) is None:
         raise TracecatCredentialsError("Credential `slack.SLACK_BOT_TOKEN` is not set")
     client = AsyncWebClient(token=bot_token)
 
@@ -88,7 +88,7 @@ async def list_slack_users(
         Field(default=None, description="List of emails to filter users by"),
     ] = None,
 ) -> list[dict[str, str]]:
-    if (bot_token := os.environ.get("SLACK_BOT_TOKEN")) is None:
+    if (bot_token := secrets.get("SLACK_BOT_TOKEN")) is None:
         raise TracecatCredentialsError("Credential `slack.SLACK_BOT_TOKEN` is not set")
     client = AsyncWebClient(token=bot_token)
     users = []
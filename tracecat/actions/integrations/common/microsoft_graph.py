@@ -40,9 +40,10 @@ list_alerts = {
 from datetime import datetime
 from typing import Any
 
-import httpx
 from authlib.integrations.httpx_client import AsyncOAuth2Client
 
+from tracecat.http import http_client
+
 TOKEN_ENDPOINT = "/oauth2/v2.0/token"
 ALERTS_ENDPOINT = "/security/alerts_v2"
 
@@ -81,7 +82,7 @@ async def list_microsoft_graph_alerts(
     if service_source:
         params["serviceSource"] = service_source
 
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(
             "https://graph.microsoft.com/v1.0/security/alerts_v2",
             headers=headers,
@@ -29,10 +29,9 @@ list_detections = {
 import datetime
 from typing import Annotated, Any
 
-import httpx
 from authlib.integrations.httpx_client import AsyncOAuth2Client
 
-from tracecat.registry import Field, registry
+from tracecat.registry import Field, http_client, registry
 
 TOKEN_ENDPOINT = "/oauth2/token"
 ALERTS_ENDPOINT = "/alerts/queries/alerts/v2"
@@ -76,8 +75,8 @@ async def list_crowdstrike_alerts(
             "Content-Type": "application/json",
             "User-Agent": "Tracecat",
         }
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.get(
+        async with http_client() as api_client:
+            response = await api_client.get(
                 f"{base_url}/{ALERTS_ENDPOINT}",
                 headers=headers,
                 params={
@@ -127,8 +126,8 @@ async def list_crowdstrike_detections(
             "Content-Type": "application/json",
             "User-Agent": "Tracecat",
         }
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.get(
+        async with http_client() as api_client:
+            response = await api_client.get(
                 f"{base_url}/{DETECTS_ENDPOINT}",
                 headers=headers,
                 params={
@@ -19,9 +19,7 @@ list_alerts: {
 import datetime
 from typing import Annotated, Any
 
-import httpx
-
-from tracecat.registry import Field, registry
+from tracecat.registry import Field, http_client, registry
 
 ALERTS_ENDPOINT = "/web/api/v2.1/cloud-detection/alerts"
 
@@ -59,7 +57,7 @@ async def list_sentinelone_alerts(
         "limit": limit,
     }
 
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(
             f"{base_url}/{ALERTS_ENDPOINT}",
             headers=headers,
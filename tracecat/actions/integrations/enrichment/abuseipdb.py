@@ -18,28 +18,29 @@ analyze_ip_address = {
 ```
 """
 
-import os
 from typing import Annotated, Any
 
-import httpx
-
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, RateLimit, http_client, registry
 
 ABUSEIPDB_BASE_URL = "https://api.abuseipdb.com/api"
+# Quotas depend on the plan, so the limit is opt-in with TRACECAT__RATE_LIMITS
+ABUSEIPDB_RATE_LIMIT = RateLimit(key="abuseipdb")
 
 
 @registry.register(
     description="Analyze an IP address using AbuseIPDB.",
     namespace="abuseipdb",
+    rate_limit=ABUSEIPDB_RATE_LIMIT,
 )
 async def analyze_ip_address(
     ip_address: Annotated[str, Field(..., description="The IP address to analyze")],
 ) -> dict[str, Any]:
     headers = {
         "Accept": "application/json",
-        "Key": os.environ["ABUSEIPDB_API_KEY"],
+        "Key": secrets.require("ABUSEIPDB_API_KEY"),
     }
-    async with httpx.AsyncClient(base_url=ABUSEIPDB_BASE_URL) as client:
+    async with http_client(base_url=ABUSEIPDB_BASE_URL) as client:
         response = await client.get(
             "/v2/check", headers=headers, params={"ipAddress": ip_address}
         )
@@ -31,12 +31,12 @@ analyze_malware_sample = {
 """
 
 import ipaddress
-import os
 from typing import Annotated, Any
 
 import httpx
 
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, http_client, registry
 
 # Base URL for AlienVault OTX API
 OTX_BASE_URL = "https://otx.alienvault.com/api"
@@ -44,10 +44,10 @@ OTX_BASE_URL = "https://otx.alienvault.com/api"
 
 # Function to create an HTTPX async client for AlienVault OTX
 def create_alienvault_client() -> httpx.AsyncClient:
-    OTX_API_KEY = os.getenv("OTX_API_KEY")
+    OTX_API_KEY = secrets.get("OTX_API_KEY")
     if OTX_API_KEY is None:
         raise ValueError("OTX_API_KEY is not set")
-    client = httpx.AsyncClient(
+    client = http_client(
         base_url=OTX_BASE_URL,
         headers={"X-OTX-API-KEY": OTX_API_KEY},
     )
@@ -15,22 +15,22 @@ analyze_email = {
 ```
 """
 
-import os
 from typing import Annotated, Any
 
 import httpx
 
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, http_client, registry
 
 EMAILREP_BASE_URL = "https://emailrep.io"
 
 
 def create_emailrep_client() -> httpx.AsyncClient:
-    EMAILREP_API_KEY = os.getenv("EMAILREP_API_KEY")
+    EMAILREP_API_KEY = secrets.get("EMAILREP_API_KEY")
     if EMAILREP_API_KEY is None:
         raise ValueError("EMAILREP_API_KEY is not set")
     headers = {"User-Agent": "tracecat-client", "Key": EMAILREP_API_KEY}
-    return httpx.AsyncClient(base_url=EMAILREP_BASE_URL, headers=headers)
+    return http_client(base_url=EMAILREP_BASE_URL, headers=headers)
 
 
 @registry.register(
@@ -16,21 +16,21 @@ analyze_malware_sample = {
 ```
 """
 
-import os
 from typing import Annotated, Any
 
 import httpx
 
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, http_client, registry
 
 HA_BASE_URL = "https://www.hybrid-analysis.com/api/v2/"
 
 
 def create_hybrid_analysis_client() -> httpx.AsyncClient:
-    HA_API_KEY = os.getenv("HA_API_KEY")
+    HA_API_KEY = secrets.get("HA_API_KEY")
     if HA_API_KEY is None:
         raise ValueError("HA_API_KEY is not set")
-    client = httpx.AsyncClient(
+    client = http_client(
         base_url=HA_BASE_URL,
         headers={"api-key": HA_API_KEY},
     )
@@ -16,12 +16,10 @@ analyze_malware_sample = {
 ```
 """
 
-import os
 from typing import Annotated, Any
 
-import httpx
-
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, http_client, registry
 
 MALWAREBAZAAR_BASE_URL = "https://mb-api.abuse.ch/api"
 
@@ -37,10 +35,10 @@ async def analyze_malware_sample(
 ) -> dict[str, Any]:
     headers = {
         "Accept": "application/json",
-        "API-KEY": os.environ["MALWAREBAZAAR_API_KEY"],
+        "API-KEY": secrets.require("MALWAREBAZAAR_API_KEY"),
     }
     data = {"query": "get_info", "hash": file_hash}
-    async with httpx.AsyncClient(base_url=MALWAREBAZAAR_BASE_URL) as client:
+    async with http_client(base_url=MALWAREBAZAAR_BASE_URL) as client:
         response = await client.post("/v1", headers=headers, data=data)
         response.raise_for_status()
         return response.json()
@@ -27,23 +27,21 @@ Note: the explore endpoint is a general search API. However, to keep unified API
 """
 
 import ipaddress
-import os
 from typing import Annotated, Any
 
 import httpx
 
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, http_client, registry
 
 PULSEDIVE_BASE_URL = "https://pulsedive.com/api/"
 
 
 def create_pulsedive_client() -> httpx.AsyncClient:
-    PULSEDIVE_API_KEY = os.getenv("PULSEDIVE_API_KEY")
+    PULSEDIVE_API_KEY = secrets.get("PULSEDIVE_API_KEY")
     if PULSEDIVE_API_KEY is None:
         raise ValueError("PULSEDIVE_API_KEY is not set")
-    client = httpx.AsyncClient(
-        base_url=PULSEDIVE_BASE_URL, params={"key": PULSEDIVE_API_KEY}
-    )
+    client = http_client(base_url=PULSEDIVE_BASE_URL, params={"key": PULSEDIVE_API_KEY})
     return client
 
 
@@ -21,26 +21,29 @@ analyze_url = {
 ```
 """
 
-import os
 from typing import Annotated, Any, Literal
 
 import httpx
 from tenacity import retry, stop_after_delay, wait_combine, wait_fixed
 
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, RateLimit, http_client, registry
 
 URLSCAN_BASE_URL = "https://urlscan.io/api/"
+# Quotas depend on the plan, so the limit is opt-in with TRACECAT__RATE_LIMITS
+URLSCAN_RATE_LIMIT = RateLimit(key="urlscan")
 
 
 def create_urlscan_client() -> httpx.AsyncClient:
-    headers = {"API-Key": os.environ["URLSCAN_API_KEY"]}
-    return httpx.AsyncClient(base_url=URLSCAN_BASE_URL, headers=headers)
+    headers = {"API-Key": secrets.require("URLSCAN_API_KEY")}
+    return http_client(base_url=URLSCAN_BASE_URL, headers=headers)
 
 
 @retry(wait=wait_combine(wait_fixed(2), wait_fixed(10)), stop=stop_after_delay(120))
 @registry.register(
     description="Get the scan result from URLScan by scan ID.",
     namespace="urlscan",
+    rate_limit=URLSCAN_RATE_LIMIT,
 )
 async def get_scan_result(
     scan_id: Annotated[
@@ -58,6 +61,7 @@ async def get_scan_result(
 @registry.register(
     description="Analyze a URL using URLScan.",
     namespace="urlscan",
+    rate_limit=URLSCAN_RATE_LIMIT,
 )
 async def analyze_url(
     url: Annotated[str, Field(..., description="The URL to analyze")],
@@ -31,21 +31,25 @@ analyze_malware_sample = {
 """
 
 import base64
-import os
 from typing import Annotated, Any
 
 import httpx
 
-from tracecat.registry import Field, registry
+from tracecat import secrets
+from tracecat.registry import Field, RateLimit, http_client, registry
 
 VT_BASE_URL = "https://www.virustotal.com/api/"
+# Quotas depend on the plan, so the limit is opt-in with TRACECAT__RATE_LIMITS.
+# The public API allows 4 requests per minute:
+# {"virustotal": {"requests_per_second": 0.0667, "burst": 4, "max_in_flight": 4}}
+VT_RATE_LIMIT = RateLimit(key="virustotal")
 
 
 def create_virustotal_client() -> httpx.AsyncClient:
-    VT_API_KEY = os.getenv("VT_API_KEY")
+    VT_API_KEY = secrets.get("VT_API_KEY")
     if VT_API_KEY is None:
         raise ValueError("VT_API_KEY is not set")
-    client = httpx.AsyncClient(
+    client = http_client(
         base_url=VT_BASE_URL,
         headers={"x-apikey": VT_API_KEY},
     )
@@ -58,6 +62,7 @@ def create_virustotal_client() -> httpx.AsyncClient:
     secrets=["virustotal"],
     default_title="VirusTotal",
     display_group="Enrichment",
+    rate_limit=VT_RATE_LIMIT,
 )
 async def analyze_url(
     url: Annotated[str, Field(..., description="The URL to analyze")],
@@ -72,6 +77,7 @@ async def analyze_url(
 @registry.register(
     description="Analyze an IP address using VirusTotal.",
     namespace="virustotal",
+    rate_limit=VT_RATE_LIMIT,
 )
 async def analyze_ip_address(
     ip_address: Annotated[str, Field(..., description="The IP address to analyze")],
@@ -85,6 +91,7 @@ async def analyze_ip_address(
 @registry.register(
     description="Analyze a malware sample using VirusTotal.",
     namespace="virustotal",
+    rate_limit=VT_RATE_LIMIT,
 )
 async def analyze_malware_sample(
     file_hash: Annotated[
@@ -26,6 +26,7 @@ def normalize_email_address(email: str) -> str:
 @registry.register(
     description="Extract unique emails from a list of strings.",
     namespace="integrations.extraction",
+    placement="process",
     default_title="Email Extractor",
     display_group="Data Extraction",
 )
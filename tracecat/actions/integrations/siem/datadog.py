@@ -27,10 +27,9 @@ list_alerts = {
 from datetime import datetime
 from typing import Annotated, Any
 
-import httpx
 from fastapi.exceptions import HTTPException
 
-from tracecat.registry import Field, registry
+from tracecat.registry import Field, http_client, registry
 
 DD_REGION_TO_API_URL = {
     "us1": "https://api.datadoghq.com/api",
@@ -79,7 +78,7 @@ async def list_datadog_alerts(
         ) from err
 
     # TODO: Add support for pagination
-    async with httpx.AsyncClient(base_url=api_url, allow_redirects=True) as client:
+    async with http_client(base_url=api_url, follow_redirects=True) as client:
         response = await client.get(
             "/v2/security_monitoring/signals",
             headers=headers,
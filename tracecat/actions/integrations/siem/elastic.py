@@ -19,9 +19,7 @@ list_alerts = {
 from datetime import datetime
 from typing import Annotated, Any
 
-import httpx
-
-from tracecat.registry import Field, registry
+from tracecat.registry import Field, http_client, registry
 
 
 @registry.register(
@@ -68,7 +66,7 @@ async def list_elastic_alerts(
         },
     }
 
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(url, headers=headers, json=query)
         response.raise_for_status()  # Raise an exception for HTTP errors
         return response.json()
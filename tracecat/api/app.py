@@ -1,4 +1,6 @@
 import asyncio
+import time
+from collections.abc import Callable
 from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
@@ -12,6 +14,7 @@ from fastapi import (
     HTTPException,
     Query,
     Request,
+    Response,
     UploadFile,
     status,
 )
@@ -19,8 +22,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.params import Body
 from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic_core import ValidationError
-from sqlalchemy import Engine, delete, or_
-from sqlalchemy.exc import NoResultFound, SQLAlchemyError
+from sqlalchemy import Engine, delete, or_, update
+from sqlalchemy.exc import IntegrityError, NoResultFound, SQLAlchemyError
 from sqlmodel import Session, select
 
 from tracecat import config, identifiers
@@ -44,6 +47,7 @@ from tracecat.db.schemas import (
     CaseAction,
     CaseContext,
     CaseEvent,
+    RateLimitBucket,
     Schedule,
     Secret,
     UDFSpec,
@@ -53,6 +57,8 @@ from tracecat.db.schemas import (
     WorkflowDefinition,
     WorkflowRun,
 )
+from tracecat.dsl.analysis import definition_key
+from tracecat.dsl.client import temporal_client_manager
 from tracecat.dsl.common import DSLInput
 
 # TODO: Clean up API params / response "zoo"
@@ -61,12 +67,14 @@ from tracecat.dsl.dispatcher import dispatch_workflow
 from tracecat.dsl.graph import RFGraph
 from tracecat.logging import logger
 from tracecat.middleware import RequestLoggingMiddleware
+from tracecat.ratelimit import refund_token, take_token
 from tracecat.registry import registry
 from tracecat.types.api import (
     ActionMetadataResponse,
     ActionResponse,
     ActionRunEventParams,
     ActionRunResponse,
+    BatchGetSecretsParams,
     CaseActionParams,
     CaseContextParams,
     CaseEventParams,
@@ -78,6 +86,8 @@ from tracecat.types.api import (
     CreateWorkflowParams,
     Event,
     EventSearchParams,
+    ReserveRateLimitParams,
+    ReserveRateLimitResponse,
     SearchSecretsParams,
     SecretResponse,
     StartWorkflowParams,
@@ -105,6 +115,11 @@ engine: Engine
 async def lifespan(app: FastAPI):
     global engine
     engine = get_engine()
+    try:
+        # Warm up the shared client, so the first webhook doesn't pay for it
+        await temporal_client_manager.get()
+    except Exception as e:
+        logger.warning("Couldn't connect to Temporal on startup", error=e)
     yield
 
 
@@ -330,7 +345,13 @@ async def incoming_webhook(
         dsl_input.trigger_inputs = payload
     logger.info(dsl_input.dump_yaml())
 
-    asyncio.create_task(dispatch_workflow(dsl_input, wf_id=path))
+    asyncio.create_task(
+        dispatch_workflow(
+            dsl_input,
+            wf_id=path,
+            defn_key=definition_key(defn.workflow_id, defn.version),
+        )
+    )
     return {"status": "ok"}
 
 
@@ -1781,9 +1802,9 @@ def list_secrets(
                 type=secret.type,
                 name=secret.name,
                 description=secret.description,
-                keys=secret.keys or [],
+                keys=keys or [],
             )
-            for secret in secrets
+            for secret, keys in zip(secrets, Secret.decrypt_keys(secrets), strict=True)
         ]
 
 
@@ -1812,6 +1833,128 @@ def get_secret(
         return secret
 
 
+@app.post("/secrets/batch", tags=["secrets"])
+def batch_get_secrets(
+    role: Annotated[Role, Depends(authenticate_user_or_service)],
+    params: BatchGetSecretsParams,
+    response: Response,
+) -> list[Secret]:
+    """Get many secrets by name in one query.
+
+    Responds with 404 if any of the secrets don't exist. The user's secrets
+    version is returned in the `X-Secrets-Version` header, so workers check it
+    by fetching no secrets.
+    """
+    names = set(params.names)
+    secrets = []
+    with Session(engine) as session:
+        # Read the version first. If a secret changes after this, the caller
+        # sees a newer version on its next request and drops what it cached.
+        statement = select(User.secrets_version).where(User.id == role.user_id)
+        version = session.exec(statement).one_or_none() or 0
+        if names:
+            statement = select(Secret).where(
+                Secret.owner_id == role.user_id, Secret.name.in_(names)
+            )
+            secrets = session.exec(statement).all()
+    if missing := names - {secret.name for secret in secrets}:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Secrets not found: {', '.join(sorted(missing))}",
+        )
+    response.headers["X-Secrets-Version"] = str(version)
+    # NOTE: Keys stay encrypted in transit, and are decrypted by the caller
+    return secrets
+
+
+@app.post("/rate-limits/reserve", tags=["rate-limits"])
+def reserve_rate_limit(
+    role: Annotated[Role, Depends(authenticate_user_or_service)],
+    params: ReserveRateLimitParams,
+) -> ReserveRateLimitResponse:
+    """Take a token from the user's bucket for a rate limit key.
+
+    Used by workers that share rate limits, see `tracecat.ratelimit`. Responds
+    with how long the caller must wait until its token is due.
+    """
+
+    def reserve(bucket: RateLimitBucket, now: float) -> float:
+        bucket.tokens, wait = take_token(
+            bucket.tokens,
+            bucket.refilled_at,
+            now,
+            rate=params.requests_per_second,
+            capacity=params.burst,
+        )
+        bucket.refilled_at = now
+        return wait
+
+    return ReserveRateLimitResponse(
+        wait=_update_rate_limit_bucket(role, params, reserve)
+    )
+
+
+@app.post("/rate-limits/refund", tags=["rate-limits"])
+def refund_rate_limit(
+    role: Annotated[Role, Depends(authenticate_user_or_service)],
+    params: ReserveRateLimitParams,
+) -> None:
+    """Put back a token that a caller reserved but didn't use, e.g. because it
+    was cancelled while it waited."""
+
+    def refund(bucket: RateLimitBucket, now: float) -> float:
+        bucket.tokens = refund_token(bucket.tokens, capacity=params.burst)
+        return 0.0
+
+    _update_rate_limit_bucket(role, params, refund)
+
+
+def _update_rate_limit_bucket(
+    role: Role,
+    params: ReserveRateLimitParams,
+    update: Callable[[RateLimitBucket, float], float],
+) -> float:
+    """Update the user's bucket for a rate limit key, creating it if needed."""
+    for attempt in range(2):
+        with Session(engine) as session:
+            # Lock the bucket so that concurrent updates are serialized
+            statement = (
+                select(RateLimitBucket)
+                .where(
+                    RateLimitBucket.owner_id == role.user_id,
+                    RateLimitBucket.key == params.key,
+                )
+                .with_for_update()
+            )
+            now = time.time()
+            bucket = session.exec(statement).one_or_none() or RateLimitBucket(
+                owner_id=role.user_id,
+                key=params.key,
+                tokens=params.burst,
+                refilled_at=now,
+            )
+            wait = update(bucket, now)
+            session.add(bucket)
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another request created the bucket first, update that one
+                if attempt:
+                    raise
+                continue
+        return wait
+
+
+def _bump_secrets_version(session: Session, user_id: str) -> None:
+    """Mark the user's cached secrets as stale."""
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(secrets_version=User.secrets_version + 1)
+    )
+    session.exec(statement)
+
+
 @app.put(
     "/secrets",
     status_code=status.HTTP_201_CREATED,
@@ -1874,6 +2017,7 @@ def update_secret(
             )
         secret.keys = params.keys  # Set and encrypt the key
         session.add(secret)
+        _bump_secrets_version(session, role.user_id)
         session.commit()
         session.refresh(secret)
 
@@ -1902,6 +2046,7 @@ def delete_secret(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Secret does not exist"
             )
         session.delete(secret)
+        _bump_secrets_version(session, role.user_id)
         session.commit()
 
 
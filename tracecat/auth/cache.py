@@ -0,0 +1,186 @@
+"""Worker-local cache of secrets fetched from the secrets API.
+
+Motivation
+----------
+- A UDF run can resolve the same secrets more than once: for the `SECRETS`
+  context when its args are evaluated, and again in the UDF's `AuthSandbox`.
+- Every resolution is a round trip to the API, so we keep fetched secrets for
+  a short TTL, keyed by the role's user and the secret name.
+- Secrets are cached as the API returns them, with their keys encrypted. Keys
+  are only decrypted when a caller reads `Secret.keys`.
+
+Invalidation
+------------
+The API bumps a per-user secrets version whenever one of the user's secrets is
+updated or deleted, and returns it with every batch fetch. Entries are only
+served while they carry the latest version this process has seen for their
+user, so a fetch that observes a newer version drops the user's other entries.
+A user's version is rechecked at least every `version_ttl` seconds, with an
+empty batch fetch, so rotated secrets are dropped even if every lookup hits.
+Entries that are never invalidated expire after the TTL.
+
+The cache is shared by every event loop of the worker, e.g. of sync UDFs run in
+executor threads, so its state is guarded by a lock. The lock is never held
+while fetching.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from tracecat import config
+from tracecat.auth.clients import AuthenticatedAPIClient
+from tracecat.auth.credentials import Role
+
+if TYPE_CHECKING:
+    from tracecat.db.schemas import Secret
+
+SECRETS_VERSION_HEADER = "X-Secrets-Version"
+
+FetchSecrets = Callable[[Role, list[str]], Awaitable[tuple[list["Secret"], int]]]
+
+
+async def fetch_secrets(role: Role, names: list[str]) -> tuple[list[Secret], int]:
+    """Fetch secrets from the secrets API, with the user's secrets version."""
+
+    # XXX: This import is necessary to avoid horrendous circular import errors
+    from tracecat.db.helpers import SecretList
+
+    async with AuthenticatedAPIClient(role=role) as client:
+        response = await client.post("/secrets/batch", json={"names": names})
+        response.raise_for_status()
+        version = int(response.headers.get(SECRETS_VERSION_HEADER, 0))
+        return SecretList.validate_json(response.content), version
+
+
+@dataclass(slots=True)
+class _Entry:
+    secret: Secret
+    version: int
+    expires_at: float
+
+
+class SecretCache:
+    """TTL cache of encrypted secrets, keyed by user ID and secret name.
+
+    Hits, misses, version checks and invalidations are counted, see `stats`.
+    """
+
+    def __init__(
+        self,
+        fetch: FetchSecrets = fetch_secrets,
+        *,
+        ttl: float = config.TRACECAT__SECRET_CACHE_TTL_SECONDS,
+        version_ttl: float = config.TRACECAT__SECRET_CACHE_VERSION_TTL_SECONDS,
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._fetch = fetch
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str | None, str], _Entry] = OrderedDict()
+        # The latest version seen for each user, and when it was last checked
+        self._versions: dict[str | None, tuple[int, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.version_checks = 0
+        self.invalidations = 0
+
+    async def get_many(self, role: Role, names: Iterable[str]) -> list[Secret]:
+        """Get the named secrets, fetching the ones that aren't cached."""
+        names = list(dict.fromkeys(names))
+        if self._version_is_stale(role.user_id):
+            _, version = await self._fetch(role, [])
+            with self._lock:
+                self.version_checks += 1
+                self._observe_version(role.user_id, version)
+        found: dict[str, Secret] = {}
+        with self._lock:
+            now = self._clock()
+            for name in names:
+                if (secret := self._get(role.user_id, name, now)) is not None:
+                    found[name] = secret
+            missing = [name for name in names if name not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            secrets, version = await self._fetch(role, missing)
+            with self._lock:
+                self._observe_version(role.user_id, version)
+                expires_at = self._clock() + self.ttl
+                for secret in secrets:
+                    found[secret.name] = secret
+                    self._put(role.user_id, secret, version, expires_at)
+        return [found[name] for name in names if name in found]
+
+    def _version_is_stale(self, user_id: str | None) -> bool:
+        """Whether the user's version is due a check, if anything can be cached."""
+        with self._lock:
+            if self.ttl <= 0 or (seen := self._versions.get(user_id)) is None:
+                return False
+            return self._clock() - seen[1] >= self.version_ttl
+
+    def _get(self, user_id: str | None, name: str, now: float) -> Secret | None:
+        entry = self._entries.get((user_id, name))
+        if entry is None:
+            return None
+        version, _ = self._versions.get(user_id, (None, None))
+        if entry.expires_at <= now or entry.version != version:
+            del self._entries[(user_id, name)]
+            return None
+        self._entries.move_to_end((user_id, name))
+        return entry.secret
+
+    def _put(
+        self, user_id: str | None, secret: Secret, version: int, expires_at: float
+    ) -> None:
+        if self.ttl <= 0:
+            return
+        self._entries[(user_id, secret.name)] = _Entry(secret, version, expires_at)
+        self._entries.move_to_end((user_id, secret.name))
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _observe_version(self, user_id: str | None, version: int) -> None:
+        """Record a version returned by the API. Call with the lock held."""
+        known, _ = self._versions.get(user_id, (None, None))
+        # Concurrent fetches can complete out of order, never go backwards
+        self._versions[user_id] = (max(version, known or 0), self._clock())
+        if known is None or version <= known:
+            return
+        self.invalidations += 1
+        for key in [key for key in self._entries if key[0] == user_id]:
+            if self._entries[key].version != version:
+                del self._entries[key]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "version_checks": self.version_checks,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hit_rate, 4),
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = self.misses = self.version_checks = self.invalidations = 0
+
+
+secret_cache = SecretCache()
@@ -4,13 +4,14 @@ from __future__ import annotations
 
 import hashlib
 import os
-from functools import partial
+from collections.abc import Iterable
+from functools import lru_cache, partial
 from typing import Annotated, Any, Literal
 
 import httpx
 import orjson
 import psycopg
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from fastapi import Depends, HTTPException, Request, Security, status
 from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from jose import ExpiredSignatureError, JWTError, jwk, jwt
@@ -70,33 +71,47 @@ def compute_hash(object_id: str) -> str:
     ).hexdigest()
 
 
+@lru_cache(maxsize=8)
+def _cipher_from_keys(keys: str) -> MultiFernet:
+    return MultiFernet([Fernet(key.strip()) for key in keys.split(",")])
+
+
+def get_cipher() -> MultiFernet:
+    """Get the cipher for `TRACECAT__DB_ENCRYPTION_KEY`.
+
+    The variable holds a comma-separated list of Fernet keys. Values are
+    encrypted with the first key, and can be decrypted with any of them, so a
+    key is rotated by putting a new key in front of it. Ciphers are cached per
+    key list.
+    """
+    return _cipher_from_keys(os.environ["TRACECAT__DB_ENCRYPTION_KEY"])
+
+
 def encrypt(value: str) -> bytes:
-    key = os.environ["TRACECAT__DB_ENCRYPTION_KEY"]
-    cipher_suite = Fernet(key)
-    encrypted_value = cipher_suite.encrypt(value.encode())
-    return encrypted_value
+    return get_cipher().encrypt(value.encode())
 
 
 def decrypt(encrypted_value: bytes) -> str:
-    key = os.environ["TRACECAT__DB_ENCRYPTION_KEY"]
-    cipher_suite = Fernet(key)
-    decrypted_value = cipher_suite.decrypt(encrypted_value).decode()
-    return decrypted_value
+    return get_cipher().decrypt(encrypted_value).decode()
 
 
 def encrypt_object(obj: dict[str, Any]) -> bytes:
-    key = os.environ["TRACECAT__DB_ENCRYPTION_KEY"]
-    cipher_suite = Fernet(key)
-    obj_bytes = orjson.dumps(obj)
-    encrypted_value = cipher_suite.encrypt(obj_bytes)
-    return encrypted_value
+    return get_cipher().encrypt(orjson.dumps(obj))
 
 
 def decrypt_object(encrypted_obj: bytes) -> dict[str, Any]:
-    key = os.environ["TRACECAT__DB_ENCRYPTION_KEY"]
-    cipher_suite = Fernet(key)
-    obj_bytes = cipher_suite.decrypt(encrypted_obj)
-    return orjson.loads(obj_bytes)
+    return orjson.loads(get_cipher().decrypt(encrypted_obj))
+
+
+def decrypt_objects(encrypted_objs: Iterable[bytes]) -> list[dict[str, Any]]:
+    """Decrypt many objects with one cipher."""
+    decrypt_token = get_cipher().decrypt
+    return [orjson.loads(decrypt_token(obj)) for obj in encrypted_objs]
+
+
+def rotate_encryption(encrypted_value: bytes) -> bytes:
+    """Re-encrypt a value with the primary (first) key."""
+    return get_cipher().rotate(encrypted_value)
 
 
 # TODO: Fix this
@@ -4,38 +4,46 @@ from __future__ import annotations
 
 import asyncio
 import os
+from contextvars import Token
 from typing import TYPE_CHECKING, Literal, Self
 
 from loguru import logger
 
-from tracecat.auth.clients import AuthenticatedAPIClient
+from tracecat.auth.cache import secret_cache
 from tracecat.auth.credentials import Role
-from tracecat.contexts import ctx_role
+from tracecat.contexts import ctx_role, ctx_secrets
 
 if TYPE_CHECKING:
     from tracecat.db.schemas import Secret
 
 
 class AuthSandbox:
-    """Context manager to temporarily set secrets in the environment as env vars.
+    """Context manager to temporarily make secrets available to a UDF.
 
     Motivation
     ----------
-    - This allows use of `os.environ` to access secrets in the environment in UDFs.
-    - We wrap the execution of a UDF with this context manager to set secrets in the environment.
+    - We wrap the execution of a UDF with this context manager to give it its secrets.
+    - With the `context` target, secret keys are set in a context-local scope that
+      UDFs read with `tracecat.secrets.get`. Concurrent UDFs don't see each other's
+      secrets, and `secrets` maps secret names to their keys, for templating.
+    - The `env` target sets secret keys as env vars, for UDFs that read `os.environ`.
+      The environment is shared by the whole process, so this is only safe if UDFs
+      with different secrets never run concurrently.
     """
 
     def __init__(
         self,
         role: Role | None = None,
         secrets: list[str] | None = None,
-        target: Literal["env", "context"] = "env",
+        target: Literal["env", "context"] = "context",
     ):
         self._role = role or ctx_role.get()
         self._secret_paths: list[str] = secrets
         self._secret_objs: list[Secret] = []
         self._target = target
         self._context = {}
+        self._scope_token: Token[dict[str, str]] | None = None
+        self._env_keys: list[str] = []
 
     def __enter__(self) -> Self:
         if self._secret_paths:
@@ -64,52 +72,53 @@ class AuthSandbox:
 
     def _set_secrets(self):
         """Set secrets in the target."""
+
+        # XXX: This import is necessary to avoid horrendous circular import errors
+        from tracecat.db.schemas import Secret
+
+        all_keys = Secret.decrypt_keys(self._secret_objs)
         if self._target == "context":
             logger.info(
                 "Setting secrets in the context",
                 paths=self._secret_paths,
                 objs=self._secret_objs,
             )
-            for secret in self._secret_objs:
-                self._context[secret.name] = {
-                    kv.key: kv.value.get_secret_value() for kv in secret.keys
-                }
+            scope = dict(ctx_secrets.get() or {})
+            for secret, keys in zip(self._secret_objs, all_keys, strict=True):
+                values = {kv.key: kv.value.get_secret_value() for kv in keys or []}
+                self._context[secret.name] = values
+                scope.update(values)
+            self._scope_token = ctx_secrets.set(scope)
         else:
             logger.info("Setting secrets in the environment", paths=self._secret_paths)
-            for secret in self._secret_objs:
-                for kv in secret.keys:
+            for keys in all_keys:
+                for kv in keys or []:
                     os.environ[kv.key] = kv.value.get_secret_value()
+                    self._env_keys.append(kv.key)
 
     def _unset_secrets(self):
         if self._target == "context":
             for secret in self._secret_objs:
                 if secret.name in self._context:
                     del self._context[secret.name]
+            if self._scope_token is not None:
+                ctx_secrets.reset(self._scope_token)
+                self._scope_token = None
         else:
-            for secret in self._secret_objs:
-                for kv in secret.keys:
-                    if kv.key in os.environ:
-                        del os.environ[kv.key]
+            for key in self._env_keys:
+                os.environ.pop(key, None)
+            self._env_keys.clear()
 
     async def _get_secrets(self) -> list[Secret]:
-        """Retrieve secrets from the secrets API."""
-
-        # XXX: This import is necessary to avoid horrendous circular import errors
-        from tracecat.db.schemas import Secret
+        """Retrieve secrets from the secrets API, or the worker's secret cache."""
 
         logger.info(
             "Retrieving secrets from the secrets API",
             secret_names=self._secret_paths,
             role=self._role,
         )
+        # Paths like `my_secret.KEY_1` and `my_secret.KEY_2` share a secret
         secret_names = (path.split(".")[0] for path in self._secret_paths)
-
-        async with AuthenticatedAPIClient(role=self._role) as client:
-            # NOTE(perf): This is not really batched - room for improvement
-            secret_responses = await asyncio.gather(
-                *[client.get(f"/secrets/{secret_name}") for secret_name in secret_names]
-            )
-            return [
-                Secret.model_validate_json(secret_bytes.content)
-                for secret_bytes in secret_responses
-            ]
+        secrets = await secret_cache.get_many(self._role, secret_names)
+        logger.debug("Secret cache", **secret_cache.stats())
+        return secrets
@@ -27,6 +27,91 @@ TRACECAT__TRIAGE_DIR.mkdir(parents=True, exist_ok=True)
 
 TRACECAT__SERVICE_ROLES_WHITELIST = ["tracecat-runner", "tracecat-api", "tracecat-cli"]
 
+# Blob store configs
+TRACECAT__BLOB_OFFLOAD_THRESHOLD_BYTES = int(
+    os.environ.get("TRACECAT__BLOB_OFFLOAD_THRESHOLD_BYTES", 0)
+)  # Action results larger than this are offloaded. 0 disables offloading.
+TRACECAT__BLOB_STORE = os.environ.get(
+    "TRACECAT__BLOB_STORE", "local"
+)  # local | s3. With more than one worker, local needs a shared volume
+TRACECAT__BLOB_STORE_DIR = Path(
+    os.environ.get("TRACECAT__BLOB_STORE_DIR", TRACECAT_DIR / "blobs")
+)
+TRACECAT__BLOB_STORE_BUCKET = os.environ.get("TRACECAT__BLOB_STORE_BUCKET")
+TRACECAT__BLOB_STORE_ENDPOINT_URL = os.environ.get(
+    "TRACECAT__BLOB_STORE_ENDPOINT_URL"
+)  # For S3-compatible stores, e.g. MinIO
+
+# Payload compression configs
+TRACECAT__PAYLOAD_COMPRESSION = os.environ.get(
+    "TRACECAT__PAYLOAD_COMPRESSION", "zstd"
+)  # zstd | lz4 | none. Compressed payloads always decode, whatever this is set to.
+TRACECAT__PAYLOAD_COMPRESSION_THRESHOLD_BYTES = int(
+    os.environ.get("TRACECAT__PAYLOAD_COMPRESSION_THRESHOLD_BYTES", 1024)
+)  # Payloads smaller than this are sent uncompressed
+
+# Expression configs
+TRACECAT__FN_COLUMNAR_MIN_SIZE = int(
+    os.environ.get("TRACECAT__FN_COLUMNAR_MIN_SIZE", 10_000)
+)  # Mapped functions over lists at least this long run on Polars where possible
+
+# Registry configs
+TRACECAT__REGISTRY_MANIFEST_PATH = os.environ.get(
+    "TRACECAT__REGISTRY_MANIFEST_PATH",
+    Path(__file__).parent / "registry_manifest.json",
+)  # Written at build time. Set to an empty string to always import all actions
+
+# Executor configs
+TRACECAT__EXECUTOR_IO_THREADS = int(
+    os.environ.get("TRACECAT__EXECUTOR_IO_THREADS", 32)
+)  # Threads for sync UDFs placed on `io`, the default
+TRACECAT__EXECUTOR_CPU_THREADS = int(
+    os.environ.get("TRACECAT__EXECUTOR_CPU_THREADS", os.cpu_count() or 1)
+)  # Threads for sync UDFs placed on `cpu`
+TRACECAT__EXECUTOR_PROCESSES = int(
+    os.environ.get("TRACECAT__EXECUTOR_PROCESSES", os.cpu_count() or 1)
+)  # Processes for sync UDFs placed on `process`. 0 runs them on `cpu` threads
+
+# HTTP client configs
+TRACECAT__HTTP2 = os.environ.get("TRACECAT__HTTP2", "true").lower() in (
+    "true",
+    "1",
+)  # Pooled UDF HTTP clients use HTTP/2 where servers support it
+TRACECAT__HTTP_TIMEOUT_SECONDS = float(
+    os.environ.get("TRACECAT__HTTP_TIMEOUT_SECONDS", 5)
+)
+TRACECAT__HTTP_MAX_CONNECTIONS = int(
+    os.environ.get("TRACECAT__HTTP_MAX_CONNECTIONS", 100)
+)  # Per pooled client, i.e. per base URL and auth scope
+TRACECAT__HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("TRACECAT__HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+)
+TRACECAT__HTTP_KEEPALIVE_EXPIRY_SECONDS = float(
+    os.environ.get("TRACECAT__HTTP_KEEPALIVE_EXPIRY_SECONDS", 30)
+)
+
+# Rate limit configs
+TRACECAT__RATE_LIMIT_BACKEND = os.environ.get(
+    "TRACECAT__RATE_LIMIT_BACKEND", "local"
+)  # local | api. With `api`, all workers share the rate limits of integrations
+TRACECAT__RATE_LIMITS = os.environ.get(
+    "TRACECAT__RATE_LIMITS"
+)  # JSON object of rate limit keys to limits, overriding the declared ones
+
+# Secrets configs
+TRACECAT__SECRET_CACHE_TTL_SECONDS = float(
+    os.environ.get("TRACECAT__SECRET_CACHE_TTL_SECONDS", 30)
+)  # How long workers cache fetched secrets. 0 disables the cache
+TRACECAT__SECRET_CACHE_VERSION_TTL_SECONDS = float(
+    os.environ.get("TRACECAT__SECRET_CACHE_VERSION_TTL_SECONDS", 5)
+)  # How often workers check whether a user's cached secrets changed
+TRACECAT__UNSAFE_SECRETS_IN_ENV = os.environ.get(
+    "TRACECAT__UNSAFE_SECRETS_IN_ENV", "false"
+).lower() in (
+    "true",
+    "1",
+)  # Also set UDF secrets as env vars. Not safe for concurrent UDFs
+
 # Temporal configs
 TEMPORAL__CLUSTER_URL = os.environ.get(
     "TEMPORAL__CLUSTER_URL", "http://localhost:7233"
@@ -38,6 +123,12 @@ TEMPORAL__TLS_ENABLED = os.environ.get("TEMPORAL__TLS_ENABLED", False)
 TEMPORAL__TLS_ENABLED = os.environ.get("TEMPORAL__TLS_ENABLED", False)
 TEMPORAL__TLS_CLIENT_CERT = os.environ.get("TEMPORAL__TLS_CLIENT_CERT")
 TEMPORAL__TLS_CLIENT_PRIVATE_KEY = os.environ.get("TEMPORAL__TLS_CLIENT_PRIVATE_KEY")
+TEMPORAL__CLIENT_HEALTH_CHECK_INTERVAL = float(
+    os.environ.get("TEMPORAL__CLIENT_HEALTH_CHECK_INTERVAL", 30)
+)  # Seconds between health checks of the shared Temporal client
+TEMPORAL__MAX_CONCURRENT_ACTIVITIES = int(
+    os.environ.get("TEMPORAL__MAX_CONCURRENT_ACTIVITIES", 100)
+)  # Per worker. Keep this low if TRACECAT__UNSAFE_SECRETS_IN_ENV is set
 
 # Tenacity Retry Settings
 RETRY_EXPONENTIAL_MULTIPLIER = 1
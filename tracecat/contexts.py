@@ -21,3 +21,4 @@ class RunContext(BaseModel):
 ctx_run: ContextVar[RunContext] = ContextVar("run", default=None)
 ctx_role: ContextVar[Role] = ContextVar("role", default=None)
 ctx_logger: ContextVar[logging.Logger] = ContextVar("logger", default=None)
+ctx_secrets: ContextVar[dict[str, str]] = ContextVar("secrets", default=None)
@@ -13,6 +13,7 @@ from sqlmodel import (
 )
 
 from tracecat import config
+from tracecat.db.migrations import upgrade_db_schema
 from tracecat.db.schemas import (
     DEFAULT_CASE_ACTIONS,
     Action,
@@ -66,6 +67,7 @@ def initialize_db() -> Engine:
     # Relational table
     engine = create_db_engine()
     SQLModel.metadata.create_all(engine)
+    upgrade_db_schema(engine)
 
     # VectorDB
     db = create_vdb_conn()
@@ -97,7 +99,10 @@ def initialize_db() -> Engine:
         # Add integrations to integrations table regardless of whether it's empty
         session.exec(delete(UDFSpec))
         registry.init()
-        udfs = [UDFSpec.from_registry_udf(key, udf) for key, udf in registry]
+        udfs = [
+            UDFSpec.from_udf_schema(key, schema)
+            for key, schema in registry.get_schemas().items()
+        ]
         logger.info("Initializing UDF registry with default UDFs.", n=len(udfs))
         session.add_all(udfs)
         session.commit()
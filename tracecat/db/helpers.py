@@ -1,24 +1,23 @@
 from __future__ import annotations
 
-import asyncio
+from pydantic import TypeAdapter
 
 from tracecat.auth.clients import AuthenticatedAPIClient
 from tracecat.auth.credentials import Role
 from tracecat.db.schemas import Secret
 
+SecretList = TypeAdapter(list[Secret])
+
 
 async def batch_get_secrets(role: Role, secret_names: list[str]) -> list[Secret]:
     """Retrieve secrets from the secrets API."""
 
     async with AuthenticatedAPIClient(role=role) as client:
-        # NOTE(perf): This is not really batched - room for improvement
-        secret_responses = await asyncio.gather(
-            *[client.get(f"/secrets/{secret_name}") for secret_name in secret_names]
+        response = await client.post(
+            "/secrets/batch", json={"names": list(dict.fromkeys(secret_names))}
         )
-        return [
-            Secret.model_validate_json(secret_bytes.content)
-            for secret_bytes in secret_responses
-        ]
+        response.raise_for_status()
+        return SecretList.validate_json(response.content)
 
 
 def format_secrets_as_json(secrets: list[Secret]) -> dict[str, str]:
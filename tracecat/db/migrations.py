@@ -0,0 +1,30 @@
+"""Upgrades for databases created by an older version.
+
+`SQLModel.metadata.create_all` creates missing tables, but never adds columns
+to tables that already exist. Columns added to existing tables are listed in
+`COLUMN_UPGRADES`, and added by `upgrade_db_schema` when they're missing.
+"""
+
+from loguru import logger
+from sqlalchemy import Engine, inspect, text
+
+COLUMN_UPGRADES: list[tuple[str, str, str]] = [
+    # (table, column, column definition)
+    ("user", "secrets_version", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def upgrade_db_schema(engine: Engine) -> None:
+    """Add the columns in `COLUMN_UPGRADES` that existing tables are missing."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column, definition in COLUMN_UPGRADES:
+            if table not in tables:
+                continue
+            if column in {c["name"] for c in inspector.get_columns(table)}:
+                continue
+            logger.info("Adding missing column", table=table, column=column)
+            conn.execute(
+                text(f'ALTER TABLE "{table}" ADD COLUMN {column} {definition}')
+            )
@@ -1,15 +1,29 @@
 """Database schemas for Tracecat."""
 
+from collections.abc import Sequence
 from datetime import datetime
 from typing import Any, Self
 
 import pyarrow as pa
 from pydantic import computed_field, field_validator
-from sqlalchemy import JSON, TIMESTAMP, Column, ForeignKey, String, text
+from sqlalchemy import (
+    JSON,
+    TIMESTAMP,
+    Column,
+    ForeignKey,
+    String,
+    UniqueConstraint,
+    text,
+)
 from sqlmodel import Field, Relationship, SQLModel
 
 from tracecat import config, registry
-from tracecat.auth.credentials import compute_hash, decrypt_object, encrypt_object
+from tracecat.auth.credentials import (
+    compute_hash,
+    decrypt_object,
+    decrypt_objects,
+    encrypt_object,
+)
 from tracecat.dsl.common import DSLInput
 from tracecat.identifiers import action, id_factory
 from tracecat.types.secrets import SECRET_FACTORY, SecretBase, SecretKeyValue
@@ -53,6 +67,10 @@ class User(Resource, table=True):
     )
     tier: str = "free"  # "free" or "premium"
     settings: str | None = None  # JSON-serialized String of settings
+    # Bumped whenever one of the user's secrets changes, so that workers can
+    # tell when their cached secrets are stale. Added to existing databases by
+    # `tracecat.db.migrations`
+    secrets_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     owned_workflows: list["Workflow"] = Relationship(
         back_populates="owner",
         sa_relationship_kwargs={"cascade": "all, delete"},
@@ -96,9 +114,7 @@ class Secret(Resource, table=True):
         """Getter: Decrypt the keys and return them as a list of SecretKeyValue objects."""
         if not self.encrypted_keys:
             return None
-        obj = decrypt_object(self.encrypted_keys)
-        kv = self._validate_obj(obj)
-        return [SecretKeyValue(key=k, value=v) for k, v in kv.model_dump().items()]
+        return self._to_keys(decrypt_object(self.encrypted_keys))
 
     @keys.setter
     def keys(self, value: list[SecretKeyValue]) -> None:
@@ -108,6 +124,38 @@ class Secret(Resource, table=True):
         self._validate_obj(kv)
         self.encrypted_keys = encrypt_object(kv)
 
+    def _to_keys(self, obj: dict[str, Any]) -> list[SecretKeyValue]:
+        kv = self._validate_obj(obj)
+        return [SecretKeyValue(key=k, value=v) for k, v in kv.model_dump().items()]
+
+    @staticmethod
+    def decrypt_keys(
+        secrets: Sequence["Secret"],
+    ) -> list[list[SecretKeyValue] | None]:
+        """Decrypt the keys of many secrets in one pass.
+
+        Same as reading `keys` from each secret, but with one cipher.
+        """
+        encrypted = [secret for secret in secrets if secret.encrypted_keys]
+        objs = iter(decrypt_objects(secret.encrypted_keys for secret in encrypted))
+        return [
+            secret._to_keys(next(objs)) if secret.encrypted_keys else None
+            for secret in secrets
+        ]
+
+
+class RateLimitBucket(Resource, table=True):
+    """A user's token bucket for a rate limit key, shared by all workers."""
+
+    __table_args__ = (UniqueConstraint("owner_id", "key"),)
+
+    key: str = Field(..., max_length=255, index=True)
+    tokens: float
+    refilled_at: float  # Seconds since the epoch, by the API's clock
+    owner_id: str = Field(
+        sa_column=Column(String, ForeignKey("user.id", ondelete="CASCADE"))
+    )
+
 
 class CaseAction(Resource, table=True):
     id: str = Field(
@@ -181,6 +229,21 @@ class UDFSpec(Resource, table=True):
             meta=udf.metadata,
         )
 
+    @staticmethod
+    def from_udf_schema(
+        key: str, schema: registry.UDFSchema, owner_id: str = "tracecat"
+    ) -> Self:
+        """Create a spec from a UDF's schema, e.g. from the registry manifest."""
+        return UDFSpec(
+            owner_id=owner_id,
+            key=key,
+            description=schema["description"],
+            namespace=schema["namespace"],
+            version=schema["version"],
+            json_schema=schema,
+            meta=schema["metadata"],
+        )
+
 
 class WorkflowDefinition(Resource, table=True):
     """A workflow definition.
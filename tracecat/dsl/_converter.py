@@ -1,21 +1,56 @@
-from typing import Any
+import threading
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from typing import Any, TypeVar
 
+import lz4.frame
 import orjson
+import zstandard
 from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, PydanticSchemaGenerationError, TypeAdapter
 from temporalio.api.common.v1 import Payload
 from temporalio.converter import (
     CompositePayloadConverter,
     DataConverter,
     DefaultPayloadConverter,
     JSONPlainPayloadConverter,
+    PayloadCodec,
+    value_to_type,
 )
 
+from tracecat import config
+from tracecat.expressions.validators import TRUSTED_CONTEXT
+
+ModelT = TypeVar("ModelT", bound=type[BaseModel])
+
+
+def trusted_payload_type(cls: ModelT) -> ModelT:
+    """Mark a model as trusted when decoding payloads.
+
+    Use this for models that are only ever serialized by us, from values that
+    were already validated, e.g. workflow and activity inputs. These are
+    decoded with `TRUSTED_CONTEXT`, so validators that guard against bad user
+    input are skipped. Everything else is fully validated.
+    """
+    cls.__tracecat_trusted_payload__ = True
+    return cls
+
+
+# Models validate themselves, so this only holds other types, e.g. TypedDicts
+@lru_cache(maxsize=256)
+def _get_type_adapter(type_hint: Any) -> TypeAdapter | None:
+    try:
+        return TypeAdapter(type_hint)
+    except PydanticSchemaGenerationError:
+        return None
+
 
 class PydanticORJSONPayloadConverter(JSONPlainPayloadConverter):
     """Pydantic ORJSON payload converter.
 
     This extends the :py:class:`JSONPlainPayloadConverter` to override
-    :py:meth:`to_payload` using the Pydantic encoder.
+    :py:meth:`to_payload` using the Pydantic encoder, and :py:meth:`from_payload`
+    using ORJSON and a cached Pydantic `TypeAdapter` per type.
     """
 
     def to_payload(self, value: Any) -> Payload | None:
@@ -33,6 +68,25 @@ class PydanticORJSONPayloadConverter(JSONPlainPayloadConverter):
             ),
         )
 
+    def from_payload(self, payload: Payload, type_hint: type | None = None) -> Any:
+        """Decode with ORJSON, and validate against `type_hint` if given."""
+        try:
+            obj = orjson.loads(payload.data)
+        except orjson.JSONDecodeError as err:
+            raise RuntimeError("Failed parsing") from err
+        if type_hint is None or type_hint is Any:
+            return obj
+        if isinstance(type_hint, type) and issubclass(type_hint, BaseModel):
+            trusted = getattr(type_hint, "__tracecat_trusted_payload__", False)
+            return type_hint.model_validate(
+                obj, context=TRUSTED_CONTEXT if trusted else None
+            )
+        adapter = _get_type_adapter(type_hint)
+        if adapter is None:
+            # Not something Pydantic can validate, use Temporal's conversion
+            return value_to_type(type_hint, obj, self._custom_type_converters)
+        return adapter.validate_python(obj)
+
 
 class PydanticPayloadConverter(CompositePayloadConverter):
     """Payload converter that replaces Temporal JSON conversion with Pydantic
@@ -50,7 +104,93 @@ class PydanticPayloadConverter(CompositePayloadConverter):
         )
 
 
+COMPRESSED_ENCODING = b"binary/compressed"
+"""Payload encoding for compressed payloads. The codec is in `compression`."""
+
+Compressor = tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+# zstd (de)compressor objects aren't thread safe, and the codec also runs in
+# executor threads, so each thread gets its own
+_zstd = threading.local()
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    if (compressor := getattr(_zstd, "compressor", None)) is None:
+        compressor = _zstd.compressor = zstandard.ZstdCompressor()
+    return compressor.compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    if (decompressor := getattr(_zstd, "decompressor", None)) is None:
+        decompressor = _zstd.decompressor = zstandard.ZstdDecompressor()
+    return decompressor.decompress(data)
+
+
+COMPRESSORS: dict[str, Compressor] = {
+    "zstd": (_zstd_compress, _zstd_decompress),
+    "lz4": (lz4.frame.compress, lz4.frame.decompress),
+}
+"""Available compression codecs, as (compress, decompress) pairs."""
+
+
+class CompressionPayloadCodec(PayloadCodec):
+    """Compress payloads larger than `threshold` bytes.
+
+    The serialized payload is compressed and wrapped in a new payload, with
+    the codec recorded in its metadata. Payloads that aren't wrapped (e.g.
+    from histories written before compression was enabled) decode as-is, and
+    payloads compressed with any known codec decode regardless of the codec
+    used to encode.
+    """
+
+    def __init__(self, codec: str = "zstd", *, threshold: int = 1024) -> None:
+        if codec not in COMPRESSORS:
+            raise ValueError(f"Unknown compression codec {codec!r}")
+        self.codec = codec
+        self.threshold = threshold
+        self._compress, _ = COMPRESSORS[codec]
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._encode(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._decode(payload) for payload in payloads]
+
+    def _encode(self, payload: Payload) -> Payload:
+        if payload.ByteSize() < self.threshold:
+            return payload
+        return Payload(
+            metadata={
+                "encoding": COMPRESSED_ENCODING,
+                "compression": self.codec.encode(),
+            },
+            data=self._compress(payload.SerializeToString()),
+        )
+
+    def _decode(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != COMPRESSED_ENCODING:
+            return payload
+        codec = payload.metadata["compression"].decode()
+        if codec not in COMPRESSORS:
+            raise ValueError(f"Unknown compression codec {codec!r}")
+        _, decompress = COMPRESSORS[codec]
+        decoded = Payload()
+        decoded.ParseFromString(decompress(payload.data))
+        return decoded
+
+
+def get_payload_codec() -> PayloadCodec | None:
+    """Get the configured payload codec, or None if compression is disabled."""
+    if config.TRACECAT__PAYLOAD_COMPRESSION == "none":
+        return None
+    return CompressionPayloadCodec(
+        config.TRACECAT__PAYLOAD_COMPRESSION,
+        threshold=config.TRACECAT__PAYLOAD_COMPRESSION_THRESHOLD_BYTES,
+    )
+
+
 pydantic_data_converter = DataConverter(
-    payload_converter_class=PydanticPayloadConverter
+    payload_converter_class=PydanticPayloadConverter,
+    payload_codec=get_payload_codec(),
 )
 """Data converter using Pydantic JSON conversion."""
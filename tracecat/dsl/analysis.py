@@ -0,0 +1,157 @@
+"""Static analysis of actions in workflow definitions.
+
+An action's templated `args`, `run_if` and `for_each` are the same for every
+run of a workflow definition version, so anything we learn by scanning them
+(secrets, templates, context dependencies, loop variables) only needs to be
+computed once. Each process computes an action's analysis on first use, and
+caches it by workflow definition, version and action ref.
+
+Runs that don't come from a committed definition, e.g. workflows dispatched
+from YAML, have no definition key and are analyzed on every use.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from tracecat.dsl.common import ActionStatement
+from tracecat.expressions import (
+    ExprContext,
+    TemplateSkeleton,
+    extract_templated_dependencies,
+    extract_templated_secrets,
+    patterns,
+)
+
+ITERATOR_PATTERN = re.compile(patterns.ITERATOR_BASE)
+
+
+def definition_key(workflow_id: str, version: int) -> str:
+    """Identify a committed workflow definition version."""
+    return f"{workflow_id}:{version}"
+
+
+@dataclass(frozen=True, slots=True)
+class ActionAnalysis:
+    """What an action reads, found by scanning its statement."""
+
+    secrets: tuple[str, ...]
+    """Names of the secrets referenced in `args`"""
+
+    skeleton: TemplateSkeleton
+    """The `args`, with their templates compiled"""
+
+    dependencies: dict[ExprContext, frozenset[str]]
+    """Top-level context keys read by `args`, `run_if` and `for_each`"""
+
+    args_dependencies: dict[ExprContext, frozenset[str]]
+    """Top-level context keys read by `args` only"""
+
+    workflow_dependencies: dict[ExprContext, frozenset[str]]
+    """Top-level context keys read by workflow code: `run_if`, and `for_each`
+    if the loop is sharded. Results read here are never offloaded."""
+
+    loop_vars: tuple[str, ...]
+    """Variables defined by `for_each`, e.g. `var.item`"""
+
+    @property
+    def template_paths(self) -> list[tuple[str | int, ...]]:
+        """Paths to the templated values in `args`."""
+        return self.skeleton.paths
+
+    @classmethod
+    def analyze(cls, task: ActionStatement) -> ActionAnalysis:
+        def freeze(deps: dict[ExprContext, set[str]]):
+            return {ctx: frozenset(keys) for ctx, keys in deps.items()}
+
+        for_each = [task.for_each] if isinstance(task.for_each, str) else task.for_each
+        loop_vars = [
+            match.group("iter_var_expr")
+            for expr in for_each or []
+            if (match := ITERATOR_PATTERN.search(expr))
+        ]
+        sharded = task.for_each is not None and task.for_each_policy.shard_size
+        return cls(
+            secrets=tuple(sorted(extract_templated_secrets(task.args))),
+            skeleton=TemplateSkeleton.compile(task.args),
+            dependencies=freeze(
+                extract_templated_dependencies([task.args, task.run_if, task.for_each])
+            ),
+            args_dependencies=freeze(extract_templated_dependencies(task.args)),
+            workflow_dependencies=freeze(
+                extract_templated_dependencies(
+                    [task.run_if, task.for_each if sharded else None]
+                )
+            ),
+            loop_vars=tuple(loop_vars),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class AnalysisLookup:
+    analysis: ActionAnalysis
+    hit: bool
+    time_saved: float
+    """Seconds it took to analyze the action, if this was a cache hit"""
+
+
+class AnalysisCache:
+    """LRU cache of action analyses, keyed by definition key and action ref.
+
+    Hits, misses and the time saved by hits are counted, see `stats`.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self._cache: OrderedDict[tuple[str, str], tuple[ActionAnalysis, float]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+
+    def get(self, defn_key: str | None, task: ActionStatement) -> AnalysisLookup:
+        """Get the analysis of `task`, analyzing it if it isn't cached."""
+        key = (defn_key, task.ref)
+        if defn_key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            analysis, elapsed = self._cache[key]
+            self.hits += 1
+            self.time_saved += elapsed
+            return AnalysisLookup(analysis, hit=True, time_saved=elapsed)
+
+        start = time.perf_counter()
+        analysis = ActionAnalysis.analyze(task)
+        elapsed = time.perf_counter() - start
+        self.misses += 1
+        if defn_key is not None:
+            self._cache[key] = (analysis, elapsed)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return AnalysisLookup(analysis, hit=False, time_saved=0.0)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "time_saved_seconds": round(self.time_saved, 6),
+            "size": len(self._cache),
+        }
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self.hits = self.misses = 0
+        self.time_saved = 0.0
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,112 @@
+"""Process-wide Temporal client.
+
+Connecting to Temporal costs a gRPC handshake (plus TLS, if enabled), so we
+share a single client per process instead of connecting for every dispatch.
+Temporal clients multiplex concurrent calls over one channel and are safe to
+share between coroutines.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+
+from temporalio.client import Client, TLSConfig
+
+from tracecat import config
+from tracecat.dsl._converter import pydantic_data_converter
+from tracecat.logging import logger
+
+
+async def connect_temporal_client() -> Client:
+    """Open a new connection to the configured Temporal cluster."""
+    tls_config = False
+    if config.TEMPORAL__TLS_ENABLED:
+        tls_config = TLSConfig(
+            client_cert=config.TEMPORAL__TLS_CLIENT_CERT,
+            client_private_key=config.TEMPORAL__TLS_CLIENT_PRIVATE_KEY,
+        )
+
+    return await Client.connect(
+        target_host=config.TEMPORAL__CLUSTER_URL,
+        namespace=config.TEMPORAL__CLUSTER_NAMESPACE,
+        tls=tls_config,
+        data_converter=pydantic_data_converter,
+    )
+
+
+class TemporalClientManager:
+    """Lazily connect to Temporal and share the client.
+
+    The client is created on first use. If it hasn't been checked for
+    `health_check_interval` seconds, the next caller checks the connection
+    before it's handed out, and reconnects if the check fails. Callers that
+    hit a connection error can also call `invalidate` to force a reconnect.
+
+    A client is bound to the event loop it was created in, so a new one is
+    created if the manager is used from a different loop.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Client]] = connect_temporal_client,
+        *,
+        health_check_interval: float = config.TEMPORAL__CLIENT_HEALTH_CHECK_INTERVAL,
+        health_check_timeout: float = 5.0,
+    ) -> None:
+        self._connect = connect
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._client: Client | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+        self._last_checked = 0.0
+
+    async def get(self) -> Client:
+        """Get the shared client, connecting or reconnecting if needed."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Everything we hold belongs to another loop
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._client = None
+
+        client = self._client
+        if client is not None and not self._should_check():
+            return client
+
+        async with self._lock:
+            # Someone else may have (re)connected while we were waiting
+            if self._client is not None and not self._should_check():
+                return self._client
+            if self._client is not None and await self._is_healthy(self._client):
+                self._last_checked = time.monotonic()
+                return self._client
+            if self._client is not None:
+                logger.warning("Temporal client failed health check, reconnecting")
+            else:
+                logger.info("Connecting to Temporal")
+            self._client = await self._connect()
+            self._last_checked = time.monotonic()
+            return self._client
+
+    def invalidate(self) -> None:
+        """Drop the current client. The next `get` reconnects."""
+        self._client = None
+
+    def _should_check(self) -> bool:
+        return time.monotonic() - self._last_checked >= self.health_check_interval
+
+    async def _is_healthy(self, client: Client) -> bool:
+        try:
+            return await client.service_client.check_health(
+                timeout=timedelta(seconds=self.health_check_timeout)
+            )
+        except Exception as e:
+            logger.warning("Temporal health check failed", error=e)
+            return False
+
+
+temporal_client_manager = TemporalClientManager()
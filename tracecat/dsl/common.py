@@ -7,37 +7,57 @@ from tempfile import SpooledTemporaryFile
 from typing import Annotated, Any, Literal, Self
 
 import yaml
-from pydantic import BaseModel, ConfigDict, Field, model_validator
-from temporalio.client import Client, TLSConfig
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, model_validator
+from temporalio.client import Client
 
-from tracecat import config
-from tracecat.dsl._converter import pydantic_data_converter
+from tracecat.dsl.client import temporal_client_manager
 from tracecat.expressions import TemplateValidator
+from tracecat.expressions.validators import is_trusted
 
 SLUG_PATTERN = r"^[a-z0-9_]+$"
 ACTION_TYPE_PATTERN = r"^[a-z0-9_.]+$"
 
 
 async def get_temporal_client() -> Client:
-    tls_config = False
-    if config.TEMPORAL__TLS_ENABLED:
-        tls_config = TLSConfig(
-            client_cert=config.TEMPORAL__TLS_CLIENT_CERT,
-            client_private_key=config.TEMPORAL__TLS_CLIENT_PRIVATE_KEY,
-        )
-
-    return await Client.connect(
-        target_host=config.TEMPORAL__CLUSTER_URL,
-        namespace=config.TEMPORAL__CLUSTER_NAMESPACE,
-        tls=tls_config,
-        data_converter=pydantic_data_converter,
-    )
+    """Get the process-wide Temporal client."""
+    return await temporal_client_manager.get()
 
 
 class DSLError(ValueError):
     pass
 
 
+class ForEachPolicy(BaseModel):
+    """Execution policy for `for_each` loops."""
+
+    max_concurrency: int = Field(
+        default=64, ge=1, description="Maximum number of concurrent iterations"
+    )
+    chunk_size: int = Field(
+        default=1,
+        ge=1,
+        description="Number of iterations each concurrent worker claims at a time",
+    )
+    result_order: Literal["ordered", "unordered"] = Field(
+        default="ordered",
+        description=("Whether results are in iteration order, or in completion order."),
+    )
+    shard_size: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "If set, the loop is split into shards of this many iterations,"
+            " and each shard runs as a separate activity on any available worker."
+        ),
+    )
+    shard_timeout: int = Field(
+        default=300, ge=1, description="Timeout for each shard activity, in seconds"
+    )
+    shard_max_attempts: int = Field(
+        default=3, ge=1, description="Maximum number of attempts for each shard"
+    )
+
+
 class ActionStatement(BaseModel):
     id: str | None = Field(
         default=None,
@@ -77,6 +97,11 @@ class ActionStatement(BaseModel):
         TemplateValidator(),
     ]
 
+    for_each_policy: ForEachPolicy = Field(
+        default_factory=ForEachPolicy,
+        description="How to execute the `for_each` loop, if any.",
+    )
+
     @property
     def title(self) -> str:
         return self.ref.capitalize().replace("_", " ")
@@ -139,7 +164,9 @@ class DSLInput(BaseModel):
         return yaml.dump(self.model_dump())
 
     @model_validator(mode="after")
-    def validate_input(self) -> Self:
+    def validate_input(self, info: ValidationInfo) -> Self:
+        if is_trusted(info):
+            return self
         if not self.actions:
             raise DSLError("At least one action must be defined")
         if len({action.ref for action in self.actions}) != len(self.actions):
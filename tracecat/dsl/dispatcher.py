@@ -19,7 +19,11 @@ class DispatchResult(BaseModel):
 
 
 async def dispatch_workflow(
-    dsl: DSLInput, wf_id: identifiers.WorkflowID, **kwargs: Any
+    dsl: DSLInput,
+    wf_id: identifiers.WorkflowID,
+    *,
+    defn_key: str | None = None,
+    **kwargs: Any,
 ) -> DispatchResult:
     # Connect client
     role = ctx_role.get()
@@ -31,7 +35,7 @@ async def dispatch_workflow(
     # Run workflow
     result = await client.execute_workflow(
         DSLWorkflow.run,
-        DSLRunArgs(dsl=dsl, role=role, wf_id=wf_id),
+        DSLRunArgs(dsl=dsl, role=role, wf_id=wf_id, defn_key=defn_key),
         id=wf_exec_id,
         task_queue=os.environ.get("TEMPORAL__CLUSTER_QUEUE", "tracecat-task-queue"),
         **kwargs,
@@ -13,8 +13,11 @@ from temporalio.worker.workflow_sandbox import (
 # We always want to pass through external modules to the sandbox that we know
 # are safe for workflow use
 with workflow.unsafe.imports_passed_through():
+    from tracecat import config
     from tracecat.dsl.common import get_temporal_client
     from tracecat.dsl.workflow import DSLActivities, DSLWorkflow
+    from tracecat.executors import executors
+    from tracecat.http import http_pool
     from tracecat.registry import registry
 
 
@@ -30,14 +33,17 @@ def new_sandbox_runner() -> SandboxedWorkflowRunner:
         SandboxRestrictions.invalid_module_members_default.children
     )
     del invalid_module_member_children["datetime"]
+    restrictions = dataclasses.replace(
+        SandboxRestrictions.default,
+        invalid_module_members=dataclasses.replace(
+            SandboxRestrictions.invalid_module_members_default,
+            children=invalid_module_member_children,
+        ),
+    )
+    # Mapped expression functions are lazily lowered to Polars, which must not
+    # be reimported for every workflow run
     return SandboxedWorkflowRunner(
-        restrictions=dataclasses.replace(
-            SandboxRestrictions.default,
-            invalid_module_members=dataclasses.replace(
-                SandboxRestrictions.invalid_module_members_default,
-                children=invalid_module_member_children,
-            ),
-        )
+        restrictions=restrictions.with_passthrough_modules("polars")
     )
 
 
@@ -49,7 +55,18 @@ async def main() -> None:
     logger.info("Connecting to Temporal")
 
     registry.init()
+    if (
+        config.TRACECAT__BLOB_OFFLOAD_THRESHOLD_BYTES > 0
+        and config.TRACECAT__BLOB_STORE == "local"
+    ):
+        logger.warning(
+            "Offloading results to a local blob store. With more than one worker,"
+            " it must be on a volume shared by all of them",
+            path=config.TRACECAT__BLOB_STORE_DIR,
+        )
     client = await get_temporal_client()
+    # Pool HTTP clients on the worker's loop, where async UDFs run
+    http_pool.open()
 
     # Run a worker for the activities and workflow
     DSLActivities.init()
@@ -59,11 +76,14 @@ async def main() -> None:
         activities=DSLActivities.load(),
         workflows=[DSLWorkflow],
         workflow_runner=new_sandbox_runner(),
+        max_concurrent_activities=config.TEMPORAL__MAX_CONCURRENT_ACTIVITIES,
     ):
         # Wait until interrupted
         logger.info("Worker started, ctrl+c to exit")
         await interrupt_event.wait()
         logger.info("Shutting down")
+    await http_pool.aclose()
+    executors.shutdown()
 
 
 if __name__ == "__main__":
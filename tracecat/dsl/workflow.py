@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 from collections import defaultdict
-from collections.abc import Callable, Coroutine
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Iterator,
+)
+from dataclasses import dataclass
 from datetime import timedelta
 from enum import StrEnum, auto
 from typing import Any, TypedDict
 
 from temporalio import activity, workflow
+from temporalio.common import RetryPolicy
 
 from tracecat.contexts import RunContext
 
@@ -19,24 +28,37 @@ with workflow.unsafe.imports_passed_through():
     from tracecat.expressions import (
         ExprContext,
         IterableExpr,
+        LayeredContext,
         TemplateExpression,
+        TemplateSkeleton,
         eval_templated_object,
-        extract_templated_secrets,
     )
+    from tracecat import config
     from tracecat.auth.credentials import Role
     from tracecat.auth.sandbox import AuthSandbox
     from tracecat.contexts import ctx_logger, ctx_role, ctx_run
-    from tracecat.dsl.common import ActionStatement, DSLInput
+    from tracecat.dsl._converter import trusted_payload_type
+    from tracecat.dsl.analysis import analysis_cache
+    from tracecat.dsl.common import (
+        ActionStatement,
+        DSLError,
+        DSLInput,
+        ForEachPolicy,
+    )
     from tracecat.logging import logger
-    from tracecat.registry import registry
+    from tracecat.registry import RegisteredUDF, registry
+    from tracecat.storage import is_blob_ref, load_offloaded_results, offload_result
     from tracecat.db.schemas import Secret  # noqa
     from tracecat.identifiers import WorkflowID
 
 
+@trusted_payload_type
 class DSLRunArgs(BaseModel):
     role: Role
     dsl: DSLInput
     wf_id: WorkflowID
+    defn_key: str | None = None
+    """The committed definition version being run, see `tracecat.dsl.analysis`"""
 
 
 class DSLContext(TypedDict):
@@ -65,10 +87,70 @@ class SkipStrategy(StrEnum):
     PROPAGATE = auto()
 
 
+@dataclass(frozen=True, slots=True)
+class StaticExecutionPlan:
+    """A DSL graph compiled into topological levels.
+
+    Tasks are addressed by their index in `refs`. Every task in a level only
+    depends on tasks in earlier levels, so a level can run fully in parallel.
+    `children` and `indegrees` drive skip propagation at runtime.
+    """
+
+    refs: tuple[str, ...]
+    levels: tuple[tuple[int, ...], ...]
+    children: tuple[tuple[int, ...], ...]
+    indegrees: tuple[int, ...]
+
+    @classmethod
+    def compile(cls, dsl: DSLInput) -> StaticExecutionPlan:
+        refs = tuple(task.ref for task in dsl.actions)
+        index = {ref: i for i, ref in enumerate(refs)}
+        try:
+            parents = tuple(
+                tuple(index[dep] for dep in task.depends_on) for task in dsl.actions
+            )
+        except KeyError as e:
+            raise DSLError(f"Unknown task dependency {e.args[0]!r}") from e
+        children: list[list[int]] = [[] for _ in refs]
+        for i, deps in enumerate(parents):
+            for dep in deps:
+                children[dep].append(i)
+        indegrees = tuple(len(deps) for deps in parents)
+
+        # Kahn's algorithm, one level at a time
+        remaining = list(indegrees)
+        levels: list[tuple[int, ...]] = []
+        level = tuple(i for i, n in enumerate(indegrees) if n == 0)
+        n_visited = 0
+        while level:
+            levels.append(level)
+            n_visited += len(level)
+            next_level: list[int] = []
+            for i in level:
+                for child in children[i]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        next_level.append(child)
+            level = tuple(sorted(next_level))
+        if n_visited != len(refs):
+            raise DSLError("Workflow graph contains a cycle")
+
+        return cls(
+            refs=refs,
+            levels=tuple(levels),
+            children=tuple(tuple(c) for c in children),
+            indegrees=indegrees,
+        )
+
+
 class DSLScheduler:
-    """Manage only scheduling of tasks in a topological-like order."""
+    """Manage only scheduling of tasks in a topological-like order.
+
+    Scheduling is event driven: each task schedules its children as soon as it
+    completes, so there is no polling and the scheduler returns the moment the
+    last in-flight task finishes.
+    """
 
-    _queue_wait_timeout = 1
     skip_strategy: SkipStrategy
     """Decide how to handle tasks that are marked for skipping."""
 
@@ -81,16 +163,18 @@ class DSLScheduler:
     ):
         self.dsl = dsl
         self.tasks: dict[str, ActionStatement] = {}
-        self.adj: dict[str, set[str]] = defaultdict(set)
+        # Use lists (not sets) so that children are always scheduled in the same
+        # order. Set iteration order depends on the hash seed, which breaks replay.
+        self.adj: dict[str, list[str]] = defaultdict(list)
         self.indegrees: dict[str, int] = {}
-        self.queue: asyncio.Queue[str] = asyncio.Queue()
-        # self.running_tasks: dict[str, asyncio.Task[None]] = {}
+        self.running_tasks: dict[str, asyncio.Task[None]] = {}
         self.completed_tasks: set[str] = set()
         # Tasks can be marked for termination.
         # This is useful for tasks that are
         self.marked_tasks: dict[str, TaskMarker] = {}
         self.skip_strategy = skip_strategy
-        self._task_exceptions = {}
+        self._task_exceptions: dict[str, BaseException] = {}
+        self._tg: asyncio.TaskGroup | None = None
 
         self.executor = activity_coro
         self.logger = ctx_logger.get(logger)
@@ -99,7 +183,11 @@ class DSLScheduler:
             self.tasks[task.ref] = task
             self.indegrees[task.ref] = len(task.depends_on)
             for dep in task.depends_on:
-                self.adj[dep].add(task.ref)
+                self.adj[dep].append(task.ref)
+
+        self.plan: StaticExecutionPlan | None = None
+        if dsl.config.scheduler == "static":
+            self.plan = StaticExecutionPlan.compile(dsl)
 
     async def _dynamic_task(self, task_ref: str) -> None:
         """Dynamic task execution.
@@ -108,9 +196,17 @@ class DSLScheduler:
         -----
         1. Run the task
         2. Manage the indegrees of the tasks
+        3. Schedule any child tasks that became ready
         """
         task = self.tasks[task_ref]
-        await self.executor(task)
+        try:
+            await self.executor(task)
+        except Exception as e:
+            self.logger.error("Task failed", task_ref=task_ref, error=e)
+            self._task_exceptions[task_ref] = e
+            raise
+        finally:
+            self.running_tasks.pop(task_ref, None)
 
         # For now, tasks that were marked to skip also join this set
         self.completed_tasks.add(task_ref)
@@ -122,7 +218,7 @@ class DSLScheduler:
         # Any child task whose indegree reaches 0 must check if all its parent
         # dependencies we skipped. if ALL parents were skipped, then the child
         # task is also marked for skipping. If ANY parent was not skipped, then
-        # the child task is added to the queue.
+        # the child task is scheduled.
 
         # The intuition here is that if you have a task that becomes unreachable,
         # then some of its children will also become unreachable. A node becomes unreachable
@@ -130,29 +226,37 @@ class DSLScheduler:
 
         # This allows us to have diamond-shaped graphs where some branches can be skipped
         # but at the join point, if any parent was not skipped, then the child can still be executed.
-        async with asyncio.TaskGroup() as tg:
-            for next_task_ref in self.adj[task_ref]:
-                self.indegrees[next_task_ref] -= 1
-                if self.indegrees[next_task_ref] == 0:
-                    if (
-                        self.skip_strategy == SkipStrategy.PROPAGATE
-                        and self.task_is_reachable(next_task_ref)
-                    ):
-                        self.mark_task(next_task_ref, TaskMarker.SKIP)
-                    tg.create_task(self.queue.put(next_task_ref))
+        for next_task_ref in self.adj[task_ref]:
+            self.indegrees[next_task_ref] -= 1
+            if self.indegrees[next_task_ref] == 0:
+                if (
+                    self.skip_strategy == SkipStrategy.PROPAGATE
+                    and self.task_is_reachable(next_task_ref)
+                ):
+                    self.mark_task(next_task_ref, TaskMarker.SKIP)
+                self._schedule_task(next_task_ref)
+
+    def _schedule_task(self, task_ref: str) -> None:
+        """Start a ready task in the scheduler's task group."""
+        if self._tg is None:
+            raise RuntimeError("Scheduler is not running")
+        self.running_tasks[task_ref] = self._tg.create_task(
+            self._dynamic_task(task_ref), name=task_ref
+        )
 
     async def dynamic_start(self) -> None:
-        """Run the scheduler in dynamic mode."""
-        self.queue.put_nowait(self.dsl.entrypoint)
-        while not self.queue.empty() or len(self.completed_tasks) < len(self.tasks):
-            try:
-                task_ref = await asyncio.wait_for(
-                    self.queue.get(), timeout=self._queue_wait_timeout
-                )
-            except TimeoutError:
-                continue
+        """Run the scheduler in dynamic mode.
 
-            asyncio.create_task(self._dynamic_task(task_ref))
+        The task group only exits once every in-flight task has completed, and
+        new tasks are only ever created by running tasks, so no further tasks
+        can become ready after it exits.
+        """
+        try:
+            async with asyncio.TaskGroup() as tg:
+                self._tg = tg
+                self._schedule_task(self.dsl.entrypoint)
+        finally:
+            self._tg = None
         self.logger.info("All tasks completed")
 
     def mark_task(self, task_ref: str, marker: TaskMarker) -> None:
@@ -166,16 +270,58 @@ class DSLScheduler:
         )
 
     async def _static_task(self, task_ref: str) -> None:
-        raise NotImplementedError
+        """Static task execution.
+
+        All parents have completed by the time this runs, so there is no
+        indegree bookkeeping to do.
+        """
+        try:
+            await self.executor(self.tasks[task_ref])
+        except Exception as e:
+            self.logger.error("Task failed", task_ref=task_ref, error=e)
+            self._task_exceptions[task_ref] = e
+            raise
+        self.completed_tasks.add(task_ref)
+        self.logger.info("Task completed", task_ref=task_ref)
 
     async def static_start(self) -> None:
-        raise NotImplementedError
+        """Run the scheduler in static mode.
+
+        Runs the precompiled plan one level at a time. Skip propagation uses the
+        plan's arrays: each task that wasn't skipped counts towards its children's
+        live parents, and a task with parents but no live parents is skipped.
+        """
+        plan = self.plan
+        if plan is None:
+            raise RuntimeError("Scheduler has no static execution plan")
+        refs = plan.refs
+        live_parents = [0] * len(refs)
+        propagate = self.skip_strategy == SkipStrategy.PROPAGATE
+        for level in plan.levels:
+            async with asyncio.TaskGroup() as tg:
+                for idx in level:
+                    if propagate and plan.indegrees[idx] and not live_parents[idx]:
+                        self.mark_task(refs[idx], TaskMarker.SKIP)
+                    tg.create_task(self._static_task(refs[idx]), name=refs[idx])
+            # Tasks can be marked for skipping by the executor (e.g. `run_if`)
+            for idx in level:
+                if self.marked_tasks.get(refs[idx]) != TaskMarker.SKIP:
+                    for child in plan.children[idx]:
+                        live_parents[child] += 1
+        self.logger.info("All tasks completed")
 
     async def start(self) -> None:
-        if self.dsl.config.scheduler == "dynamic":
-            return await self.dynamic_start()
-        else:
-            return await self.static_start()
+        try:
+            if self.dsl.config.scheduler == "dynamic":
+                return await self.dynamic_start()
+            else:
+                return await self.static_start()
+        except BaseExceptionGroup:
+            # Surface the first task failure as is, so that callers (and Temporal)
+            # see the original error instead of an exception group.
+            if self._task_exceptions:
+                raise next(iter(self._task_exceptions.values())) from None
+            raise
 
 
 @workflow.defn
@@ -199,12 +345,27 @@ class DSLWorkflow:
         ctx_logger.set(self.logger)
 
         self.dsl = args.dsl
+        self.defn_key = args.defn_key
         self.context = DSLContext(
             ACTIONS={},
             INPUTS=self.dsl.inputs,
             TRIGGER=self.dsl.trigger_inputs,
         )
         self.dep_list = {task.ref: task.depends_on for task in self.dsl.actions}
+        # Analyze which parts of the context each task reads, so that we only
+        # send that slice to the activity
+        self.analyses = {
+            task.ref: analysis_cache.get(self.defn_key, task).analysis
+            for task in self.dsl.actions
+        }
+        # Workflow code can't load offloaded results, so results it reads are
+        # kept inline
+        self.inline_results: set[str] = set().union(
+            *(
+                analysis.workflow_dependencies[ExprContext.ACTIONS]
+                for analysis in self.analyses.values()
+            )
+        )
         self.logger.info("Running DSL task workflow")
 
         self.scheduler = DSLScheduler(activity_coro=self.execute_task, dsl=self.dsl)
@@ -227,22 +388,71 @@ class DSLWorkflow:
                 return
 
             self.logger.info("Executing task")
-            # TODO: Set a retry policy for the activity
-            activity_result = await workflow.execute_activity(
-                _udf_key_to_activity_name(task.action),
-                arg=UDFActionInput(
-                    task=task,
-                    role=self.role,
-                    run_context=self.run_ctx,
-                    exec_context=self.context,
-                ),
-                start_to_close_timeout=timedelta(minutes=1),
-            )
+            if task.for_each and task.for_each_policy.shard_size:
+                activity_result = await self._execute_sharded_task(task)
+            else:
+                # TODO: Set a retry policy for the activity
+                activity_result = await workflow.execute_activity(
+                    _udf_key_to_activity_name(task.action),
+                    arg=UDFActionInput(
+                        task=task,
+                        role=self.role,
+                        run_context=self.run_ctx,
+                        exec_context=prune_context(
+                            self.context, self.analyses[task.ref].dependencies
+                        ),
+                        defn_key=self.defn_key,
+                        offload=task.ref not in self.inline_results,
+                    ),
+                    start_to_close_timeout=timedelta(minutes=1),
+                )
+            if is_blob_ref(activity_result):
+                # The result was offloaded, we only keep the reference
+                result_typename = activity_result["typename"]
+            else:
+                result_typename = type(activity_result).__name__
             self.context[ExprContext.ACTIONS][task.ref] = DSLNodeResult(
                 result=activity_result,
-                result_typename=type(activity_result).__name__,
+                result_typename=result_typename,
             )
 
+    async def _execute_sharded_task(self, task: ActionStatement) -> list[Any]:
+        """Run a `for_each` loop as one activity per shard, and merge the results.
+
+        The loop is evaluated here, so each shard only receives its slice of
+        the collections, along with the context its arguments reference. Shards
+        are retried and heartbeat independently.
+        """
+        policy = task.for_each_policy
+        iterable_exprs = evaluate_iterables(task.for_each, operand=self.context)
+        shards = shard_iterables(iterable_exprs, shard_size=policy.shard_size)
+        exec_context = prune_context(
+            self.context, self.analyses[task.ref].args_dependencies
+        )
+        self.logger.info("Running loop in shards", n_shards=len(shards))
+        shard_results = await asyncio.gather(
+            *(
+                workflow.execute_activity(
+                    _udf_key_to_activity_name(task.action),
+                    arg=UDFActionInput(
+                        task=task,
+                        role=self.role,
+                        run_context=self.run_ctx,
+                        exec_context=exec_context,
+                        defn_key=self.defn_key,
+                        shard=shard,
+                    ),
+                    start_to_close_timeout=timedelta(seconds=policy.shard_timeout),
+                    heartbeat_timeout=SHARD_HEARTBEAT_TIMEOUT,
+                    retry_policy=RetryPolicy(
+                        maximum_attempts=policy.shard_max_attempts
+                    ),
+                )
+                for shard in shards
+            )
+        )
+        return list(itertools.chain.from_iterable(shard_results))
+
     def _should_skip_execution(self, task: ActionStatement) -> bool:
         if self.scheduler.marked_tasks.get(task.ref) == TaskMarker.SKIP:
             self.logger.info("Task marked for skipping, skipped")
@@ -260,11 +470,29 @@ class DSLWorkflow:
         self.scheduler.mark_task(task_ref, marker)
 
 
+SHARD_HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+
+
+class ForEachShard(BaseModel):
+    """A contiguous slice of a `for_each` loop, run as a single activity."""
+
+    iterators: list[str]
+    """The loop variable paths, e.g. `var.x`"""
+
+    collections: list[list[Any]]
+    """The slice of each collection, in the same order as `iterators`"""
+
+
+@trusted_payload_type
 class UDFActionInput(BaseModel):
     task: ActionStatement
     role: Role
     exec_context: dict[ExprContext, dict[str, Any]]
     run_context: RunContext
+    defn_key: str | None = None
+    shard: ForEachShard | None = None
+    offload: bool = True
+    """Whether a large result may be offloaded, see `tracecat.storage`"""
 
 
 def _udf_key_to_activity_name(key: str) -> str:
@@ -333,14 +561,30 @@ class DSLActivities:
         # 2. Load the secrets
         # 3. Inject the secrets into the task arguments using an enriched context
         # NOTE: Regardless of loop iteration, we should only make this call/substitution once!!
-        secret_refs = extract_templated_secrets(task.args)
+        # The secrets and templates in the args are the same for every run of
+        # a definition, so they're only scanned once per process
+        lookup = analysis_cache.get(input.defn_key, task)
+        act_logger.debug(
+            "Action analysis",
+            cache_hit=lookup.hit,
+            time_saved=lookup.time_saved,
+            **analysis_cache.stats(),
+        )
+        # Load offloaded results off the event loop, so that evaluating the
+        # args and loop never blocks on I/O
+        exec_context = input.exec_context
+        if actions := exec_context.get(ExprContext.ACTIONS):
+            exec_context = {
+                **exec_context,
+                ExprContext.ACTIONS: await load_offloaded_results(actions),
+            }
+        secret_refs = list(lookup.analysis.secrets)
         async with AuthSandbox(secrets=secret_refs, target="context") as sandbox:
             logger.info("Evaluating task arguments", secrets=sandbox.secrets)
 
             # Skip evaluation of action-local expressions
-            args = eval_templated_object(
-                task.args,
-                operand={**input.exec_context, ExprContext.SECRETS: sandbox.secrets},
+            args = lookup.analysis.skeleton.bind(task.args).evaluate(
+                {**exec_context, ExprContext.SECRETS: sandbox.secrets},
                 exclude={ExprContext.LOCAL_VARS},
             )
         # When we're here, we've populated the task arguments with shared context values
@@ -353,71 +597,257 @@ class DSLActivities:
         )
 
         # If there's a loop, we need to process this action in parallel
-        if task.for_each:
-            # Evaluate the loop expression
-
-            iterable_exprs: IterableExpr | list[IterableExpr] = eval_templated_object(
-                task.for_each, operand=input.exec_context
+        if input.shard is not None:
+            # The workflow already evaluated the loop, and sent us a slice of it
+            iterable_exprs = [
+                IterableExpr(iterator, collection)
+                for iterator, collection in zip(
+                    input.shard.iterators, input.shard.collections, strict=True
+                )
+            ]
+            act_logger.info(
+                "Running loop shard", n_items=len(iterable_exprs[0].collection)
             )
-            if isinstance(iterable_exprs, IterableExpr):
-                iterable_exprs = [iterable_exprs]
-            elif not (
-                isinstance(iterable_exprs, list)
-                and all(isinstance(expr, IterableExpr) for expr in iterable_exprs)
-            ):
-                raise ValueError(
-                    "Invalid for_each expression. Must be an IterableExpr or a list of IterableExprs."
+            heartbeat = asyncio.create_task(
+                _heartbeat_forever(SHARD_HEARTBEAT_TIMEOUT / 3)
+            )
+            try:
+                result = await run_for_each(
+                    udf,
+                    args=args,
+                    iterable_exprs=iterable_exprs,
+                    exec_context=exec_context,
+                    policy=task.for_each_policy,
                 )
+            finally:
+                heartbeat.cancel()
+            # Shard results are merged in the workflow, so they're never offloaded
+            return result
+
+        elif task.for_each:
+            # Evaluate the loop expression
+            iterable_exprs = evaluate_iterables(task.for_each, operand=exec_context)
 
             act_logger.info("Running in loop")
             act_logger.debug("Iterables", iter_expr=iterable_exprs)
 
-            # Assert that all length of the iterables are the same
-            # This is a requirement for parallel processing
-            if len({len(expr.collection) for expr in iterable_exprs}) != 1:
-                raise ValueError("All iterables must be of the same length")
-
-            tasks: list[asyncio.Task] = []
-
-            # Create a generator that zips the iterables together
-
-            async with asyncio.TaskGroup() as tg:
-                for i, items in enumerate(zip(*iterable_exprs, strict=False)):
-                    act_logger.debug("Loop iteration", iteration=i)
-                    # Patch the context with the loop item and evaluate the action-local expressions
-                    # We're copying this so that we don't pollute the original context
-                    # Currently, the only source of action-local expressions is the loop iteration
-                    # In the future, we may have other sources of action-local expressions
-                    patched_context = input.exec_context.copy()
-                    act_logger.debug(
-                        "Context before patch", patched_context=patched_context
-                    )
-                    for iterator_path, iterator_value in items:
-                        patch_object(
-                            patched_context, path=iterator_path, value=iterator_value
-                        )
-                    act_logger.debug("Patched context", patched_context=patched_context)
-                    patched_args = eval_templated_object(
-                        args, operand=patched_context, exclude={ExprContext.SECRETS}
-                    )
-                    act_logger.debug("Patched args", patched_args=patched_args)
-                    task = tg.create_task(udf.run_async(patched_args))
-                    tasks.append(task)
-
-            result = [task.result() for task in tasks]
+            result = await run_for_each(
+                udf,
+                args=args,
+                iterable_exprs=iterable_exprs,
+                exec_context=exec_context,
+                policy=task.for_each_policy,
+            )
 
         else:
             result = await udf.run_async(args)
 
         act_logger.info("Result", result=result)
+        if input.offload and config.TRACECAT__BLOB_OFFLOAD_THRESHOLD_BYTES > 0:
+            # Keep large results out of workflow history
+            result = await asyncio.to_thread(offload_result, result)
         return result
 
 
-def patch_object(obj: dict[str, Any], *, path: str, value: Any, sep: str = ".") -> None:
-    *stem, leaf = path.split(sep=sep)
-    for key in stem:
-        obj = obj.setdefault(key, {})
-    obj[leaf] = value
+async def _heartbeat_forever(interval: timedelta) -> None:
+    while True:
+        activity.heartbeat()
+        await asyncio.sleep(interval.total_seconds())
+
+
+def evaluate_iterables(
+    for_each: str | list[str], *, operand: dict[str, Any]
+) -> list[IterableExpr]:
+    """Evaluate a `for_each` expression into a list of iterables.
+
+    The iterables must be the same length, which is checked as they're
+    zipped, see `zip_iterables`.
+    """
+    iterable_exprs: IterableExpr | list[IterableExpr] = eval_templated_object(
+        for_each, operand=operand
+    )
+    if isinstance(iterable_exprs, IterableExpr):
+        iterable_exprs = [iterable_exprs]
+    elif not (
+        isinstance(iterable_exprs, list)
+        and all(isinstance(expr, IterableExpr) for expr in iterable_exprs)
+    ):
+        raise ValueError(
+            "Invalid for_each expression. Must be an IterableExpr or a list of IterableExprs."
+        )
+    return iterable_exprs
+
+
+def shard_iterables(
+    iterable_exprs: list[IterableExpr], *, shard_size: int
+) -> list[ForEachShard]:
+    """Split equal length iterables into contiguous shards of `shard_size` items."""
+    iterators = [expr.iterator for expr in iterable_exprs]
+    collections = [list(expr.collection) for expr in iterable_exprs]
+    if len({len(c) for c in collections}) != 1:
+        raise ValueError("All iterables must be of the same length")
+    return [
+        ForEachShard(
+            iterators=iterators,
+            collections=[c[start : start + shard_size] for c in collections],
+        )
+        for start in range(0, len(collections[0]), shard_size)
+    ]
+
+
+_EXHAUSTED = object()
+
+
+def _zipped(items: list[Any]) -> tuple[Any, ...] | None:
+    n_exhausted = sum(item is _EXHAUSTED for item in items)
+    if n_exhausted == len(items):
+        return None
+    if n_exhausted:
+        raise ValueError("All iterables must be of the same length")
+    return tuple(items)
+
+
+def zip_iterables(
+    iterable_exprs: list[IterableExpr],
+) -> Iterator[tuple[tuple[str, Any], ...]]:
+    """Zip iterables as they're consumed.
+
+    Raises a `ValueError` once one of the iterables runs out before the others.
+    The iterables are closed when the zip is closed or fails.
+    """
+    iterators = [iter(expr) for expr in iterable_exprs]
+    try:
+        while (
+            items := _zipped([next(it, _EXHAUSTED) for it in iterators])
+        ) is not None:
+            yield items
+    finally:
+        for it in iterators:
+            it.close()
+
+
+async def azip_iterables(
+    iterable_exprs: list[IterableExpr],
+) -> AsyncIterator[tuple[tuple[str, Any], ...]]:
+    """Zip sync or async iterables as they're consumed, see `zip_iterables`."""
+    iterators = [aiter(expr) for expr in iterable_exprs]
+    try:
+        while True:
+            items = _zipped([await anext(it, _EXHAUSTED) for it in iterators])
+            if items is None:
+                return
+            yield items
+    finally:
+        for it in iterators:
+            await it.aclose()
+
+
+async def run_for_each(
+    udf: RegisteredUDF,
+    *,
+    args: dict[str, Any],
+    iterable_exprs: list[IterableExpr],
+    exec_context: dict[ExprContext, Any],
+    policy: ForEachPolicy,
+) -> list[Any]:
+    """Run a UDF for each item in the zipped iterables.
+
+    At most `policy.max_concurrency` workers run at once. Each worker claims
+    `policy.chunk_size` iterations at a time from a shared iterator, so there
+    are never more than `max_concurrency` pending tasks regardless of the size
+    of the collection. Results are collected as they complete, either at the
+    iteration's index or in completion order.
+
+    The iterables are consumed as iterations are claimed, and closed when the
+    loop ends. DSL `for_each` expressions always evaluate to materialized
+    lists, and offloaded results are loaded in full, so a DSL loop's memory
+    grows with its collection. Only callers that pass lazy or async iterables
+    directly avoid holding the whole collection, see `IterableExpr`.
+    """
+    act_logger = ctx_logger.get(logger)
+    results: list[Any] = []
+    ordered = policy.result_order == "ordered"
+    n_claimed = 0
+    is_async = any(isinstance(e.collection, AsyncIterable) for e in iterable_exprs)
+    iterations = (azip_iterables if is_async else zip_iterables)(iterable_exprs)
+    claim_lock = asyncio.Lock()
+    # Only the templated parts of the args are rebuilt on each iteration
+    skeleton = TemplateSkeleton.compile(args)
+
+    async def claim_async() -> list[tuple[tuple[str, Any], ...]]:
+        # Advancing an async iterator can yield to other workers, so claims
+        # are serialized to make sure workers never claim the same iteration
+        chunk = []
+        async with claim_lock:
+            while len(chunk) < policy.chunk_size:
+                if (items := await anext(iterations, None)) is None:
+                    break
+                chunk.append(items)
+        return chunk
+
+    async def claim() -> list[tuple[int, tuple[tuple[str, Any], ...]]]:
+        nonlocal n_claimed
+        if is_async:
+            chunk = await claim_async()
+        else:
+            # A sync iterator is advanced without yielding to other workers
+            chunk = list(itertools.islice(iterations, policy.chunk_size))
+        start = n_claimed
+        n_claimed += len(chunk)
+        if ordered:
+            # Reserve the iterations' slots
+            results.extend([None] * len(chunk))
+        return list(enumerate(chunk, start))
+
+    async def worker() -> None:
+        while chunk := await claim():
+            for i, items in chunk:
+                act_logger.debug("Loop iteration", iteration=i)
+                # Layer the loop items over the shared context as action-local
+                # variables. The shared context is never written to, so
+                # concurrent iterations can't see each other's variables
+                # Currently, the only source of action-local expressions is the loop iteration
+                # In the future, we may have other sources of action-local expressions
+                patched_context = LayeredContext.with_vars(exec_context, items)
+                patched_args = skeleton.evaluate(
+                    patched_context, exclude={ExprContext.SECRETS}
+                )
+                act_logger.debug("Patched args", patched_args=patched_args)
+                result = await udf.run_async(patched_args)
+                if ordered:
+                    results[i] = result
+                else:
+                    results.append(result)
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(policy.max_concurrency):
+                tg.create_task(worker())
+    finally:
+        # Close the zipped iterables, e.g. generators over a file
+        if is_async:
+            await iterations.aclose()
+        else:
+            iterations.close()
+    return results
+
+
+def prune_context(context: DSLContext, deps: dict[ExprContext, set[str]]) -> DSLContext:
+    """Select only the top-level context keys in `deps`.
+
+    Keys that aren't in the context yet are left out, so that evaluating an
+    expression that reads them fails in the same way as with the full context.
+    """
+
+    def select(ctx: ExprContext) -> dict[str, Any]:
+        values = context[ctx]
+        return {key: values[key] for key in sorted(deps[ctx]) if key in values}
+
+    return DSLContext(
+        INPUTS=select(ExprContext.INPUTS),
+        ACTIONS=select(ExprContext.ACTIONS),
+        TRIGGER=select(ExprContext.TRIGGER),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""Executors that sync UDFs run in.
+
+Motivation
+----------
+- Sync UDFs can't run on the event loop, so they run in an executor. They all
+  used to share the loop's default thread pool, so a few CPU-heavy UDFs (e.g.
+  regex extraction over large lists of strings) held the GIL and its threads,
+  and starved IO-bound UDFs and the event loop.
+- UDFs declare a placement in `registry.register`, and each placement has its
+  own bounded pool:
+    - `io` (default): threads for UDFs that mostly wait on IO.
+    - `cpu`: a few threads for CPU-heavy UDFs that release the GIL, e.g. ones
+      that run on Polars. Bounding it caps how many of them run at once.
+    - `process`: processes for CPU-heavy pure Python UDFs.
+
+Process placement
+-----------------
+Args are validated and secrets resolved in the worker. Only the UDF itself runs
+in the child process, which imports it by module and key. Validated args,
+the UDF's secret keys and its result are pickled across the process boundary,
+so they must be picklable. Secrets are only visible through `tracecat.secrets`
+in the child, never in its environment.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import importlib
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Literal
+
+from tracecat import config
+from tracecat.contexts import ctx_secrets
+
+Placement = Literal["io", "cpu", "process"]
+
+
+def _call_udf(
+    module: str, key: str, kwargs: dict[str, Any], secrets: dict[str, str] | None
+) -> Any:
+    """Call a UDF in a child process."""
+
+    # XXX: This import is necessary to avoid horrendous circular import errors
+    from tracecat.registry import registry
+
+    importlib.import_module(module)
+    # Call the undecorated function, the worker already validated the args and
+    # resolved the secrets
+    fn = registry.get(key).fn.__wrapped__
+    token = ctx_secrets.set(secrets)
+    try:
+        return fn(**kwargs)
+    finally:
+        ctx_secrets.reset(token)
+
+
+class UDFExecutors:
+    """Bounded executors for sync UDFs, one per placement.
+
+    Pools are created on first use. With no processes, UDFs placed on
+    `process` run on the `cpu` threads instead.
+    """
+
+    def __init__(
+        self,
+        *,
+        io_threads: int = config.TRACECAT__EXECUTOR_IO_THREADS,
+        cpu_threads: int = config.TRACECAT__EXECUTOR_CPU_THREADS,
+        processes: int = config.TRACECAT__EXECUTOR_PROCESSES,
+    ) -> None:
+        self.io_threads = io_threads
+        self.cpu_threads = cpu_threads
+        self.processes = processes
+        self._pools: dict[Placement, Executor] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_processes(self) -> bool:
+        return self.processes > 0
+
+    def get(self, placement: Placement) -> Executor:
+        """Get the executor for a placement, creating it if needed."""
+        if placement == "process" and not self.has_processes:
+            placement = "cpu"
+        with self._lock:
+            if (pool := self._pools.get(placement)) is None:
+                pool = self._pools[placement] = self._create(placement)
+        return pool
+
+    def _create(self, placement: Placement) -> Executor:
+        match placement:
+            case "io":
+                return ThreadPoolExecutor(
+                    self.io_threads, thread_name_prefix="tracecat-io"
+                )
+            case "cpu":
+                return ThreadPoolExecutor(
+                    self.cpu_threads, thread_name_prefix="tracecat-cpu"
+                )
+            case "process":
+                # Forking a worker that's running threads isn't safe
+                return ProcessPoolExecutor(
+                    self.processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            case _:
+                raise ValueError(f"Unknown UDF placement {placement!r}")
+
+    async def run_in_thread(
+        self, placement: Placement, fn: Callable[..., Any], kwargs: dict[str, Any]
+    ) -> Any:
+        """Run a function in the placement's threads, like `asyncio.to_thread`."""
+        if placement == "process":
+            placement = "cpu"
+        loop = asyncio.get_running_loop()
+        # Executors don't propagate context variables, e.g. the role and secrets
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.get(placement), functools.partial(ctx.run, fn, **kwargs)
+        )
+
+    async def run_in_process(
+        self,
+        module: str,
+        key: str,
+        kwargs: dict[str, Any],
+        secrets: dict[str, str] | None = None,
+    ) -> Any:
+        """Run a UDF in a child process, see the module docstring."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.get("process"), _call_udf, module, key, kwargs, secrets
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+executors = UDFExecutors()
@@ -1,7 +1,12 @@
 """Tracecat expressions module."""
 
-from .engine import ExprContext, IterableExpr, TemplateExpression
-from .eval import eval_templated_object, extract_templated_secrets
+from .engine import ExprContext, IterableExpr, LayeredContext, TemplateExpression
+from .eval import (
+    TemplateSkeleton,
+    eval_templated_object,
+    extract_templated_dependencies,
+    extract_templated_secrets,
+)
 from .validators import TemplateValidator
 
 __all__ = [
@@ -9,6 +14,9 @@ __all__ = [
     "TemplateExpression",
     "ExprContext",
     "IterableExpr",
+    "LayeredContext",
+    "TemplateSkeleton",
     "eval_templated_object",
     "extract_templated_secrets",
+    "extract_templated_dependencies",
 ]
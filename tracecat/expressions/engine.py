@@ -43,9 +43,17 @@ from __future__ import annotations
 
 import json
 import re
-from collections.abc import Iterable, Iterator
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    Generator,
+    Iterable,
+    Iterator,
+    Mapping,
+)
 from dataclasses import dataclass
-from enum import IntEnum, StrEnum, auto
+from enum import StrEnum
+from functools import lru_cache
 from typing import Any, Generic, TypeVar
 
 import jsonpath_ng
@@ -64,7 +72,11 @@ OperandType = dict[str, Any]
 
 
 class Expression:
-    """An expression that can be evaluated."""
+    """An expression that can be evaluated.
+
+    The expression is compiled once per process (see `compile_expression`) and
+    evaluated against the operand.
+    """
 
     def __init__(
         self,
@@ -73,16 +85,14 @@ class Expression:
         operand: OperandType | None = None,
         include: set[ExprContext] | None = None,
         exclude: set[ExprContext] | None = None,
-        **kwargs,
+        pattern: re.Pattern[str] = patterns.EXPRESSION_PATTERN,
+        raise_on_stop: bool = False,
     ) -> None:
         self._expr = expression
         self._operand = operand
-        self._parser = ExpressionParser(
-            context=operand,
-            include_contexts=include,
-            exclude_contexts=exclude,
-            **kwargs,
-        )
+        self._pattern = pattern
+        self._excluded = _excluded_contexts(include, exclude)
+        self._raise_on_stop = raise_on_stop
 
     def __str__(self) -> str:
         return self.__repr__()
@@ -92,7 +102,10 @@ class Expression:
 
     def result(self) -> Any:
         """Evaluate the expression and return the result."""
-        return self._parser.parse_expr(self._expr)
+        program = compile_expression(self._expr, self._pattern)
+        return program.evaluate(
+            self._operand, excluded=self._excluded, raise_on_stop=self._raise_on_stop
+        )
 
 
 class TemplateExpression:
@@ -126,16 +139,83 @@ class TemplateExpression:
         return self.expr.result()
 
 
+_SIMPLE_JSONPATH = re.compile(
+    r"^(?:\$\.)?[a-zA-Z_@][a-zA-Z0-9_@\-]*(?:\.[a-zA-Z_@][a-zA-Z0-9_@\-]*|\[\d+\])*$"
+)
+"""Dotted paths with optional list indexes, e.g. `fetch.result.items[0].id`."""
+
+_SIMPLE_JSONPATH_SEGMENT = re.compile(r"([a-zA-Z_@][a-zA-Z0-9_@\-]*)|\[(\d+)\]")
+
+_NO_MATCH = object()
+_FALLBACK = object()
+
+
+@lru_cache(maxsize=1024)
+def _parse_jsonpath(expr: str) -> jsonpath_ng.JSONPath:
+    try:
+        return jsonpath_ng.parse(expr)
+    except JsonPathParserError as e:
+        raise TracecatExpressionError(f"Invalid jsonpath {expr!r}") from e
+
+
+@lru_cache(maxsize=1024)
+def _compile_jsonpath(expr: str) -> tuple[str | int, ...] | jsonpath_ng.JSONPath:
+    """Compile a jsonpath into a tuple of keys if it's simple, or a jsonpath object."""
+    if _SIMPLE_JSONPATH.match(expr):
+        keys = tuple(
+            int(index) if index else key
+            for key, index in _SIMPLE_JSONPATH_SEGMENT.findall(expr.removeprefix("$."))
+        )
+        # `where` is a jsonpath keyword, let jsonpath_ng reject it
+        if "where" not in keys:
+            return keys
+    return _parse_jsonpath(expr)
+
+
+def _walk_keys(keys: tuple[str | int, ...], operand: Any) -> Any:
+    node = operand
+    for key in keys:
+        if isinstance(key, int):
+            if not isinstance(node, list):
+                return _FALLBACK
+            if key >= len(node):
+                return _NO_MATCH
+            node = node[key]
+        else:
+            if not isinstance(node, dict):
+                return _FALLBACK
+            node = node.get(key, _NO_MATCH)
+            if node is _NO_MATCH:
+                return _NO_MATCH
+    return node
+
+
 def eval_jsonpath(expr: str, operand: dict[str, Any]) -> Any:
+    """Evaluate a jsonpath against an operand.
+
+    Compiled paths are cached per process. Simple paths made of identifiers
+    and non-negative list indexes (e.g. `fetch.result.items[0].id`) are
+    evaluated by indexing into dicts and lists directly, which matches
+    jsonpath_ng's semantics for such paths. Everything else, e.g. wildcards,
+    slices or recursive descent, is evaluated with jsonpath_ng. A simple path
+    also falls back to jsonpath_ng if it meets anything other than a dict or
+    list along the way, so that edge cases behave exactly as before.
+    """
     if operand is None or not isinstance(operand, dict):
         raise TracecatExpressionError(
             "A dict-type operand is required for templated jsonpath."
         )
-    try:
-        # Try to evaluate the expression
-        jsonpath_expr = jsonpath_ng.parse(expr)
-    except JsonPathParserError as e:
-        raise TracecatExpressionError(f"Invalid jsonpath {expr!r}") from e
+    jsonpath_expr = _compile_jsonpath(expr)
+    if isinstance(jsonpath_expr, tuple):
+        result = _walk_keys(jsonpath_expr, operand)
+        if result is not _FALLBACK:
+            if result is _NO_MATCH:
+                raise TracecatExpressionError(
+                    f"Operand has no path {expr!r}. Operand: {operand}."
+                )
+            return result
+        jsonpath_expr = _parse_jsonpath(expr)
+
     matches = [found.value for found in jsonpath_expr.find(operand)]
     if len(matches) == 1:
         return matches[0]
@@ -167,21 +247,98 @@ class ExprContext(StrEnum):
 ExprContextType = dict[ExprContext, Any]
 
 
-class ExprType(StrEnum):
-    ACTION = auto()
-    SECRET = auto()
-    FUNCTION = auto()
-    INPUT = auto()
-    ENV = auto()
-    LOCAL_VARS = auto()
-    LITERAL = auto()
-    TYPECAST = auto()
-    ITERATOR = auto()
-    TERNARY = auto()
+class LayeredContext(Mapping[str, Any]):
+    """An operand with its own `var` scope, layered over a shared context.
 
+    The shared context is never written to. Assigning a variable only copies
+    the `var` dicts along the variable's path, so each loop iteration costs
+    O(1) extra memory and concurrent iterations can't see each other's
+    variables.
+    """
 
-class ParserFlags(IntEnum):
-    LOOP = 1
+    __slots__ = ("_base", "_local_vars")
+
+    def __init__(self, base: Mapping[str, Any], local_vars: dict[str, Any]) -> None:
+        self._base = base
+        self._local_vars = local_vars
+
+    @classmethod
+    def with_vars(
+        cls,
+        base: Mapping[str, Any],
+        assignments: Iterable[tuple[str, Any]],
+        *,
+        sep: str = ".",
+    ) -> LayeredContext:
+        """Layer variables over `base`, e.g. `[("var.item", 1)]`."""
+        local_vars = base.get(ExprContext.LOCAL_VARS) or {}
+        for path, value in assignments:
+            local_vars = _assign(local_vars, _split_var_path(path, sep), value)
+        return cls(base, local_vars)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == ExprContext.LOCAL_VARS:
+            return self._local_vars
+        return self._base[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._base
+        if ExprContext.LOCAL_VARS not in self._base:
+            yield ExprContext.LOCAL_VARS
+
+    def __len__(self) -> int:
+        return len(self._base) + (ExprContext.LOCAL_VARS not in self._base)
+
+
+@lru_cache(maxsize=256)
+def _split_var_path(path: str, sep: str) -> tuple[str, ...]:
+    context, *keys = path.split(sep)
+    if context != ExprContext.LOCAL_VARS or not keys:
+        raise ValueError(
+            f"Invalid variable path: {path!r}. Please use `var.your.variable`"
+        )
+    return tuple(keys)
+
+
+def _assign(obj: dict[str, Any], keys: tuple[str, ...], value: Any) -> dict[str, Any]:
+    """Return a copy of `obj` with `value` set at `keys`, sharing everything else."""
+    new_obj = obj.copy()
+    key = keys[0]
+    if len(keys) == 1:
+        new_obj[key] = value
+    else:
+        child = obj.get(key)
+        new_obj[key] = _assign(
+            child if isinstance(child, dict) else {}, keys[1:], value
+        )
+    return new_obj
+
+
+def _excluded_contexts(
+    include: set[ExprContext] | None, exclude: set[ExprContext] | None
+) -> set[ExprContext]:
+    if include is not None and exclude is not None:
+        # If we have both include and exclude contexts, we take the overlap
+        return exclude | (set(ExprContext) - include)
+    elif include is not None:
+        # if we only have include contexts, take the difference from all contexts
+        return set(ExprContext) - include
+    elif exclude is not None:
+        # If we only have exclude contexts, use this
+        return exclude
+    return set()
+
+
+def _eval_context_path(
+    context: ExprContextType,
+    expr_context: ExprContext,
+    path: str,
+    excluded: set[ExprContext],
+    depth: int = 0,
+) -> Any:
+    if expr_context in excluded:
+        raise TracecatStopParser(depth=depth)
+    return eval_jsonpath(path, context[expr_context])
 
 
 class TracecatStopParser(Exception):
@@ -190,209 +347,30 @@ class TracecatStopParser(Exception):
         super().__init__()
 
 
-class ExpressionParser:
-    def __init__(
-        self,
-        context: ExprContextType,
-        *,
-        pattern: re.Pattern[str] = patterns.EXPRESSION_PATTERN,
-        include_contexts: set[ExprContext] | None = None,
-        exclude_contexts: set[ExprContext] | None = None,
-        raise_on_stop: bool = False,
-    ):
-        self.context = context
-        self.raise_on_stop = raise_on_stop
-        # Store the top level expression type
-        # This is useful to introspect the type of the expression
-        # because we don't store it as some IR/AST
-        self._type = None
-        self._flags = 0
-        self._pattern = pattern
-        if include_contexts is not None and exclude_contexts is not None:
-            # If we have both include and exclude contexts, we take the overlap
-            self._exclude_contexts = exclude_contexts | (
-                set(ExprContext) - include_contexts
-            )
-        elif include_contexts is not None:
-            # if we only have include contexts, take the difference from all contexts
-            self._exclude_contexts = set(ExprContext) - include_contexts
-        elif exclude_contexts is not None:
-            # If we only have exclude contexts, use this
-            self._exclude_contexts = exclude_contexts
-        else:
-            self._exclude_contexts = set()
+def _cast(result: Any, typename: str) -> Any:
+    return BUILTIN_TYPE_NAPPING[typename](result)
 
-    @property
-    def type(self):
-        return self._type
 
-    def parse_expr(self, expr: str, depth: int = 0):
-        """Parse a single expression and print the matched parts."""
-        match = self._pattern.match(expr)
-        if not match:
-            raise TracecatExpressionError(f"Invalid expression: {expr!r}")
+def _call_function(qualname: str, args: tuple) -> Any:
+    if qualname.endswith(".map"):
+        qualname = qualname.rsplit(".", 1)[0]
+        fn = FUNCTION_MAPPING[qualname]
+        return fn.map(*args)
+    return FUNCTION_MAPPING[qualname](*args)
 
-        matcher = match.groupdict()
-        rtype = matcher.get("context_expr_rtype", None)
-        try:
-            match matcher:
-                case {"action_expr": action_expr} if action_expr:
-                    self._type = ExprType.ACTION
-                    result = self._parse_action_expr(action_expr, depth + 1)
-                case {"secret_expr": secret_expr} if secret_expr:
-                    self._type = ExprType.SECRET
-                    result = self._parse_secret_expr(secret_expr, depth + 1)
-                case {
-                    "fn_expr": fn_expr,
-                    "fn_name": fn_name,
-                    "fn_args": fn_args,
-                } if fn_expr and fn_name:
-                    self._type = ExprType.FUNCTION
-                    result = self._parse_function_expr(
-                        fn_expr, fn_name, fn_args, depth + 1
-                    )
-                case {"input_expr": input_expr} if input_expr:
-                    self._type = ExprType.INPUT
-                    result = self._parse_input_expr(input_expr, depth + 1)
-                case {"trigger_expr": trigger_expr} if trigger_expr:
-                    self._type = ExprType.TRIGGER
-                    result = self._parse_trigger_expr(trigger_expr, depth + 1)
-                case {
-                    "iter_var_expr": iter_var_expr,
-                    "iter_collection_expr": iter_collection_expr,
-                } if iter_var_expr and iter_collection_expr:
-                    self._type = ExprType.ITERATOR
-                    result = self._parse_iterator_expr(
-                        iter_var_expr, iter_collection_expr
-                    )
-                case {
-                    "ternary_true_expr": ternary_true_expr,
-                    "ternary_cond_expr": ternary_cond_expr,
-                    "ternary_false_expr": ternary_false_expr,
-                } if ternary_true_expr and ternary_cond_expr and ternary_false_expr:
-                    self._type = ExprType.TERNARY
-                    result = self._parse_ternary_expr(
-                        ternary_cond_expr, ternary_true_expr, ternary_false_expr
-                    )
-                case {
-                    "cast_type": cast_type,
-                    "cast_expr": cast_expr,
-                } if cast_type and cast_expr:
-                    self._type = ExprType.TYPECAST
-                    result = self._parse_cast_expr(cast_expr, cast_type)
-                case {"literal_expr": literal_expr} if literal_expr:
-                    self._type = ExprType.LITERAL
-                    result = self._parse_literal_expr(literal_expr)
-                case {"env_expr": env_expr} if env_expr:
-                    self._type = ExprType.ENV
-                    result = self._parse_env_expr(env_expr)
-                case {"vars_expr": vars_expr} if vars_expr:
-                    # Detect that we're inside a loop
-                    self._type = ExprType.LOCAL_VARS
-                    if self._flags & ParserFlags.LOOP:
-                        # If we're inside a loop, we are assigning an action-local variable
-                        result = vars_expr
-                    else:
-                        # If we're outside a loop, we are accessing an action-local variable
-                        result = self._parse_local_vars_expr(vars_expr)
-                case _:
-                    raise ValueError(f"Couldn't match: {json.dumps(matcher, indent=2)}")
-            if rtype:
-                return self._cast_result(result, rtype)
-            return result
-        except TracecatStopParser as e:
-            if depth != 0:
-                raise e
-            if self.raise_on_stop:
-                raise e
-        return "${{ " + expr + " }}"
-
-    def _cast_result(self, result: Any, rtype: str):
-        return BUILTIN_TYPE_NAPPING[rtype](result)
-
-    def _maybe_parse_jsonpath(
-        self, expr: str, expr_context: ExprContext, depth: int = 0
-    ):
-        if expr_context in self._exclude_contexts:
-            raise TracecatStopParser(depth=depth)
-        return eval_jsonpath(expr, self.context[expr_context])
-
-    def _parse_local_vars_expr(self, expr: str, depth: int = 0):
-        return self._maybe_parse_jsonpath(expr, ExprContext.LOCAL_VARS, depth)
-
-    def _parse_trigger_expr(self, expr: str, depth: int = 0):
-        return self._maybe_parse_jsonpath(expr, ExprContext.TRIGGER, depth)
-
-    def _parse_input_expr(self, expr: str, depth: int = 0):
-        return self._maybe_parse_jsonpath(expr, ExprContext.INPUTS, depth)
-
-    def _parse_env_expr(self, expr: str, depth: int = 0):
-        return self._maybe_parse_jsonpath(expr, ExprContext.ENV, depth)
-
-    def _parse_action_expr(self, expr: str, depth: int = 0):
-        return self._maybe_parse_jsonpath(expr, ExprContext.ACTIONS, depth)
-
-    def _parse_secret_expr(self, expr: str, depth: int = 0):
-        return self._maybe_parse_jsonpath(expr, ExprContext.SECRETS, depth)
-
-    def _parse_function_expr(self, expr: str, qualname: str, args: str, depth: int = 0):
-        if ExprContext.FN in self._exclude_contexts:
-            return expr
-        resolved_args = self._parse_parameter_pack(args, depth + 1)
-        if qualname.endswith(".map"):
-            qualname = qualname.rsplit(".", 1)[0]
-            fn = FUNCTION_MAPPING[qualname]
-            return fn.map(*resolved_args)
-        return FUNCTION_MAPPING[qualname](*resolved_args)
-
-    def _parse_parameter_pack(self, expr: str, depth: int = 0) -> tuple:
-        parts = _split_arguments(expr)
-        return tuple(self.parse_expr(arg, depth + 1) for arg in parts)
-
-    def _parse_iterator_expr(self, iter_var_expr: str, iter_collection_expr: str):
-        # Mark that we're inside a loop
-        self._flags |= ParserFlags.LOOP
-        # Ensure that our iter_var is a `var` expression
-        if not re.match(r"^var\.", iter_var_expr):
-            raise ValueError(
-                f"Invalid iterator variable: {iter_var_expr!r}. Please use `var.your.variable`"
-            )
-        # Ensure that our collection is an iterable
-        # We have to evaluate the collection expression
-        collection = self.parse_expr(iter_collection_expr)
-        if not hasattr(collection, "__iter__"):
-            raise ValueError(
-                f"Invalid iterator collection: {iter_collection_expr!r}. Must be an iterable."
-            )
 
-        # Reset the loop flag
-        self._flags &= ~ParserFlags.LOOP
-        return IterableExpr(iter_var_expr, collection)
-
-    def _parse_ternary_expr(self, cond_expr: str, true_expr: str, false_expr: str):
-        if bool(self.parse_expr(cond_expr)):
-            return self.parse_expr(true_expr)
-        return self.parse_expr(false_expr)
-
-    def _parse_cast_expr(self, expr: str, typename: str):
-        inner = self.parse_expr(expr)
-        return self._cast_result(inner, typename)
-
-    def _parse_literal_expr(self, expr: str, depth: int = 0):
-        if (match := re.match(patterns.STRING_LITERAL, expr)) is not None:
-            return match.group("str_literal").strip()
-        if (match := re.match(patterns.LIST_LITERAL, expr)) is not None:
-            param_pack_str = match.group("list_literal").strip()
-            args = self._parse_parameter_pack(param_pack_str, depth + 1)
-            return list(args)
-        if expr in ("True", "False"):
-            # Boolean literal
-            return expr == "True"
-        if expr == "None":
-            return None
-        if "." in expr:
-            return float(expr)
-        return int(expr)
+def _validate_iterator_var(iter_var_expr: str) -> None:
+    if not re.match(r"^var\.", iter_var_expr):
+        raise ValueError(
+            f"Invalid iterator variable: {iter_var_expr!r}. Please use `var.your.variable`"
+        )
+
+
+def _validate_iterator_collection(collection: Any, iter_collection_expr: str) -> None:
+    if not hasattr(collection, "__iter__") and not hasattr(collection, "__aiter__"):
+        raise ValueError(
+            f"Invalid iterator collection: {iter_collection_expr!r}. Must be an iterable."
+        )
 
 
 T = TypeVar("T")
@@ -433,11 +411,286 @@ def _split_arguments(arguments: str):
 
 @dataclass
 class IterableExpr(Generic[T]):
-    """An expression that represents an iterable collection."""
+    """An expression that represents an iterable collection.
+
+    Collections from DSL expressions are always materialized, e.g. the lists
+    returned by jsonpath lookups. Callers of `run_for_each` can also pass lazy
+    or async collections, which are consumed once, as they're iterated, and
+    closed when iteration stops.
+    """
+
+    iterator: str
+    collection: Iterable[T] | AsyncIterable[T]
+
+    def __iter__(self) -> Generator[tuple[str, T], None, None]:
+        if isinstance(self.collection, AsyncIterable):
+            raise TypeError(
+                f"Collection of {self.iterator!r} is async, use `async for` instead"
+            )
+        it = iter(self.collection)
+        try:
+            for item in it:
+                yield self.iterator, item
+        finally:
+            if isinstance(it, Generator):
+                it.close()
+
+    async def __aiter__(self) -> AsyncGenerator[tuple[str, T], None]:
+        if not isinstance(self.collection, AsyncIterable):
+            items = iter(self)
+            try:
+                for item in items:
+                    yield item
+            finally:
+                items.close()
+            return
+        it = aiter(self.collection)
+        try:
+            async for item in it:
+                yield self.iterator, item
+        finally:
+            if isinstance(it, AsyncGenerator):
+                await it.aclose()
+
+
+#########################
+# Compiled expressions #
+#########################
+
+# An expression is parsed once into an immutable tree of nodes, which is then
+# evaluated against an operand. Evaluation stops for excluded contexts at
+# `_Guard` boundaries, i.e. the top level, cast and ternary operands and
+# iterator collections, where the expression is returned as a template.
+# Subexpressions that fail to compile only raise when they're evaluated
+# (`_Invalid`), e.g. a ternary branch that isn't taken never raises.
+
+
+@dataclass(frozen=True, slots=True)
+class _Env:
+    context: ExprContextType
+    excluded: set[ExprContext]
+    raise_on_stop: bool
+
+
+class _Node:
+    __slots__ = ()
+
+    def eval(self, env: _Env) -> Any:
+        raise NotImplementedError
+
+
+@dataclass(frozen=True, slots=True)
+class _Guard(_Node):
+    """Evaluation boundary. Stops here return the expression as a template."""
+
+    expr: str
+    node: _Node
+
+    def eval(self, env: _Env) -> Any:
+        try:
+            return self.node.eval(env)
+        except TracecatStopParser:
+            if env.raise_on_stop:
+                raise
+        return "${{ " + self.expr + " }}"
+
+
+@dataclass(frozen=True, slots=True)
+class _Invalid(_Node):
+    """A subexpression that failed to compile. It raises when evaluated."""
+
+    error: Exception
+
+    def eval(self, env: _Env) -> Any:
+        raise type(self.error)(*self.error.args)
+
+
+@dataclass(frozen=True, slots=True)
+class _Literal(_Node):
+    value: Any
+
+    def eval(self, env: _Env) -> Any:
+        return self.value
+
+
+@dataclass(frozen=True, slots=True)
+class _ListLiteral(_Node):
+    items: tuple[_Node, ...]
+
+    def eval(self, env: _Env) -> Any:
+        return [item.eval(env) for item in self.items]
+
+
+@dataclass(frozen=True, slots=True)
+class _ContextPath(_Node):
+    context: ExprContext
+    path: str
+
+    def eval(self, env: _Env) -> Any:
+        return _eval_context_path(env.context, self.context, self.path, env.excluded)
+
 
+@dataclass(frozen=True, slots=True)
+class _FunctionCall(_Node):
+    expr: str
+    qualname: str
+    args: tuple[_Node, ...]
+
+    def eval(self, env: _Env) -> Any:
+        if ExprContext.FN in env.excluded:
+            return self.expr
+        return _call_function(self.qualname, tuple(arg.eval(env) for arg in self.args))
+
+
+@dataclass(frozen=True, slots=True)
+class _Iterator(_Node):
     iterator: str
-    collection: Iterable[T]
+    collection_expr: str
+    collection: _Node
+
+    def eval(self, env: _Env) -> Any:
+        collection = self.collection.eval(env)
+        _validate_iterator_collection(collection, self.collection_expr)
+        return IterableExpr(self.iterator, collection)
+
+
+@dataclass(frozen=True, slots=True)
+class _Ternary(_Node):
+    cond: _Node
+    if_true: _Node
+    if_false: _Node
+
+    def eval(self, env: _Env) -> Any:
+        if bool(self.cond.eval(env)):
+            return self.if_true.eval(env)
+        return self.if_false.eval(env)
 
-    def __iter__(self) -> Iterator[tuple[str, T]]:
-        for item in self.collection:
-            yield self.iterator, item
+
+@dataclass(frozen=True, slots=True)
+class _Cast(_Node):
+    node: _Node
+    typename: str
+
+    def eval(self, env: _Env) -> Any:
+        return _cast(self.node.eval(env), self.typename)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledExpression:
+    """An expression compiled with `compile_expression`."""
+
+    expr: str
+    root: _Node
+
+    def evaluate(
+        self,
+        operand: ExprContextType | None,
+        *,
+        excluded: set[ExprContext] | None = None,
+        raise_on_stop: bool = False,
+    ) -> Any:
+        env = _Env(operand, excluded or set(), raise_on_stop)
+        return self.root.eval(env)
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(
+    expr: str, pattern: re.Pattern[str] = patterns.EXPRESSION_PATTERN
+) -> CompiledExpression:
+    """Compile an expression. Compiled expressions are cached per process."""
+    return CompiledExpression(expr, _Guard(expr, _compile(expr, pattern)))
+
+
+def _compile_lazily(expr: str, pattern: re.Pattern[str], *, loop: bool = False):
+    # Compilation errors are deferred until the subexpression is evaluated
+    try:
+        return _compile(expr, pattern, loop=loop)
+    except Exception as e:
+        return _Invalid(e)
+
+
+def _compile_guarded(expr: str, pattern: re.Pattern[str], *, loop: bool = False):
+    try:
+        return _Guard(expr, _compile(expr, pattern, loop=loop))
+    except Exception as e:
+        return _Invalid(e)
+
+
+def _compile(expr: str, pattern: re.Pattern[str], *, loop: bool = False) -> _Node:
+    match = pattern.match(expr)
+    if not match:
+        raise TracecatExpressionError(f"Invalid expression: {expr!r}")
+
+    matcher = match.groupdict()
+    rtype = matcher.get("context_expr_rtype", None)
+    match matcher:
+        case {"action_expr": action_expr} if action_expr:
+            node = _ContextPath(ExprContext.ACTIONS, action_expr)
+        case {"secret_expr": secret_expr} if secret_expr:
+            node = _ContextPath(ExprContext.SECRETS, secret_expr)
+        case {
+            "fn_expr": fn_expr,
+            "fn_name": fn_name,
+            "fn_args": fn_args,
+        } if fn_expr and fn_name:
+            args = tuple(
+                _compile_lazily(arg, pattern) for arg in _split_arguments(fn_args)
+            )
+            node = _FunctionCall(fn_expr, fn_name, args)
+        case {"input_expr": input_expr} if input_expr:
+            node = _ContextPath(ExprContext.INPUTS, input_expr)
+        case {"trigger_expr": trigger_expr} if trigger_expr:
+            node = _ContextPath(ExprContext.TRIGGER, trigger_expr)
+        case {
+            "iter_var_expr": iter_var_expr,
+            "iter_collection_expr": iter_collection_expr,
+        } if iter_var_expr and iter_collection_expr:
+            _validate_iterator_var(iter_var_expr)
+            collection = _compile_guarded(iter_collection_expr, pattern, loop=True)
+            node = _Iterator(iter_var_expr, iter_collection_expr, collection)
+        case {
+            "ternary_true_expr": ternary_true_expr,
+            "ternary_cond_expr": ternary_cond_expr,
+            "ternary_false_expr": ternary_false_expr,
+        } if ternary_true_expr and ternary_cond_expr and ternary_false_expr:
+            node = _Ternary(
+                _compile_guarded(ternary_cond_expr, pattern),
+                _compile_guarded(ternary_true_expr, pattern),
+                _compile_guarded(ternary_false_expr, pattern),
+            )
+        case {
+            "cast_type": cast_type,
+            "cast_expr": cast_expr,
+        } if cast_type and cast_expr:
+            node = _Cast(_compile_guarded(cast_expr, pattern), cast_type)
+        case {"literal_expr": literal_expr} if literal_expr:
+            node = _compile_literal(literal_expr, pattern)
+        case {"env_expr": env_expr} if env_expr:
+            node = _ContextPath(ExprContext.ENV, env_expr)
+        case {"vars_expr": vars_expr} if vars_expr:
+            if loop:
+                # Inside a loop, we are assigning an action-local variable
+                node = _Literal(vars_expr)
+            else:
+                node = _ContextPath(ExprContext.LOCAL_VARS, vars_expr)
+        case _:
+            raise ValueError(f"Couldn't match: {json.dumps(matcher, indent=2)}")
+    if rtype:
+        return _Cast(node, rtype)
+    return node
+
+
+def _compile_literal(expr: str, pattern: re.Pattern[str]) -> _Node:
+    if (match := re.match(patterns.STRING_LITERAL, expr)) is not None:
+        return _Literal(match.group("str_literal").strip())
+    if (match := re.match(patterns.LIST_LITERAL, expr)) is not None:
+        param_pack_str = match.group("list_literal").strip()
+        items = _split_arguments(param_pack_str)
+        return _ListLiteral(tuple(_compile_lazily(item, pattern) for item in items))
+    if expr in ("True", "False"):
+        return _Literal(expr == "True")
+    if expr == "None":
+        return _Literal(None)
+    if "." in expr:
+        return _Literal(float(expr))
+    return _Literal(int(expr))
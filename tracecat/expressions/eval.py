@@ -1,10 +1,18 @@
+import dataclasses
 import re
 from collections.abc import Callable, Mapping
-from functools import partial
+from dataclasses import dataclass
 from typing import Any, TypeVar
 
 from tracecat.expressions import patterns
-from tracecat.expressions.engine import ExprContext, TemplateExpression
+from tracecat.expressions.engine import (
+    CompiledExpression,
+    ExprContext,
+    _excluded_contexts,
+    _Invalid,
+    compile_expression,
+)
+from tracecat.types.exceptions import TracecatExpressionError
 
 T = TypeVar("T", str, list[Any], dict[str, Any])
 
@@ -26,52 +34,177 @@ def _eval_templated_obj_rec(obj: T, operator: OperatorType) -> T:
             return obj
 
 
-def _eval_expression_op(match: re.Match[str], operand: dict[str, Any], **kwargs) -> str:
-    expr = match.group("template")
-    result = TemplateExpression(expr, operand=operand, **kwargs).result()
+def _compile_template(template: str) -> CompiledExpression:
+    """Compile the expression in a `${{ ... }}` template.
+
+    Errors are deferred until the template is evaluated.
+    """
     try:
-        return str(result)
+        match = patterns.TEMPLATE_STRING.match(template)
+        if (expr := match.group("expr")) is None:
+            raise TracecatExpressionError(f"Invalid template expression: {template!r}")
+        return compile_expression(expr)
     except Exception as e:
-        raise ValueError(f"Error evaluating str expression: {expr!r}") from e
+        return CompiledExpression(template, _Invalid(e))
 
 
-def eval_templated_object(
-    obj: Any,
-    *,
-    operand: OperandType | None = None,
-    pattern: re.Pattern[str] = patterns.TEMPLATE_STRING,
-    include: set[ExprContext] | None = None,
-    exclude: set[ExprContext] | None = None,
-    raise_on_stop: bool = False,
-) -> Any:
-    """Populate templated fields with actual values."""
-    kwargs = {"raise_on_stop": raise_on_stop, "include": include, "exclude": exclude}
+@dataclass(frozen=True, slots=True)
+class _Template:
+    """A templated string leaf.
 
-    evaluator = partial(_eval_expression_op, operand=operand, **kwargs)
+    A template only string evaluates to the result of its expression. Otherwise
+    the template is inline, and `parts` alternates literal strings with
+    (template, expression) pairs whose results are cast to strings.
+    """
 
-    def operator(line: str) -> Any:
-        """Evaluate the templated string.
-
-        When we reach this point, the target is a string.
-        The string could be an inline templated future or just the templated
-        future itself.
-        Note that we don't remove leading/trailing whitespace from the string.
-        Case A - Inline template: "The answer is ${{42}}!!!"
-        Case B - Template only: "${{42}}"
+    inline: bool
+    parts: tuple[str | tuple[str, CompiledExpression], ...]
 
-        """
-        if _is_template_only(line) and len(pattern.findall(line)) == 1:
+    @classmethod
+    def compile(cls, line: str, pattern: re.Pattern[str]) -> "_Template | None":
+        matches = list(pattern.finditer(line))
+        if not matches:
+            return None
+        if _is_template_only(line) and len(matches) == 1:
             # Non-inline template
             # If the template expression isn't given a reolve type, its underlying
             # value is returned as is.
-            return TemplateExpression(line, operand=operand, **kwargs).result()
+            return cls(inline=False, parts=((line, _compile_template(line)),))
         # Inline template
         # If the template expression is inline, we evaluate the result
         # and attempt to cast each underlying value into a string.
-        return pattern.sub(evaluator, line)
+        parts: list[str | tuple[str, CompiledExpression]] = []
+        pos = 0
+        for match in matches:
+            parts.append(line[pos : match.start()])
+            template = match.group("template")
+            parts.append((template, _compile_template(template)))
+            pos = match.end()
+        parts.append(line[pos:])
+        return cls(inline=True, parts=tuple(p for p in parts if p != ""))
+
+    def evaluate(self, operand: Any, excluded: set[ExprContext], raise_on_stop: bool):
+        if not self.inline:
+            _, expr = self.parts[0]
+            return expr.evaluate(
+                operand, excluded=excluded, raise_on_stop=raise_on_stop
+            )
+        chunks: list[str] = []
+        for part in self.parts:
+            if isinstance(part, str):
+                chunks.append(part)
+                continue
+            template, expr = part
+            result = expr.evaluate(
+                operand, excluded=excluded, raise_on_stop=raise_on_stop
+            )
+            try:
+                chunks.append(str(result))
+            except Exception as e:
+                raise ValueError(
+                    f"Error evaluating str expression: {template!r}"
+                ) from e
+        return "".join(chunks)
+
+
+_Branch = tuple[tuple[str | int, "_Branch | _Template"], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class TemplateSkeleton:
+    """A templated object with its templated leaves compiled.
+
+    The skeleton records the path to each templated string in the object, so
+    that evaluating it only copies the lists and dicts along those paths.
+    Subtrees without templates are shared with the original object, and
+    between evaluations, so callers must not mutate the result in place. UDFs
+    can, as they're called with copies, see `RegisteredUDF.validate_args`.
+
+    Compile the skeleton once to evaluate the same object against many
+    operands, e.g. for each iteration of a loop.
+    """
+
+    obj: Any
+    root: "_Branch | _Template | None"
+
+    @classmethod
+    def compile(
+        cls, obj: Any, *, pattern: re.Pattern[str] = patterns.TEMPLATE_STRING
+    ) -> "TemplateSkeleton":
+        def walk(node: Any) -> "_Branch | _Template | None":
+            match node:
+                case str():
+                    return _Template.compile(node, pattern)
+                case list():
+                    items = enumerate(node)
+                case dict():
+                    items = node.items()
+                case _:
+                    return None
+            branch = tuple(
+                (key, child) for key, value in items if (child := walk(value))
+            )
+            return branch
+
+        return cls(obj, walk(obj))
+
+    def bind(self, obj: Any) -> "TemplateSkeleton":
+        """Reuse the compiled templates for an equal object, e.g. a fresh copy."""
+        return dataclasses.replace(self, obj=obj)
+
+    @property
+    def paths(self) -> list[tuple[str | int, ...]]:
+        """The paths to the templated strings in the object."""
+
+        def walk(branch: "_Branch | _Template | None", path: tuple[str | int, ...]):
+            if isinstance(branch, _Template):
+                yield path
+            elif branch:
+                for key, child in branch:
+                    yield from walk(child, (*path, key))
 
-    processed_kwargs = _eval_templated_obj_rec(obj, operator)
-    return processed_kwargs
+        return list(walk(self.root, ()))
+
+    def evaluate(
+        self,
+        operand: OperandType | None = None,
+        *,
+        include: set[ExprContext] | None = None,
+        exclude: set[ExprContext] | None = None,
+        raise_on_stop: bool = False,
+    ) -> Any:
+        """Populate the templated leaves with actual values."""
+        excluded = _excluded_contexts(include, exclude)
+
+        def fill(node: Any, branch: "_Branch | _Template") -> Any:
+            if isinstance(branch, _Template):
+                return branch.evaluate(operand, excluded, raise_on_stop)
+            new_node = list(node) if isinstance(node, list) else dict(node)
+            for key, child in branch:
+                new_node[key] = fill(node[key], child)
+            return new_node
+
+        if not self.root:
+            return self.obj
+        return fill(self.obj, self.root)
+
+
+def eval_templated_object(
+    obj: Any,
+    *,
+    operand: OperandType | None = None,
+    pattern: re.Pattern[str] = patterns.TEMPLATE_STRING,
+    include: set[ExprContext] | None = None,
+    exclude: set[ExprContext] | None = None,
+    raise_on_stop: bool = False,
+) -> Any:
+    """Populate templated fields with actual values.
+
+    Subtrees without templates are returned as is, see `TemplateSkeleton`.
+    """
+    return TemplateSkeleton.compile(obj, pattern=pattern).evaluate(
+        operand, include=include, exclude=exclude, raise_on_stop=raise_on_stop
+    )
 
 
 def _is_template_only(template: str) -> bool:
@@ -94,3 +227,31 @@ def extract_templated_secrets(
 
     _eval_templated_obj_rec(templated_obj, operator)
     return list(secrets)
+
+
+def extract_templated_dependencies(
+    templated_obj: Any,
+    *,
+    pattern: re.Pattern[str] = patterns.TEMPLATE_STRING,
+    scan_pattern: re.Pattern[str] = patterns.CONTEXT_DEPENDENCY_SCAN,
+) -> dict[ExprContext, set[str]]:
+    """Extract the top-level `ACTIONS`, `INPUTS` and `TRIGGER` keys read by templated objects.
+
+    For example, `${{ ACTIONS.fetch.result.items }}` depends on `ACTIONS.fetch`.
+    The result is conservative: anything that looks like a context lookup inside
+    a template is included, even if it's inside a string literal.
+    """
+    deps: dict[ExprContext, set[str]] = {
+        ExprContext.ACTIONS: set(),
+        ExprContext.INPUTS: set(),
+        ExprContext.TRIGGER: set(),
+    }
+
+    def operator(line: str) -> Any:
+        """Collect context dependencies from the templated string."""
+        for template in pattern.finditer(line):
+            for match in scan_pattern.finditer(template.group("expr")):
+                deps[ExprContext(match.group("context"))].add(match.group("key"))
+
+    _eval_templated_obj_rec(templated_obj, operator)
+    return deps
@@ -2,11 +2,14 @@ import itertools
 import json
 import operator
 import re
+import re._constants as _sre
+import re._parser as _sre_parser
 from collections.abc import Callable
 from datetime import datetime
 from functools import wraps
 from typing import Any, ParamSpec, TypeVar
 
+from tracecat import config
 from tracecat.expressions.validators import is_iterable
 
 
@@ -85,16 +88,252 @@ _FUNCTION_MAPPING = {
 }
 
 
+# Columnar execution
+# ------------------
+# Mapped calls over large lists are lowered to Polars when that gives exactly
+# the same results as calling the function per element. Converting lists to
+# and from Series isn't free, so this is only worth it for functions that are
+# slow per element, e.g. `contains` is faster on the scalar path. Kernels are applied to
+# Series and scalars, and return None if they can't handle their arguments, in
+# which case we fall back to the scalar path. Each kernel lists the kinds of
+# values it accepts, where all arguments must be of the same kind.
+
+_INT_BOUND = 2**31
+"""Ints are only lowered within this bound, so that Int64 arithmetic can't
+overflow and ints compare with floats exactly."""
+
+
+class _UnportableRegex(Exception):
+    pass
+
+
+_MAX_REGEX_REPEAT = 1000
+"""Larger counted repeats can exceed the size limit of Rust's regex engine."""
+
+
+def _portable_regex(pattern: str) -> str | None:
+    """Rewrite a Python regex for Polars' (Rust) regex engine.
+
+    The two dialects read the same text differently, e.g. Rust reads `[a[b]]`
+    as a nested class and `x{ 2}` as a repeat. So instead of passing the text
+    through, we parse it with Python's own parser and rebuild it from a small
+    subset of syntax that both engines match the same way, with every literal
+    escaped. Returns None if the pattern uses anything outside that subset,
+    e.g. `$`, `\\b`, Unicode classes like `\\w` or `\\d`, lookarounds or flags.
+    """
+    try:
+        parsed = _sre_parser.parse(pattern)
+    except re.error:
+        return None
+    if parsed.state.flags & ~re.UNICODE:
+        return None
+    try:
+        return _rebuild_regex(parsed)
+    except _UnportableRegex:
+        return None
+
+
+def _regex_literal(code: int) -> str:
+    char = chr(code)
+    if char.isascii() and char.isalnum():
+        return char
+    return f"\\x{{{code:X}}}"
+
+
+def _rebuild_regex(parsed: Any) -> str:
+    parts = []
+    for op, av in parsed:
+        match op:
+            case _sre.LITERAL:
+                parts.append(_regex_literal(av))
+            case _sre.NOT_LITERAL:
+                parts.append(f"[^{_regex_literal(av)}]")
+            case _sre.ANY:
+                # Neither engine matches a newline with `.` by default
+                parts.append(".")
+            case _sre.IN:
+                parts.append(_rebuild_regex_class(av))
+            case _sre.MAX_REPEAT | _sre.MIN_REPEAT:
+                lo, hi, item = av
+                if hi == _sre.MAXREPEAT:
+                    hi = ""
+                elif hi > _MAX_REGEX_REPEAT:
+                    raise _UnportableRegex
+                if lo > _MAX_REGEX_REPEAT:
+                    raise _UnportableRegex
+                bounds = f"{lo},{hi}"
+                lazy = "?" if op is _sre.MIN_REPEAT else ""
+                parts.append(f"(?:{_rebuild_regex(item)}){{{bounds}}}{lazy}")
+            case _sre.SUBPATTERN:
+                _, add_flags, del_flags, item = av
+                if add_flags or del_flags:
+                    raise _UnportableRegex
+                parts.append(f"(?:{_rebuild_regex(item)})")
+            case _sre.BRANCH:
+                _, items = av
+                parts.append(f"(?:{'|'.join(map(_rebuild_regex, items))})")
+            case _sre.AT if av in (_sre.AT_BEGINNING, _sre.AT_BEGINNING_STRING):
+                parts.append("^")
+            case _:
+                raise _UnportableRegex
+    return "".join(parts)
+
+
+def _rebuild_regex_class(items: list[tuple[Any, Any]]) -> str:
+    parts = []
+    for op, av in items:
+        match op:
+            case _sre.NEGATE:
+                parts.append("^")
+            case _sre.LITERAL:
+                parts.append(_regex_literal(av))
+            case _sre.RANGE:
+                lo, hi = av
+                parts.append(f"{_regex_literal(lo)}-{_regex_literal(hi)}")
+            case _:
+                raise _UnportableRegex
+    return f"[{''.join(parts)}]"
+
+
+def _regex_kernel(*, negate: bool) -> Callable[..., Any]:
+    def kernel(pattern: Any, text: Any) -> Any:
+        if not isinstance(pattern, str) or isinstance(text, str):
+            return None
+        if (portable := _portable_regex(pattern)) is None:
+            return None
+        # `re.match` only matches at the start of the string
+        matched = text.str.contains(f"^(?:{portable})")
+        return ~matched if negate else matched
+
+    return kernel
+
+
+def _div_kernel(a: Any, b: Any) -> Any:
+    import polars as pl
+
+    # Python raises on division by zero, so leave that to the scalar path
+    if isinstance(b, int | float):
+        if b == 0:
+            return None
+        # Polars multiplies by the reciprocal of a scalar divisor, which can
+        # round differently than Python's division, so divide by a Series
+        b = pl.repeat(b, len(a), eager=True)
+    elif (b == 0).any():
+        return None
+    return a / b
+
+
+_NUM, _STR = "num", "str"
+
+_COLUMNAR_FUNCTIONS: dict[str, tuple[Callable[..., Any], set[str]]] = {
+    "less_than": (operator.lt, {_NUM, _STR}),
+    "less_than_or_equal": (operator.le, {_NUM, _STR}),
+    "greater_than": (operator.gt, {_NUM, _STR}),
+    "greater_than_or_equal": (operator.ge, {_NUM, _STR}),
+    "not_equal": (operator.ne, {_NUM, _STR}),
+    "is_equal": (operator.eq, {_NUM, _STR}),
+    "regex_match": (_regex_kernel(negate=False), {_STR}),
+    "regex_not_match": (_regex_kernel(negate=True), {_STR}),
+    "add": (operator.add, {_NUM}),
+    "sub": (operator.sub, {_NUM}),
+    "mul": (operator.mul, {_NUM}),
+    "div": (_div_kernel, {_NUM}),
+}
+
+
+def _kind(value: Any) -> str | None:
+    match value:
+        case str():
+            return _STR
+        case bool():
+            return None
+        case int():
+            return _NUM if -_INT_BOUND < value < _INT_BOUND else None
+        case float():
+            return _NUM if value == value else None  # NaN
+        case _:
+            return None
+
+
+def _to_column(values: list[Any]) -> tuple[Any, str] | None:
+    """Convert a list of str, int or float to a Series, if it's homogeneous."""
+    import polars as pl
+
+    types = set(map(type, values))
+    if types == {str}:
+        return pl.Series(values, dtype=pl.Utf8), _STR
+    if types == {int}:
+        try:
+            column = pl.Series(values, dtype=pl.Int64)
+        except OverflowError:
+            return None
+        if column.min() <= -_INT_BOUND or column.max() >= _INT_BOUND:
+            return None
+        return column, _NUM
+    if types == {float}:
+        column = pl.Series(values, dtype=pl.Float64)
+        if column.is_nan().any():
+            return None
+        return column, _NUM
+    return None
+
+
+def columnar_map(
+    kernel: Callable[..., Any], kinds: set[str], args: tuple[Any, ...]
+) -> list[Any] | None:
+    """Map a function over its list arguments with a columnar kernel.
+
+    Returns None if the call can't be lowered, i.e. the lists are shorter than
+    `TRACECAT__FN_COLUMNAR_MIN_SIZE`, aren't all the same length, or any
+    argument isn't a list of (or a single) str, int or float of a kind the
+    kernel accepts.
+    """
+    import polars as pl
+
+    lengths = {len(arg) for arg in args if isinstance(arg, list)}
+    if len(lengths) != 1 or lengths.pop() < config.TRACECAT__FN_COLUMNAR_MIN_SIZE:
+        return None
+    operands = []
+    arg_kinds = set()
+    for arg in args:
+        if isinstance(arg, list):
+            if (column := _to_column(arg)) is None:
+                return None
+            operand, kind = column
+        else:
+            operand, kind = arg, _kind(arg)
+        if kind not in kinds:
+            return None
+        operands.append(operand)
+        arg_kinds.add(kind)
+    if len(arg_kinds) != 1:
+        return None
+    try:
+        result = kernel(*operands)
+    except pl.PolarsError:
+        return None
+    return None if result is None else result.to_list()
+
+
 P = ParamSpec("P")
 R = TypeVar("R")
 
 
-def mappable(func: Callable[P, R]) -> Callable[P, R]:
+def mappable(
+    func: Callable[P, R],
+    columnar: tuple[Callable[..., Any], set[str]] | None = None,
+) -> Callable[P, R]:
     @wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
 
     def broadcast_map(*args: Any) -> list[Any]:
+        if (
+            columnar is not None
+            and (result := columnar_map(*columnar, args)) is not None
+        ):
+            return result
+
         iterables = (arg if is_iterable(arg) else itertools.repeat(arg) for arg in args)
 
         # Zip the iterables together and call the function for each set of arguments
@@ -105,4 +344,6 @@ def mappable(func: Callable[P, R]) -> Callable[P, R]:
     return wrapper
 
 
-FUNCTION_MAPPING = {k: mappable(v) for k, v in _FUNCTION_MAPPING.items()}
+FUNCTION_MAPPING = {
+    k: mappable(v, _COLUMNAR_FUNCTIONS.get(k)) for k, v in _FUNCTION_MAPPING.items()
+}
@@ -27,6 +27,11 @@ TEMPLATE_STRING = re.compile(r"(?P<template>\${{\s*(?P<expr>.+?)\s*}})")  # Lazy
 SECRET_SCAN_TEMPLATE = re.compile(r"\${{\s*SECRETS\.(?P<secret>.+?)\s*}}")
 """Specialized pattern to scan for secrets."""
 
+CONTEXT_DEPENDENCY_SCAN = re.compile(
+    r"\b(?P<context>ACTIONS|INPUTS|TRIGGER)\.(?P<key>[a-zA-Z0-9_\-]+)"
+)
+"""Specialized pattern to scan an expression for top-level context lookups."""
+
 FULL_TEMPLATE = re.compile(r"^\${{\s*[^{}]*\s*}}$")
 
 
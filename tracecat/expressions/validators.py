@@ -23,6 +23,16 @@ def is_iterable(value: Any, *, container_only: bool = True) -> bool:
 
 T = TypeVar("T")
 
+TRUSTED_CONTEXT = {"trusted": True}
+"""Validation context for data we serialized ourselves, e.g. Temporal payloads.
+
+Validators that only guard against bad user input are skipped in this context.
+"""
+
+
+def is_trusted(info: ValidationInfo) -> bool:
+    return info.context is not None and info.context.get("trusted", False)
+
 
 # We can bundle validators and unpack them in a single expression
 class TemplateValidator:
@@ -33,6 +43,8 @@ class TemplateValidator:
     def maybe_templated_expression(
         cls, v: T, handler: ValidatorFunctionWrapHandler, info: ValidationInfo
     ) -> T:
+        if is_trusted(info):
+            return v
         # If the input value is a string and a full template,
         # v0: We don't care about the coercion type and just return the string value
         # i.e., we defer the type checking to runtime
@@ -0,0 +1,187 @@
+"""Pooled HTTP clients for UDFs.
+
+Motivation
+----------
+- Integrations used to create a new `httpx.AsyncClient` for every call, so each
+  call paid for DNS, TCP and TLS setup and never reused a connection.
+- `http_client` hands out long-lived clients from a worker-scoped pool instead.
+  Clients are keyed by base URL and auth scope, i.e. the default headers and
+  query params that carry credentials, so callers with different API keys never
+  share a client. Connections are kept alive, and use HTTP/2 where the server
+  supports it.
+
+Pooled clients
+--------------
+- Clients are only pooled on the worker's event loop, see `HTTPClientPool.open`.
+  Other loops, e.g. the short-lived ones of `asyncio.run` in sync UDFs, get a
+  new client that's closed when the caller's `async with` block exits.
+- Closing a pooled client, e.g. with `async with`, is a no-op. The pool closes
+  its clients when the worker shuts down, see `HTTPClientPool.aclose`.
+- Pooled clients never store cookies, since they can be shared by workflows of
+  different users.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Self
+
+import httpx
+import orjson
+
+from tracecat import config
+
+
+class PooledAsyncClient(httpx.AsyncClient):
+    """An `httpx.AsyncClient` that's owned by an `HTTPClientPool`."""
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    async def _close(self) -> None:
+        await super().aclose()
+
+
+class HTTPClientPool:
+    """Long-lived HTTP clients, keyed by base URL and auth scope.
+
+    Connections are bound to the event loop they were opened in, so clients
+    are only pooled on loops that were opened with `open`, and that are closed
+    with `aclose` before they shut down. At most `maxsize` clients are kept per
+    loop. The least recently used client is evicted when the pool is full, and
+    closed after `grace` seconds so that requests in flight can finish.
+    """
+
+    def __init__(
+        self,
+        *,
+        http2: bool = config.TRACECAT__HTTP2,
+        timeout: float = config.TRACECAT__HTTP_TIMEOUT_SECONDS,
+        limits: httpx.Limits | None = None,
+        maxsize: int = 256,
+        grace: float = 60,
+    ) -> None:
+        self.http2 = http2
+        self.timeout = httpx.Timeout(timeout)
+        self.limits = limits or httpx.Limits(
+            max_connections=config.TRACECAT__HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.TRACECAT__HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.TRACECAT__HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        self.maxsize = maxsize
+        self.grace = grace
+        self._loop_clients: dict[
+            asyncio.AbstractEventLoop,
+            OrderedDict[tuple[str, str, bool], PooledAsyncClient],
+        ] = {}
+        self.hits = 0
+        self.misses = 0
+        self.unpooled = 0
+
+    def open(self) -> None:
+        """Pool clients on the running loop, until `aclose` is called."""
+        self._loop_clients.setdefault(asyncio.get_running_loop(), OrderedDict())
+
+    def get(
+        self,
+        base_url: str = "",
+        *,
+        headers: dict[str, str] | None = None,
+        params: dict[str, Any] | None = None,
+        follow_redirects: bool = False,
+    ) -> httpx.AsyncClient:
+        """Get the pooled client for a base URL and auth scope.
+
+        On loops that the pool wasn't opened on, this returns a new client that
+        the caller must close.
+        """
+        loop = asyncio.get_running_loop()
+        options = {
+            "base_url": base_url,
+            "headers": headers,
+            "params": params,
+            "follow_redirects": follow_redirects,
+        }
+        if (clients := self._loop_clients.get(loop)) is None:
+            self.unpooled += 1
+            return self._new_client(httpx.AsyncClient, **options)
+        key = (base_url, _auth_scope(headers, params), follow_redirects)
+        if (client := clients.get(key)) is not None:
+            self.hits += 1
+            clients.move_to_end(key)
+            return client
+        self.misses += 1
+        client = clients[key] = self._new_client(PooledAsyncClient, **options)
+        if len(clients) > self.maxsize:
+            _, evicted = clients.popitem(last=False)
+            loop.call_later(self.grace, lambda: loop.create_task(evicted._close()))
+        return client
+
+    def _new_client(
+        self, cls: type[httpx.AsyncClient], **options: Any
+    ) -> httpx.AsyncClient:
+        return cls(
+            **options,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        size = sum(len(clients) for clients in self._loop_clients.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "unpooled": self.unpooled,
+            "size": size,
+        }
+
+    async def aclose(self) -> None:
+        """Close the clients of the running loop, and stop pooling on it."""
+        clients = self._loop_clients.pop(asyncio.get_running_loop(), {})
+        await asyncio.gather(*(client._close() for client in clients.values()))
+
+
+def _auth_scope(headers: dict[str, str] | None, params: dict[str, Any] | None) -> str:
+    """Hash the default headers and params, so the pool doesn't key on secrets."""
+    if not headers and not params:
+        return ""
+    scope = orjson.dumps(
+        [sorted((headers or {}).items()), sorted((params or {}).items())],
+        default=str,
+    )
+    return hashlib.sha256(scope).hexdigest()
+
+
+http_pool = HTTPClientPool()
+
+
+def http_client(
+    base_url: str = "",
+    *,
+    headers: dict[str, str] | None = None,
+    params: dict[str, Any] | None = None,
+    follow_redirects: bool = False,
+) -> httpx.AsyncClient:
+    """Get a pooled HTTP client for UDFs, see `HTTPClientPool.get`.
+
+    Use it like `httpx.AsyncClient`:
+
+    ```python
+    async with http_client(base_url=BASE_URL, headers={"x-apikey": key}) as client:
+        response = await client.get("/ip_addresses/1.1.1.1")
+    ```
+    """
+    return http_pool.get(
+        base_url, headers=headers, params=params, follow_redirects=follow_redirects
+    )
@@ -0,0 +1,292 @@
+"""Rate limits for UDFs that call vendor APIs.
+
+Motivation
+----------
+- Integrations like VirusTotal or AbuseIPDB have fixed quotas per API key. Many
+  workflows and `for_each` iterations calling them at once cause 429 storms,
+  and the retries slow everything down.
+- UDFs declare a `RateLimit` in `registry.register`. UDFs that share a quota
+  share a `key`, e.g. every VirusTotal UDF uses `virustotal`.
+- Limits apply per user, since each user brings their own API keys.
+
+Limits
+------
+- `requests_per_second` and `burst` configure a token bucket. Every UDF call
+  takes a token. Callers reserve tokens ahead of time and sleep until theirs is
+  due, so waiters are served in order without polling. Callers that are
+  cancelled while they wait refund their token.
+- Calls in an activity never wait past the activity's start-to-close timeout.
+  If their token isn't due in time, it's refunded and `RateLimitTimeoutError`
+  is raised instead.
+- `max_in_flight` caps how many calls run at once, per worker.
+- Declared limits can be overridden per key with `TRACECAT__RATE_LIMITS`, a JSON
+  object like `{"virustotal": {"requests_per_second": 8, "burst": 8}}`, e.g. for
+  premium API keys. Integrations only declare the key of their quota, since it
+  depends on the user's plan, so their limits are opt-in.
+
+Backends
+--------
+- `local` (default): buckets are kept in memory, so each worker has its own.
+- `api`: buckets are kept in the database and taken through the API, so all
+  workers share them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from typing import Any
+
+import orjson
+from pydantic import BaseModel, Field, TypeAdapter
+from temporalio import activity
+
+from tracecat import config
+from tracecat.auth.clients import AuthenticatedAPIClient
+from tracecat.auth.credentials import Role
+from tracecat.contexts import ctx_role
+from tracecat.types.exceptions import TracecatException
+
+
+class RateLimitTimeoutError(TracecatException):
+    """A call's token isn't due before the activity running it times out."""
+
+
+class RateLimit(BaseModel):
+    key: str = Field(..., description="Shared by UDFs that share a quota")
+    requests_per_second: float | None = Field(default=None, gt=0)
+    burst: int | None = Field(
+        default=None, ge=1, description="Defaults to one second's worth of requests"
+    )
+    max_in_flight: int | None = Field(default=None, ge=1)
+
+    @property
+    def capacity(self) -> float:
+        if self.burst is not None:
+            return self.burst
+        return max(1, math.ceil(self.requests_per_second or 1))
+
+
+class RateLimitOverride(BaseModel):
+    requests_per_second: float | None = Field(default=None, gt=0)
+    burst: int | None = Field(default=None, ge=1)
+    max_in_flight: int | None = Field(default=None, ge=1)
+
+
+RateLimitOverrides = TypeAdapter(dict[str, RateLimitOverride])
+
+
+def load_overrides(raw: str | None) -> dict[str, RateLimitOverride]:
+    """Parse `TRACECAT__RATE_LIMITS`."""
+    if not raw:
+        return {}
+    return RateLimitOverrides.validate_python(orjson.loads(raw))
+
+
+def take_token(
+    tokens: float, refilled_at: float, now: float, *, rate: float, capacity: float
+) -> tuple[float, float]:
+    """Take a token from a bucket.
+
+    Returns the tokens left and how long to wait until the token is due. The
+    tokens left go negative when callers reserve tokens ahead of time.
+    """
+    tokens = min(capacity, tokens + (now - refilled_at) * rate) - 1
+    wait = -tokens / rate if tokens < 0 else 0.0
+    return tokens, wait
+
+
+def refund_token(tokens: float, *, capacity: float) -> float:
+    """Put back a reserved token that wasn't used."""
+    return min(capacity, tokens + 1)
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def reserve(self, role: Role | None, limit: RateLimit) -> float:
+        """Take a token from the limit's bucket, and return the seconds to wait."""
+
+    @abstractmethod
+    async def refund(self, role: Role | None, limit: RateLimit) -> None:
+        """Put back a token that was reserved but not used."""
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """Token buckets in memory, one set per worker."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._buckets: dict[tuple[str | None, str], tuple[float, float]] = {}
+
+    async def reserve(self, role: Role | None, limit: RateLimit) -> float:
+        bucket_key = (role.user_id if role else None, limit.key)
+        now = self._clock()
+        tokens, refilled_at = self._buckets.get(bucket_key, (limit.capacity, now))
+        tokens, wait = take_token(
+            tokens,
+            refilled_at,
+            now,
+            rate=limit.requests_per_second,
+            capacity=limit.capacity,
+        )
+        self._buckets[bucket_key] = (tokens, now)
+        return wait
+
+    async def refund(self, role: Role | None, limit: RateLimit) -> None:
+        bucket_key = (role.user_id if role else None, limit.key)
+        if (bucket := self._buckets.get(bucket_key)) is None:
+            return
+        tokens, refilled_at = bucket
+        self._buckets[bucket_key] = (
+            refund_token(tokens, capacity=limit.capacity),
+            refilled_at,
+        )
+
+
+class APIRateLimitBackend(RateLimitBackend):
+    """Token buckets in the database, shared by all workers."""
+
+    async def reserve(self, role: Role | None, limit: RateLimit) -> float:
+        response = await self._post(role, "/rate-limits/reserve", limit)
+        return response.json()["wait"]
+
+    async def refund(self, role: Role | None, limit: RateLimit) -> None:
+        await self._post(role, "/rate-limits/refund", limit)
+
+    async def _post(self, role: Role | None, path: str, limit: RateLimit) -> Any:
+        async with AuthenticatedAPIClient(role=role) as client:
+            response = await client.post(
+                path,
+                json={
+                    "key": limit.key,
+                    "requests_per_second": limit.requests_per_second,
+                    "burst": limit.capacity,
+                },
+            )
+            response.raise_for_status()
+            return response
+
+
+def activity_time_left() -> float | None:
+    """Seconds until the running activity's attempt times out, if in one."""
+    if not activity.in_activity():
+        return None
+    info = activity.info()
+    if info.start_to_close_timeout is None:
+        return None
+    deadline = info.started_time + info.start_to_close_timeout
+    return (deadline - datetime.now(UTC)).total_seconds()
+
+
+class RateLimiter:
+    """Enforces the rate limits of UDF calls.
+
+    Calls that had to wait for a token are counted, see `stats`.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        *,
+        overrides: dict[str, RateLimitOverride] | None = None,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        time_left: Callable[[], float | None] = activity_time_left,
+    ) -> None:
+        self.backend = backend
+        self.overrides = overrides or {}
+        self._sleep = sleep
+        self._time_left = time_left
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphores: dict[tuple[str | None, str], asyncio.Semaphore] = {}
+        self.calls = 0
+        self.waits = 0
+        self.waited = 0.0
+        self.refunds = 0
+
+    def resolve(self, limit: RateLimit) -> RateLimit:
+        """Apply the configured overrides to a declared limit."""
+        if (override := self.overrides.get(limit.key)) is None:
+            return limit
+        return limit.model_copy(update=override.model_dump(exclude_unset=True))
+
+    def _semaphore(self, user_id: str | None, limit: RateLimit) -> asyncio.Semaphore:
+        # Semaphores are bound to the loop they're first awaited in
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores.clear()
+        key = (user_id, limit.key)
+        if (semaphore := self._semaphores.get(key)) is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(limit.max_in_flight)
+        return semaphore
+
+    @asynccontextmanager
+    async def limit(
+        self, limit: RateLimit, role: Role | None = None
+    ) -> AsyncIterator[None]:
+        """Wait for a slot and a token, and hold the slot until the call is done."""
+        limit = self.resolve(limit)
+        role = role or ctx_role.get()
+        self.calls += 1
+        if limit.max_in_flight is None:
+            await self._take_token(role, limit)
+            yield
+            return
+        async with self._semaphore(role.user_id if role else None, limit):
+            await self._take_token(role, limit)
+            yield
+
+    async def _take_token(self, role: Role | None, limit: RateLimit) -> None:
+        if limit.requests_per_second is None:
+            return
+        wait = await self.backend.reserve(role, limit)
+        if wait <= 0:
+            return
+        if (time_left := self._time_left()) is not None and wait >= time_left:
+            await self._refund(role, limit)
+            raise RateLimitTimeoutError(
+                f"Rate limit {limit.key!r} would wait {wait:.1f}s for a token, but"
+                f" the activity times out in {max(time_left, 0):.1f}s. Raise the"
+                " limit with TRACECAT__RATE_LIMITS if your plan allows it."
+            )
+        self.waits += 1
+        self.waited += wait
+        try:
+            await self._sleep(wait)
+        except asyncio.CancelledError:
+            # Don't leave the unused token's debt to later callers
+            await asyncio.shield(self._refund(role, limit))
+            raise
+
+    async def _refund(self, role: Role | None, limit: RateLimit) -> None:
+        self.refunds += 1
+        await self.backend.refund(role, limit)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited, 3),
+            "refunds": self.refunds,
+        }
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Create the rate limit backend configured by `TRACECAT__RATE_LIMIT_BACKEND`."""
+    match config.TRACECAT__RATE_LIMIT_BACKEND:
+        case "local":
+            return LocalRateLimitBackend()
+        case "api":
+            return APIRateLimitBackend()
+        case backend:
+            raise ValueError(f"Unknown rate limit backend {backend!r}")
+
+
+rate_limiter = RateLimiter(
+    get_rate_limit_backend(), overrides=load_overrides(config.TRACECAT__RATE_LIMITS)
+)
@@ -1,20 +1,41 @@
 from __future__ import annotations
 
-import asyncio
 import functools
+import hashlib
+import importlib
 import inspect
 import re
 from collections.abc import Callable, Coroutine
-from types import FunctionType, GenericAlias
-from typing import Annotated, Any, Generic, Self, TypedDict, TypeVar
-
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from pathlib import Path
+from types import FunctionType, GenericAlias, NoneType, UnionType
+from typing import (
+    Annotated,
+    Any,
+    Generic,
+    Literal,
+    Self,
+    TypedDict,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+from uuid import UUID
+
+import orjson
 from loguru import logger
 from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, create_model
-from pydantic_core import ValidationError
+from pydantic_core import SchemaValidator, ValidationError
 from typing_extensions import Doc
 
-from tracecat import expressions
+from tracecat import config, expressions
 from tracecat.auth.sandbox import AuthSandbox
+from tracecat.contexts import ctx_secrets
+from tracecat.executors import Placement, executors
+from tracecat.http import http_client  # noqa: F401
+from tracecat.ratelimit import RateLimit, rate_limiter
 from tracecat.types.exceptions import TracecatException
 
 DEFAULT_NAMESPACE = "core"
@@ -28,6 +49,11 @@ class UDFSchema(TypedDict):
     args: dict[str, Any]
     rtype: dict[str, Any] | None
     secrets: list[str] | None
+    version: str | None
+    description: str
+    namespace: str
+    key: str
+    metadata: dict[str, Any]
 
 
 ArgsT = TypeVar("ArgsT", bound=type[BaseModel])
@@ -41,6 +67,8 @@ class RegisteredUDF(BaseModel, Generic[ArgsT]):
     namespace: str
     version: str | None = None
     secrets: list[str] | None = None
+    placement: Placement = "io"
+    rate_limit: RateLimit | None = None
     args_cls: ArgsT
     args_docs: dict[str, str] = Field(default_factory=dict)
     rtype_cls: Any | None = None
@@ -51,6 +79,23 @@ class RegisteredUDF(BaseModel, Generic[ArgsT]):
     def is_async(self) -> bool:
         return inspect.iscoroutinefunction(self.fn)
 
+    @property
+    def args_validator(self) -> SchemaValidator:
+        """The compiled validator of the args model, built once per UDF."""
+        return self.args_cls.__pydantic_validator__
+
+    @functools.cached_property
+    def dumped_args(self) -> set[str]:
+        """The args that must be dumped after validation, i.e. all but immutable
+        scalars. Dumping passes model-typed args as dicts, and gives the UDF
+        fresh containers that it can mutate without touching the caller's args.
+        UDFs whose args are all scalars skip the dump."""
+        return {
+            name
+            for name, field in self.args_cls.model_fields.items()
+            if not _is_immutable_type(field.annotation)
+        }
+
     def construct_schema(self) -> UDFSchema:
         return UDFSchema(
             args=self.args_cls.model_json_schema(),
@@ -79,9 +124,10 @@ class RegisteredUDF(BaseModel, Generic[ArgsT]):
         try:
             # Note that we're allowing type coercion for the input arguments
             # Use cases would be transforming a UTC string to a datetime object
-            # We return the validated input arguments as a dictionary
-            validated: BaseModel = self.args_cls.model_validate(kwargs)
-            return validated.model_dump()
+            validated: BaseModel = self.args_validator.validate_python(kwargs)
+            if self.dumped_args:
+                return validated.model_dump(warnings=False)
+            return dict(validated.__dict__)
         except ValidationError as e:
             logger.error(f"Validation error for UDF {self.key!r}. {e.errors()!r}")
             raise e
@@ -91,33 +137,67 @@ class RegisteredUDF(BaseModel, Generic[ArgsT]):
             ) from e
 
     async def run_async(self, args: dict[str, Any]) -> Coroutine[Any, Any, Any]:
-        """Run a UDF async."""
+        """Run a UDF async.
+
+        Sync UDFs run in the executor of their placement, see `tracecat.executors`.
+        Calls wait for the UDF's rate limit, if it has one, see `tracecat.ratelimit`.
+        """
+        if self.rate_limit is None:
+            return await self._run_async(args)
+        async with rate_limiter.limit(self.rate_limit):
+            return await self._run_async(args)
+
+    async def _run_async(self, args: dict[str, Any]) -> Any:
         if self.is_async:
             return await self.fn(**args)
-        return await asyncio.to_thread(self.fn, **args)
+        if self.placement != "process" or not executors.has_processes:
+            return await executors.run_in_thread(self.placement, self.fn, args)
+
+        # Only the UDF itself runs in the child process
+        kwargs = self.validate_args(**args)
+        if not self.secrets:
+            return await executors.run_in_process(self.fn.__module__, self.key, kwargs)
+        async with AuthSandbox(secrets=self.secrets, target="context"):
+            return await executors.run_in_process(
+                self.fn.__module__, self.key, kwargs, secrets=ctx_secrets.get()
+            )
+
+
+class UDFManifestEntry(TypedDict):
+    module: str
+    """The module that registers the UDF"""
+
+    schema: UDFSchema
 
 
 class _Registry:
-    """Singleton class to store and manage all registered udfs."""
+    """Singleton class to store and manage all registered udfs.
+
+    UDFs listed in the registry manifest (see `write_manifest`) are known
+    without importing them. Their modules are imported on first use.
+    """
 
     _instance: Self | None = None
     _udf_registry: dict[str, RegisteredUDF]
+    _manifest: dict[str, UDFManifestEntry]
     _done_init: bool = False
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._udf_registry = {}
+            cls._manifest = {}
         return cls._instance
 
     def __contains__(self, name: str) -> bool:
-        return name in self._udf_registry
+        return name in self._udf_registry or name in self._manifest
 
     def __getitem__(self, name: str) -> RegisteredUDF:
         return self.get(name)
 
     def __iter__(self):
-        return iter(self._udf_registry.items())
+        """Iterate over all UDFs. This imports any that haven't been loaded."""
+        return ((key, self.get(key)) for key in self.keys)
 
     @property
     def store(self) -> dict[str, RegisteredUDF]:
@@ -125,22 +205,37 @@ class _Registry:
 
     @property
     def keys(self) -> list[str]:
-        return list(self._udf_registry.keys())
+        return list(dict.fromkeys([*self._manifest, *self._udf_registry]))
 
     def get(self, name: str) -> RegisteredUDF:
-        """Retrieve a registered udf."""
+        """Retrieve a registered udf, importing its module if needed."""
+        if name not in self._udf_registry and name in self._manifest:
+            module = self._manifest[name]["module"]
+            logger.debug("Loading udf module", key=name, module=module)
+            importlib.import_module(module)
         return self._udf_registry[name]
 
     def get_schemas(self) -> dict[str, UDFSchema]:
-        return {key: udf.construct_schema() for key, udf in self._udf_registry.items()}
+        """Get the schemas of all UDFs, without importing them."""
+        return {
+            key: udf.construct_schema()
+            if (udf := self._udf_registry.get(key))
+            else self._manifest[key]["schema"]
+            for key in self.keys
+        }
 
     def init(self) -> None:
-        """Initialize the registry."""
+        """Initialize the registry.
+
+        If there's a registry manifest that matches the installed actions, the
+        actions are only listed. Otherwise, all action modules are imported.
+        """
         logger.warning("Initializing registry")
         if not _Registry._done_init:
-            from tracecat import actions  # noqa: F401
-
-            # Load default workflows
+            if (manifest := load_manifest()) is not None:
+                self._manifest.update(manifest)
+            else:
+                load_action_modules()
 
             _Registry._done_init = True
 
@@ -151,9 +246,16 @@ class _Registry:
         secrets: list[str] | None = None,
         namespace: str = DEFAULT_NAMESPACE,
         version: str | None = None,
+        placement: Placement = "io",
+        rate_limit: RateLimit | None = None,
         **register_kwargs,
     ):
-        """Decorator factory to register a new udf function with additional parameters."""
+        """Decorator factory to register a new udf function with additional parameters.
+
+        `placement` is the executor that a sync udf runs in, see `tracecat.executors`.
+        `rate_limit` limits how often and how many of the udf's calls run, see
+        `tracecat.ratelimit`.
+        """
 
         def decorator_register(fn: FunctionType):
             """The decorator function to register a new udf.
@@ -174,6 +276,8 @@ class _Registry:
             logger.debug(f"Registering udf {key=}")
 
             wrapped_fn: FunctionType
+            # Bound below, once the UDF's models have been built
+            udf: RegisteredUDF
 
             if inspect.iscoroutinefunction(fn):
 
@@ -185,12 +289,16 @@ class _Registry:
                     ----------------
                     Before invoking the function:
                     1. Grab all the secrets from the secrets API.
-                    2. Inject all secret keys into the execution environment.
-                    3. Clean up the environment after the function has executed.
+                    2. Inject all secret keys into the UDF's secret scope.
+                    3. Clean up the scope after the function has executed.
+
+                    UDFs that declare no secrets are called without a sandbox.
                     """
 
-                    validated_kwargs = self[key].validate_args(*args, **kwargs)
-                    async with AuthSandbox(secrets=secrets):
+                    validated_kwargs = udf.validate_args(*args, **kwargs)
+                    if not secrets:
+                        return await fn(**validated_kwargs)
+                    async with AuthSandbox(secrets=secrets, target=_secrets_target()):
                         return await fn(**validated_kwargs)
             else:
 
@@ -198,14 +306,20 @@ class _Registry:
                 def wrapped_fn(*args, **kwargs) -> Any:
                     """Sync version of the wrapper function for the udf."""
 
-                    validated_kwargs = self[key].validate_args(*args, **kwargs)
-                    with AuthSandbox(secrets=secrets):
+                    validated_kwargs = udf.validate_args(*args, **kwargs)
+                    if not secrets:
+                        return fn(**validated_kwargs)
+                    with AuthSandbox(secrets=secrets, target=_secrets_target()):
                         return fn(**validated_kwargs)
 
-            if key in self:
+            if key in self._udf_registry:
                 raise ValueError(f"UDF {key!r} is already registered.")
             if not callable(fn):
                 raise ValueError("Provided object is not a callable function.")
+            if placement != "io" and inspect.iscoroutinefunction(fn):
+                raise ValueError(
+                    f"UDF {key!r} is async, only sync UDFs can have a placement."
+                )
             # Store function and decorator arguments in a dict
 
             _attach_validators(fn, expressions.TemplateValidator())
@@ -214,19 +328,22 @@ class _Registry:
             )
             # TODO: Remove this
             args_docs = _get_signature_docs(fn)
-            self._udf_registry[key] = RegisteredUDF(
+            udf = RegisteredUDF(
                 fn=wrapped_fn,
                 key=key,
                 namespace=namespace,
                 version=version,
                 description=description,
                 secrets=secrets,
+                placement=placement,
+                rate_limit=rate_limit,
                 args_cls=args_cls,
                 args_docs=args_docs,
                 rtype_cls=rtype_cls,
                 rtype_adapter=rtype_adapter,
                 metadata=register_kwargs,
             )
+            self._udf_registry[key] = udf
 
             setattr(wrapped_fn, "__tracecat_udf", True)
             setattr(wrapped_fn, "__tracecat_udf_key", key)
@@ -238,6 +355,88 @@ class _Registry:
 registry = _Registry()
 
 
+def load_action_modules() -> None:
+    """Import all action modules, registering their UDFs."""
+    from tracecat.actions import ACTION_MODULES
+
+    for module in ACTION_MODULES:
+        importlib.import_module(module)
+
+
+def _actions_fingerprint() -> str:
+    """Hash the sources that the manifest is generated from."""
+    root = Path(__file__).parent
+    paths = sorted((root / "actions").rglob("*.py")) + [Path(__file__)]
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.relative_to(root).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def write_manifest(path: str | Path | None = None) -> Path:
+    """Import all action modules and write the registry manifest.
+
+    This is meant to run at build time, e.g. when building the Docker image.
+    """
+    path = Path(path or config.TRACECAT__REGISTRY_MANIFEST_PATH)
+    load_action_modules()
+    udfs = {
+        key: UDFManifestEntry(module=udf.fn.__module__, schema=udf.construct_schema())
+        for key, udf in registry.store.items()
+        if udf.fn.__module__.startswith("tracecat.actions.")
+    }
+    manifest = {"fingerprint": _actions_fingerprint(), "udfs": udfs}
+    path.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    logger.info("Wrote registry manifest", path=str(path), n_udfs=len(udfs))
+    return path
+
+
+def load_manifest(path: str | Path | None = None) -> dict[str, UDFManifestEntry] | None:
+    """Load the registry manifest.
+
+    Returns None if there's no manifest, or it's stale.
+    """
+    path = path or config.TRACECAT__REGISTRY_MANIFEST_PATH
+    if not path or not Path(path).is_file():
+        return None
+    manifest = orjson.loads(Path(path).read_bytes())
+    if manifest.get("fingerprint") != _actions_fingerprint():
+        logger.warning("Registry manifest is stale, ignoring it", path=str(path))
+        return None
+    return manifest["udfs"]
+
+
+def _secrets_target() -> Literal["env", "context"]:
+    return "env" if config.TRACECAT__UNSAFE_SECRETS_IN_ENV else "context"
+
+
+_IMMUTABLE_TYPES = (
+    str,
+    int,
+    float,
+    bytes,
+    NoneType,
+    date,
+    datetime,
+    time,
+    timedelta,
+    UUID,
+    Enum,
+)
+
+
+def _is_immutable_type(tp: Any) -> bool:
+    origin = get_origin(tp)
+    if origin is Annotated:
+        return _is_immutable_type(get_args(tp)[0])
+    if origin is Union or origin is UnionType:
+        return all(_is_immutable_type(arg) for arg in get_args(tp))
+    if origin is Literal:
+        return True
+    return isinstance(tp, type) and issubclass(tp, _IMMUTABLE_TYPES)
+
+
 def _attach_validators(func: FunctionType, *validators: Callable):
     sig = inspect.signature(func)
 
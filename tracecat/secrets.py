@@ -0,0 +1,38 @@
+"""Read the secrets of the running UDF.
+
+`AuthSandbox` puts a UDF's secret keys in a context-local scope, so UDFs that
+run concurrently in one worker, e.g. for two tenants with different
+`VT_API_KEY`s, each see only their own. UDFs should read secrets with `get` or
+`require` instead of `os.environ`.
+
+Keys that aren't in scope fall back to the process environment, which holds
+worker-level configuration, and the secrets of UDFs run with
+`TRACECAT__UNSAFE_SECRETS_IN_ENV` enabled.
+"""
+
+from __future__ import annotations
+
+import os
+
+from tracecat.contexts import ctx_secrets
+
+
+def get(key: str, default: str | None = None) -> str | None:
+    """Get a secret key of the running UDF, like `os.getenv`."""
+    scope = ctx_secrets.get()
+    if scope is not None and key in scope:
+        return scope[key]
+    return os.environ.get(key, default)
+
+
+def require(key: str) -> str:
+    """Get a secret key of the running UDF, like `os.environ[key]`.
+
+    Raises
+    ------
+    KeyError
+        If the key isn't set.
+    """
+    if (value := get(key)) is None:
+        raise KeyError(key)
+    return value
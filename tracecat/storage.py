@@ -0,0 +1,221 @@
+"""Content-addressed blob storage for large action results.
+
+Motivation
+----------
+- Action results are stored in the workflow context, and hence in Temporal
+  history. Large results (e.g. CloudTrail slices, alert lists) bloat history and
+  can exceed Temporal's payload size limits.
+- Results whose serialized size exceeds `TRACECAT__BLOB_OFFLOAD_THRESHOLD_BYTES`
+  are written to a blob store, and only a `BlobRef` is kept in workflow state.
+- Blobs are keyed by the SHA-256 digest of their contents, so they are immutable
+  and identical results are only stored once.
+
+Resolution
+----------
+An activity loads the offloaded results in its context before it evaluates its
+args, off the event loop, see `load_offloaded_results`. Expression evaluation
+never does I/O. Workflow code can't load blobs at all, so results that it
+reads, i.e. in `run_if` or a sharded `for_each`, are never offloaded (see
+`ActionAnalysis.workflow_dependencies`).
+
+Stores
+------
+- `local` (default): files in `TRACECAT__BLOB_STORE_DIR`. Activities that read
+  a result can run on any worker, so with more than one worker this directory
+  must be on a volume they all share.
+- `s3`: an S3-compatible bucket, shared by all workers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import cache
+from pathlib import Path
+from typing import Any, TypedDict
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from tracecat import config
+
+BLOB_REF_KEY = "__tracecat_blob_ref__"
+
+
+class BlobRef(TypedDict):
+    __tracecat_blob_ref__: str
+    """SHA-256 hex digest of the serialized value"""
+
+    size: int
+    """Size of the serialized value in bytes"""
+
+    typename: str
+    """Type name of the original value"""
+
+
+class BlobStore(ABC):
+    """A content-addressed store for serialized values."""
+
+    _cache_size = 32
+
+    def __init__(self) -> None:
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def put(self, digest: str, data: bytes) -> None:
+        """Store `data` under `digest`. This must be idempotent."""
+
+    @abstractmethod
+    def get(self, digest: str) -> bytes:
+        """Retrieve the data stored under `digest`."""
+
+    def store(self, value: Any) -> BlobRef:
+        data = orjson.dumps(value, default=jsonable_encoder)
+        return self.store_bytes(data, typename=type(value).__name__)
+
+    def store_bytes(self, data: bytes, *, typename: str) -> BlobRef:
+        digest = hashlib.sha256(data).hexdigest()
+        self.put(digest, data)
+        return BlobRef(__tracecat_blob_ref__=digest, size=len(data), typename=typename)
+
+    def load(self, ref: BlobRef) -> Any:
+        """Load and deserialize a blob. Recently loaded values are cached.
+
+        This is blocking I/O, and may be called from any thread. Callers must
+        not mutate the returned value, as it is shared.
+        """
+        digest = ref[BLOB_REF_KEY]
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+        value = orjson.loads(self.get(digest))
+        with self._lock:
+            self._cache[digest] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+
+class LocalBlobStore(BlobStore):
+    """Store blobs as files in a local directory."""
+
+    def __init__(self, root: str | Path) -> None:
+        super().__init__()
+        self.root = Path(root).expanduser().resolve()
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so that readers never see a partial blob
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def get(self, digest: str) -> bytes:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError as e:
+            raise FileNotFoundError(
+                f"Blob {digest} not found in {self.root}. With more than one"
+                " worker, TRACECAT__BLOB_STORE_DIR must be on a shared volume,"
+                " or use TRACECAT__BLOB_STORE=s3."
+            ) from e
+
+
+class S3BlobStore(BlobStore):
+    """Store blobs in an S3-compatible bucket."""
+
+    def __init__(
+        self, bucket: str, *, prefix: str = "blobs/", endpoint_url: str | None = None
+    ) -> None:
+        import boto3
+
+        super().__init__()
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def put(self, digest: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + digest, Body=data)
+
+    def get(self, digest: str) -> bytes:
+        obj = self.client.get_object(Bucket=self.bucket, Key=self.prefix + digest)
+        return obj["Body"].read()
+
+
+@cache
+def get_blob_store() -> BlobStore:
+    """Get the process-wide blob store, as configured."""
+    match config.TRACECAT__BLOB_STORE:
+        case "local":
+            return LocalBlobStore(config.TRACECAT__BLOB_STORE_DIR)
+        case "s3":
+            if not config.TRACECAT__BLOB_STORE_BUCKET:
+                raise ValueError("TRACECAT__BLOB_STORE_BUCKET must be set for S3")
+            return S3BlobStore(
+                config.TRACECAT__BLOB_STORE_BUCKET,
+                endpoint_url=config.TRACECAT__BLOB_STORE_ENDPOINT_URL,
+            )
+        case backend:
+            raise ValueError(f"Unknown blob store backend {backend!r}")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+
+def offload_result(
+    value: Any, *, threshold: int | None = None, store: BlobStore | None = None
+) -> Any:
+    """Offload a value to the blob store if it's larger than `threshold` bytes.
+
+    Returns a `BlobRef` if the value was offloaded, otherwise the value itself.
+    A threshold of 0 disables offloading.
+    """
+    if threshold is None:
+        threshold = config.TRACECAT__BLOB_OFFLOAD_THRESHOLD_BYTES
+    if threshold <= 0 or value is None or isinstance(value, bool | int | float):
+        return value
+    data = orjson.dumps(value, default=jsonable_encoder)
+    if len(data) <= threshold:
+        return value
+    store = store or get_blob_store()
+    return store.store_bytes(data, typename=type(value).__name__)
+
+
+async def load_offloaded_results(
+    actions: dict[str, Any], *, store: BlobStore | None = None
+) -> dict[str, Any]:
+    """Load the offloaded results of the actions in an activity's context.
+
+    Blobs are loaded concurrently in threads, so they never block the event
+    loop. Only the action nodes with an offloaded result are copied, and
+    `actions` itself is not mutated.
+    """
+    refs = {
+        ref: node["result"]
+        for ref, node in actions.items()
+        if isinstance(node, dict) and is_blob_ref(node.get("result"))
+    }
+    if not refs:
+        return actions
+    store = store or get_blob_store()
+    results = await asyncio.gather(
+        *(asyncio.to_thread(store.load, blob_ref) for blob_ref in refs.values())
+    )
+    loaded = {
+        ref: {**actions[ref], "result": result}
+        for ref, result in zip(refs, results, strict=True)
+    }
+    return {**actions, **loaded}
@@ -4,7 +4,7 @@ import json
 from datetime import datetime
 from typing import Any, Literal
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from tracecat.db.schemas import ActionRun, Resource, Schedule, WorkflowRun
 from tracecat.dsl.common import DSLInput
@@ -232,6 +232,20 @@ class SearchSecretsParams(BaseModel):
     names: list[str]
 
 
+class BatchGetSecretsParams(BaseModel):
+    names: list[str]
+
+
+class ReserveRateLimitParams(BaseModel):
+    key: str = Field(..., max_length=255)
+    requests_per_second: float = Field(..., gt=0)
+    burst: float = Field(..., ge=1)
+
+
+class ReserveRateLimitResponse(BaseModel):
+    wait: float
+
+
 class Tag(BaseModel):
     tag: str
     value: str